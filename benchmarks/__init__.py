@@ -0,0 +1,3 @@
+"""
+Performance benchmarks for the CV generation pipeline, run as python -m benchmarks.<name>
+"""
@@ -0,0 +1,265 @@
+"""
+End-to-end benchmark of the generate -> render -> zip pipeline against a fake LLM backend:
+python -m benchmarks.pipeline --sizes 1,10,50,1000 --latency 0.05
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from cv_generator.archive import CVArchive
+from cv_generator.fake_llm import FakeChatClient
+from cv_generator.generation import iter_cv_results_as_completed
+from cv_generator.pdf import cv_filename, render_cv_pdf
+from cv_generator.ratelimit import RetryPolicy
+from cv_generator.render_pool import PDFRenderPool, render_as_completed
+
+DEFAULT_SIZES = [1, 10, 50, 1000]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class TimedClient:
+    """
+    Proxy of a chat client recording the duration of every chat.completions.create call
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.durations = []
+        self.chat = type(client.chat)(completions=type(client.chat.completions)(create=self.create))
+
+    def create(self, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._client.chat.completions.create(**kwargs)
+        finally:
+            self.durations.append(time.perf_counter() - start)
+
+
+def percentile(values, pct):
+    """
+    Function to return the nearest-rank percentile of a list of numbers
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(durations):
+    """
+    Function to summarise a list of durations in seconds
+    """
+    return {
+        "count": len(durations),
+        "total_s": sum(durations),
+        "p50_s": percentile(durations, 50),
+        "p99_s": percentile(durations, 99),
+    }
+
+
+def peak_rss_kb():
+    """
+    Function to return the peak resident set size of this process and of its finished children, in KB.
+    ru_maxrss never goes down, so each batch size is benchmarked in a fresh process (see run_size).
+    """
+    scale = 1024 if sys.platform == "darwin" else 1  # ru_maxrss is in bytes on macOS
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    )
+
+
+def batch_inputs(size):
+    return dict(
+        roles=["Software Engineer"] * size,
+        names=[f"Candidate {i}" for i in range(size)],
+        emails=[f"candidate{i}@example.com" for i in range(size)],
+        phone_numbers=["+1 555 0100"] * size,
+        locations=["Germany"] * size,
+        experience_levels=["Random"] * size,
+    )
+
+
+def benchmark_batch(size, args, render_pool):
+    """
+    Function to benchmark one batch size: each stage on its own, then the whole pipeline
+    """
+    retry_policy = RetryPolicy(max_attempts=args.max_attempts, base_delay=args.latency or 0.001)
+
+    def make_client():
+        return TimedClient(FakeChatClient(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed))
+
+    # Stage 1: generate_cv through the concurrent engine
+    generate_client = make_client()
+    start = time.perf_counter()
+    results = dict(iter_cv_results_as_completed(
+        generate_client, max_concurrency=args.concurrency, retry_policy=retry_policy, structured=args.structured, **batch_inputs(size)
+    ))
+    generate_wall = time.perf_counter() - start
+    cvs = [results[idx].structured or results[idx].content for idx in range(size)]
+
+    # Stage 2: save_cv_as_pdf layout, one CV at a time in this process
+    render_times = []
+    pdfs = []
+    for cv in cvs:
+        start = time.perf_counter()
+        pdfs.append(render_cv_pdf(cv))
+        render_times.append(time.perf_counter() - start)
+
+    # Stage 3: ZIP packaging
+    start = time.perf_counter()
+    cv_archive = CVArchive(spool=True)
+    for idx, pdf_bytes in enumerate(pdfs):
+        cv_archive.add(cv_filename("Software Engineer", idx + 1), pdf_bytes)
+    archive_size = len(cv_archive.getvalue())
+    zip_wall = time.perf_counter() - start
+
+    # End to end: generation, render pool and ZIP overlapping as in the apps
+    client = make_client()
+    latencies = []
+    start = time.perf_counter()
+    cv_archive = CVArchive(spool=True)
+    completed = iter_cv_results_as_completed(client, max_concurrency=args.concurrency, retry_policy=retry_policy, structured=args.structured, **batch_inputs(size))
+    for idx, result, pdf_bytes in render_as_completed(completed, render_pool):
+        cv_archive.add(cv_filename("Software Engineer", idx + 1), pdf_bytes)
+        latencies.append(time.perf_counter() - start)
+    cv_archive.close()
+    end_to_end_wall = time.perf_counter() - start
+
+    rss_self, rss_children = peak_rss_kb()
+    return {
+        "batch_size": size,
+        "end_to_end": {
+            "wall_s": end_to_end_wall,
+            "throughput_cvs_per_s": size / end_to_end_wall,
+            # Time from the start of the batch until each CV's PDF was in the archive
+            "latency_p50_s": percentile(latencies, 50),
+            "latency_p99_s": percentile(latencies, 99),
+        },
+        "stages": {
+            "generate_cv": {
+                "wall_s": generate_wall,
+                "errors": sum(not r.ok for r in results.values()),
+                "attempts": sum(r.attempts for r in results.values()),
+                "api_calls": summarize(generate_client.durations),
+            },
+            "save_cv_as_pdf": summarize(render_times),
+            "zip": {"wall_s": zip_wall, "archive_bytes": archive_size},
+        },
+        "peak_rss_kb": rss_self,
+        "peak_rss_children_kb": rss_children,
+    }
+
+
+def run_size(size, args):
+    """
+    Function to benchmark one batch size with its own render pool, in the calling process
+    """
+    with PDFRenderPool(args.render_workers) as render_pool:
+        # Start the worker processes before the clock runs
+        render_pool.submit("Warm up:").result()
+        result = benchmark_batch(size, args, render_pool)
+    # The render workers only count once they have exited
+    result["peak_rss_children_kb"] = peak_rss_kb()[1]
+    return result
+
+
+def git_version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(args):
+    """
+    Function to run every batch size and return the JSON-serialisable report
+    """
+    report = {
+        "version": git_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "sizes": args.sizes, "latency_s": args.latency, "jitter_s": args.jitter, "error_rate": args.error_rate,
+            "concurrency": args.concurrency, "render_workers": args.render_workers, "seed": args.seed,
+            "structured": args.structured,
+        },
+        "results": [],
+    }
+    # Each size runs in a fresh process, so its peak RSS is not the peak of the larger sizes before it
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_size, size, args).result()
+        report["results"].append(result)
+        e2e = result["end_to_end"]
+        print(
+            f"{size:>6} CVs: {e2e['wall_s']:7.2f}s  {e2e['throughput_cvs_per_s']:8.1f} CVs/s  "
+            f"p50 {e2e['latency_p50_s']:.3f}s  p99 {e2e['latency_p99_s']:.3f}s  "
+            f"render {result['stages']['save_cv_as_pdf']['p50_s'] * 1000:.1f}ms/CV  "
+            f"peak RSS {result['peak_rss_kb'] // 1024} MB"
+        )
+    return report
+
+
+def compare(old_path, new_path):
+    """
+    Function to print the end-to-end throughput of two saved reports side by side
+    """
+    with open(old_path) as f:
+        old = {r["batch_size"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {r["batch_size"]: r for r in json.load(f)["results"]}
+    for size in sorted(set(old) & set(new)):
+        before = old[size]["end_to_end"]["throughput_cvs_per_s"]
+        after = new[size]["end_to_end"]["throughput_cvs_per_s"]
+        print(f"{size:>6} CVs: {before:8.1f} -> {after:8.1f} CVs/s ({after / before:5.2f}x)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.pipeline", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=DEFAULT_SIZES, help="comma-separated batch sizes")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency per call in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency per call, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 429/503 from the fake API")
+    parser.add_argument("--max-attempts", type=int, default=4, help="attempts per CV")
+    parser.add_argument("--concurrency", type=int, default=16, help="API calls in flight")
+    parser.add_argument("--render-workers", type=int, default=None, help="PDF render processes (0 renders in-process)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the fake API")
+    parser.add_argument("--structured", action="store_true", help="generate structured (JSON) CVs")
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/pipeline-<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved reports instead of running")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    report = run_benchmark(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark of PDF rendering on one core: python -m benchmarks.render
+"""
+import argparse
+import timeit
+
+from fpdf import FPDF
+
+from benchmarks.sanitize import SAMPLE_CV
+from cv_generator.pdf import render_cv_pdf
+
+
+def legacy_render_cv_pdf(cv_content):
+    """
+    Function reproducing the previous render path: per-character sanitisation, a new FPDF with its title
+    page for every CV, multi_cell for every content line and a second document as fallback
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 16)
+    pdf.set_text_color(0, 102, 204)
+    pdf.cell(0, 10, 'Curriculum Vitae', ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_draw_color(0, 102, 204)
+    pdf.set_line_width(0.5)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(10)
+
+    # The previous per-character sanitisation (see benchmarks.sanitize.legacy_sanitize), so only the renderers differ
+    sections = [''.join(char if ord(char) < 128 else '_' for char in line.strip()) for line in cv_content.split('\n')]
+    for line in sections:
+        try:
+            if line.endswith(':'):
+                pdf.set_font('Helvetica', 'B', 12)
+                pdf.set_text_color(0, 51, 102)
+                pdf.cell(0, 10, line, ln=True)
+                pdf.set_font('Helvetica', '', 12)
+                pdf.set_text_color(0, 0, 0)
+            elif line:
+                pdf.multi_cell(0, 10, line)
+            pdf.ln(2)
+        except Exception:
+            continue
+    try:
+        return pdf.output(dest='S').encode('latin-1')
+    except Exception:
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font('Helvetica', 'B', 16)
+        pdf.cell(0, 10, 'Curriculum Vitae', ln=True, align='C')
+        pdf.set_font('Helvetica', '', 12)
+        for line in sections:
+            pdf.multi_cell(0, 10, line)
+            pdf.ln(2)
+        return pdf.output(dest='S').encode('latin-1')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200, help="PDFs rendered per measurement")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, fn in (("new FPDF per CV", legacy_render_cv_pdf), ("cloned template", render_cv_pdf)):
+        best = min(timeit.repeat(lambda: fn(SAMPLE_CV), number=args.number, repeat=5))
+        results[name] = args.number / best
+        print(f"{name:>16}: {results[name]:8.0f} PDFs/s per core")
+    legacy, current = results.values()
+    print(f"{'speed-up':>16}: {current / legacy:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
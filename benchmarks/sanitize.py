@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of CV text sanitisation: python -m benchmarks.sanitize
+"""
+import argparse
+import timeit
+
+from cv_generator.text import sanitize_text
+
+SAMPLE_CV = """Name: José Álvarez Müller
+Email: jose.alvarez4821@gmail.com
+Phone Number: +34 612 345 678
+Location: São Paulo – Brasil
+Languages:
+- Português (native), Español, English, Français
+Applicant Key Role:
+Senior Software Engineer – “platform” team
+Years of Experience: 8
+Skills:
+- Python, Go, Kubernetes, PostgreSQL, Kafka
+- Designing resilient distributed systems … at scale
+Education:
+- M.Sc. Informática, Universidade de São Paulo (2014)
+Projects:
+- Zürich transit planner: real-time routing for 2M daily riders
+- Łódź smart-grid telemetry pipeline
+Experiences:
+- Tech Lead, Nørd Systems ApS (2019–2024): led 12 engineers
+- Backend Engineer, Café Açaí Ltda (2015–2019)
+References:
+- Dr. Björn Æsir, CTO, Nørd Systems
+""" * 3
+
+
+def legacy_sanitize(cv_content):
+    """
+    Function reproducing the previous per-line, per-character sanitisation in save_cv_as_pdf
+    """
+    lines = []
+    for line in cv_content.split('\n'):
+        if line.strip().endswith(':'):
+            lines.append(''.join(char if ord(char) < 128 else '_' for char in line.strip()))
+        elif line.strip():
+            lines.append(''.join(char if ord(char) < 128 else '_' for char in line.strip()))
+    return lines
+
+
+def single_pass_sanitize(cv_content):
+    """
+    Function reproducing the current whole-document sanitisation in render_cv_pdf
+    """
+    return [line.strip() for line in sanitize_text(cv_content).split('\n')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000, help="CVs sanitised per measurement")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, fn in (("legacy per-character join", legacy_sanitize), ("single-pass sanitize_text", single_pass_sanitize)):
+        best = min(timeit.repeat(lambda: fn(SAMPLE_CV), number=args.number, repeat=5))
+        results[name] = best / args.number * 1e6
+        print(f"{name:>28}: {results[name]:8.1f} us per CV")
+    legacy, current = results.values()
+    print(f"{'speed-up':>28}: {legacy / current:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
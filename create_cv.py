@@ -1,20 +1,42 @@
 import os
+import threading
+import time
+import uuid
 import streamlit as st
-from groq import Groq
-import random
-from fpdf import FPDF
 from dotenv import load_dotenv
-import faker
-import zipfile
-from io import BytesIO
+
+from cv_generator import generation
+from cv_generator.archive import CVArchive
+from cv_generator.cache import DEFAULT_CACHE_DIR, ResponseCache
+from cv_generator.dedup import DedupIndex, dedup_results
+from cv_generator.estimator import estimate_run, get_usage_history, max_cvs_for_budget
+from cv_generator.exporters import DEFAULT_FORMATS, EXPORT_FORMATS, CVExporter, ExportError, parse_formats
+from cv_generator.jobs import CANCELLED, get_job_queue
+from cv_generator.manifest import DEFAULT_MANIFEST_DB, JobManifest, split_resumed_work
+from cv_generator.metrics import get_stats_sink
+from cv_generator.planner import Combination, JobSpec, plan_work
+from cv_generator.providers import get_client, get_provider
+from cv_generator.ratelimit import get_rate_limiter
+from cv_generator.render_pool import get_render_pool
+from cv_generator.results import ResultEntry
+from cv_generator.results_view import poll_job, session_batches, show_job_progress, show_result_entries
+from cv_generator.roles import EXPERIENCE_LEVELS, JOB_ROLES
+from cv_generator.workspace import get_workspace_registry, parse_session_id
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Set up the Groq client with API key
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
+# Chat client of the configured provider (CV_PROVIDER: groq by default, or openai, local, fake).
+# It is created once per process, so reruns and sessions share its warm connections.
+provider = get_provider(os.environ.get("CV_PROVIDER", "groq"))
+client = get_client(provider.name)
+
+# Seconds between two refreshes of a running batch's progress
+JOB_POLL_SECONDS = 1.0
+
+# Pipeline timings, token usage, retries and errors for the stats panel
+# (CV_METRICS_JSONL and CV_METRICS_PORT add a JSONL log and a Prometheus endpoint)
+pipeline_stats = get_stats_sink()
 
 # Streamlit App
 st.title("🌟 Random CV Generator")
@@ -40,226 +62,209 @@ st.markdown("---")
 
 # Input form for the job role and other details
 location = st.text_input("🌍 Enter the location:", value="Saudi Arabia")
-experience_level = st.selectbox("🔧 Select the experience level:", ["High", "Low", "Random"], index=2)
-num_cvs = st.number_input("📄 Enter the number of CVs to generate:", min_value=1, max_value=50, value=5)
+experience_level = st.selectbox("🔧 Select the experience level:", EXPERIENCE_LEVELS, index=2)
+# The batch size is capped by how many CVs fit in the budget (CV_BUDGET_USD by default) at the estimated cost per CV
+usage_history = get_usage_history()
+budget = st.number_input("💰 Budget for this batch (USD):", min_value=0.0, value=float(os.environ.get("CV_BUDGET_USD", "1.0")), step=0.5)
+cv_estimate = estimate_run([Combination(max(JOB_ROLES, key=len), location, experience_level, 1, provider.name)], provider.name, provider.model, history=usage_history)
+max_cvs = max(1, max_cvs_for_budget(cv_estimate.cost_per_cv, budget))
+num_cvs = st.number_input("📄 Enter the number of CVs to generate:", min_value=1, max_value=max_cvs, value=min(5, max_cvs))
+max_concurrency = st.number_input("⚡ Number of CVs to generate in parallel:", min_value=1, max_value=20, value=5)
+structured_output = st.checkbox("🧱 Structured output (the model answers in JSON and the PDFs are laid out from its sections)", value=False)
+export_formats = st.multiselect("🗂️ Export formats (every CV in the ZIP; JSONL and Parquet as one dataset file):", EXPORT_FORMATS, default=DEFAULT_FORMATS)
+use_cache = st.checkbox("♻️ Cache CVs and replay them for identical settings (untick for fresh generations)", value=False)
 
 # List of common job roles to choose from
-job_roles = [
-    "Software Engineer", "Data Scientist", "Security Data Scientist", "Product Manager", "Project Coordinator", "Marketing Specialist",
-    "Sales Executive", "Financial Analyst", "Human Resources Manager", "Graphic Designer", "Content Writer",
-    "Customer Service Representative", "Business Analyst", "Accountant", "UX/UI Designer", "Network Administrator",
-    "IT Support Specialist", "Operations Manager", "Administrative Assistant", "Legal Advisor", "Quality Assurance Tester",
-    "Mechanical Engineer", "Electrical Engineer", "Civil Engineer", "Biomedical Engineer", "Chemical Engineer",
-    "Systems Analyst", "Database Administrator", "DevOps Engineer", "Full Stack Developer", "Backend Developer",
-    "Frontend Developer", "Cloud Architect", "Machine Learning Engineer", "AI Researcher", "Cybersecurity Specialist",
-    "SEO Specialist", "Content Strategist", "Social Media Manager", "Public Relations Specialist", "Event Planner",
-    "Supply Chain Manager", "Procurement Specialist", "Warehouse Manager", "Retail Store Manager", "Fitness Trainer",
-    "Nutritionist", "Psychologist", "Teacher", "School Principal", "Professor", "Research Scientist", "Lab Technician",
-    "Nurse", "Doctor", "Paramedic", "Pharmacist", "Veterinarian", "Pilot", "Chef",
-]
+job_roles = JOB_ROLES
 job_role = st.selectbox("💼 Select the job role:", job_roles)
 
-def generate_cv(role, name, email, phone_number, location, experience_level):
-    """
-    Function to generate a random CV using Groq API for a given job role, name, email, and other details
-    """
-    messages = [
-        {
-            "role": "user",
-            "content": (
-                f"Generate a CV for the role of {role}. Please use only English characters.\n"
-                f"Location: {location}\n"
-                f"Name: A Localised Male or Female Name Based on his {location} or neigbouring countries. Use English characters only for the name\n"
-                f"Email: random email based on name, {location}, and a random 5 digit hash. email should be @gmail.com \n"
-                f"Phone Number: A localised random phone number based on {location}\n"
-                f"Languages: \n"
-                f"Applicant Key Role:\n"
-                f"Years of Experience: value should be an integer number based on {experience_level} number of years\n"
-                f"Skills: \n"
-                f"Education:\n"
-                f"Projects: \n"
-                f"Certifications: \n"
-                f"Experiences: \n"
-                f"References: Create Random References based on his experience\n"
-            ),
-        }
-    ]
-    
-    # Generate completion using Groq API
-    try:
-        chat_completion = client.chat.completions.create(
-            messages=messages,
-            model="llama-3.2-90b-text-preview",
-        )
-        return chat_completion.choices[0].message.content
-    except Exception as e:
-        return f"Error generating CV: {e}"
-
-
-def save_cv_as_pdf(cv_content, filename):
-    """
-    Function to save CV content to a PDF file using built-in fonts
-    """
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    
-    # Title section of the PDF
-    pdf.set_font('Helvetica', 'B', 16)
-    pdf.set_text_color(0, 102, 204)  # Blue color for title
-    pdf.cell(0, 10, 'Curriculum Vitae', ln=True, align='C')
-    pdf.ln(10)
-
-    # Add a decorative line below the title
-    pdf.set_draw_color(0, 102, 204)
-    pdf.set_line_width(0.5)
-    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-    pdf.ln(10)
+# Pre-flight estimate of the batch: tokens, cost, and time against the rate limits and concurrency
+estimate = estimate_run(
+    [Combination(job_role, location, experience_level, num_cvs, provider.name)], provider.name, provider.model,
+    structured=structured_output, concurrency=max_concurrency, rate_limiter=get_rate_limiter(provider.name), history=usage_history,
+)
+st.info(f"📐 Estimate: {estimate.summary()}")
 
-    # Content Sections
-    sections = cv_content.split('\n')
-    
-    for line in sections:
-        try:
-            if line.strip().endswith(':'):
-                # New section heading detected
-                pdf.set_font('Helvetica', 'B', 12)
-                pdf.set_text_color(0, 51, 102)  # Dark blue color for section headings
-                # Replace any problematic characters
-                safe_text = ''.join(char if ord(char) < 128 else '_' for char in line.strip())
-                pdf.cell(0, 10, safe_text, ln=True)
-                pdf.set_font('Helvetica', '', 12)
-                pdf.set_text_color(0, 0, 0)  # Reset color to black for content
-            else:
-                # Content under the current section
-                if line.strip():
-                    # Replace any problematic characters
-                    safe_text = ''.join(char if ord(char) < 128 else '_' for char in line.strip())
-                    pdf.multi_cell(0, 10, safe_text)
-            pdf.ln(2)
-        except Exception as e:
-            continue
+# The session id is kept in the URL next to the job id, so a reloaded page finds the session's batches again
+session_id = st.session_state.setdefault("session_id", parse_session_id(st.query_params.get("session")) or uuid.uuid4().hex)
+st.query_params["session"] = session_id
 
-    # Save the PDF to the given filename
+# Generate CVs button
+if st.button("✨ Generate Random CVs"):
+    # Each browser session gets its own workspace, so concurrent users never touch each other's files
+    workspace = get_workspace_registry().get(session_id)
     try:
-        pdf.output(filename)
-    except Exception as e:
-        # If PDF creation fails, try with even stricter character limiting
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font('Helvetica', 'B', 16)
-        pdf.cell(0, 10, 'Curriculum Vitae', ln=True, align='C')
+        parse_formats(export_formats)
+        export_error = None
+    except ExportError as e:
+        export_error = e
+    manifest_settings = {
+        "session": session_id, "provider": provider.name, "role": job_role, "location": location,
+        "experience_level": experience_level, "count": num_cvs, "structured": structured_output,
+    }
+    # Two batches of the same settings would resume the same manifest job and generate its CVs twice
+    already_running = any(
+        not batch.finished and batch.metadata.get("manifest_settings") == manifest_settings for batch in get_job_queue().jobs(session_id)
+    )
+    if estimate.cost > budget:
+        st.error(f"⚠️ The estimated cost ${estimate.cost:.4f} exceeds the budget of ${budget:.2f}.")
+    elif not job_role:
+        st.error("⚠️ Please enter a job role to generate CVs.")
+    elif export_error is not None:
+        st.error(f"⚠️ {export_error}")
+    elif already_running:
+        st.warning("⏳ A batch with these settings is already running.")
+    else:
+        # Each CV goes into the ZIP archive in every selected format; dataset files are added once the batch is done.
+        # Every batch writes its dataset files in a folder of its own, so a new batch never truncates a running one's.
+        cv_archive = CVArchive(spool=True, spool_dir=workspace.path)
+        exporter = CVExporter(export_formats, cv_archive.add, dataset_dir=os.path.join(workspace.path, uuid.uuid4().hex))
+        # Progress is recorded in the app's job manifest (CV_MANIFEST_DB), outside the expiring workspace and under the
+        # session id kept in the URL: if a batch is cancelled, or the page is reloaded with the same URL after a server
+        # restart, generating the same settings again only calls the API for the CVs that are missing
+        manifest = JobManifest(os.environ.get("CV_MANIFEST_DB", DEFAULT_MANIFEST_DB))
+        manifest_job_id, resumed = manifest.start_job(manifest_settings)
+        # Random names, emails and phone numbers local to the location (kept from the interrupted run when resuming)
+        work = manifest.add_items(manifest_job_id, plan_work(JobSpec([Combination(job_role, location, experience_level, num_cvs, provider.name)]), per_combination_folders=False))
+        _, stored_cvs, remaining = split_resumed_work(manifest, manifest_job_id, work, artifact_exists=lambda path: False)
+        stored_results = {item.path: result for item, result in stored_cvs}
+        if resumed:
+            st.info(f"♻️ Resuming the interrupted batch: {len(stored_cvs)} of {num_cvs} CVs were already generated")
         
-        for line in sections:
-            safe_text = ''.join(c for c in line if ord(c) < 128 and c.isprintable())
-            pdf.set_font('Helvetica', '', 12)
-            pdf.multi_cell(0, 10, safe_text)
-            pdf.ln(2)
+        # Optional on-disk cache of generated CVs
+        response_cache = ResponseCache(os.environ.get("CV_CACHE_DIR", DEFAULT_CACHE_DIR)) if use_cache else None
+        rate_limiter = get_rate_limiter(provider.name)
+        # Each CV is compared with the CVs before it, and near-duplicates are flagged
+        dedup_index = DedupIndex()
+        batch_lock = threading.Lock()
+        
+        def run_task(item):
+            """
+            Function to generate (or take from the manifest), check, render and export one CV on a job worker.
+            Calls from every session share the provider's rate limits (e.g. GROQ_RPM / GROQ_TPM) and retry transient errors.
+            """
+            result = stored_results.get(item.path)
+            if result is None:
+                result = generation.generate_cv_result(
+                    client, job_role, item.name, item.email, item.phone_number, location, experience_level,
+                    model=provider.model, cache=response_cache, variant=item.variant, rate_limiter=rate_limiter,
+                    structured=structured_output,
+                )
+                manifest.record_result(manifest_job_id, item, result)
+            with batch_lock:
+                (_, result), = dedup_results([(item, result)], dedup_index)
+            # The PDF is rendered in the render worker processes (when PDFs are selected)
+            pdf_bytes = get_render_pool().submit(result.structured or result.content).result() if exporter.needs_pdf else None
+            with batch_lock:
+                exporter.export(
+                    item.path, result, pdf_bytes, role=job_role, location=location,
+                    experience_level=experience_level, provider=provider.name,
+                )
+            if result.ok:
+                manifest.record_artifact(manifest_job_id, item, item.path)
+            return result
+        
+        def finish_batch(job):
+            """
+            Function to close the batch once every CV is in: package the ZIP and record the actual usage
+            """
+            manifest.finish_job(manifest_job_id)
+            exporter.close()
+            for writer in exporter.datasets.values():
+                with open(writer.path, "rb") as f:
+                    cv_archive.add(os.path.basename(writer.path), f.read())
             
-        pdf.output(filename)
-# def save_cv_as_pdf(cv_content, filename):
-#     """
-#     Function to save CV content to a PDF file with improved formatting
-#     """
-#     pdf = FPDF()
-#     pdf.set_auto_page_break(auto=True, margin=15)
-#     pdf.add_page()
-
-#     # Title section of the PDF
-#     pdf.set_font("Arial", 'B', 16)
-#     pdf.set_text_color(0, 102, 204)  # Blue color for title
-#     pdf.cell(0, 10, "Curriculum Vitae", ln=True, align='C')
-#     pdf.ln(10)
-
-#     # Add a decorative line below the title
-#     pdf.set_draw_color(0, 102, 204)
-#     pdf.set_line_width(0.5)
-#     pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-#     pdf.ln(10)
-
-#     # Content Sections
-#     sections = cv_content.split('\n')
-#     current_section = ""
-#     for line in sections:
-#         if line.endswith(":"):
-#             # New section heading detected
-#             current_section = line.strip()
-#             pdf.set_font("Arial", 'B', 12)
-#             pdf.set_text_color(0, 51, 102)  # Dark blue color for section headings
-#             pdf.cell(0, 10, current_section, ln=True)
-#             pdf.set_font("Arial", size=12)
-#             pdf.set_text_color(0, 0, 0)  # Reset color to black for content
-#         else:
-#             # Content under the current section
-#             pdf.multi_cell(0, 10, line.strip())
-#         pdf.ln(5)
-
-#     # Save the PDF to the given filename
-#     pdf.output(filename)
-
-# Generate CVs button
-import glob
+            # Actual usage is recorded next to the estimate, so later estimates are calibrated on it
+            called = [result for _, result in job.results() if result.completion_tokens is not None and not result.cached]
+            prompt_tokens = sum(result.prompt_tokens or 0 for result in called)
+            completion_tokens = sum(result.completion_tokens for result in called)
+            batch_seconds = time.time() - job.created_at
+            usage_history.record(estimate, len(called), prompt_tokens, completion_tokens, sum(result.elapsed for result in called), batch_seconds)
+            summary = [
+                f"Actual: {prompt_tokens} prompt + {completion_tokens} completion tokens over {len(called)} API calls in {batch_seconds:.1f}s "
+                f"(estimated {estimate.prompt_tokens} + {estimate.completion_tokens})",
+                f"Diversity: {dedup_index.diversity():.2f} ({dedup_index.duplicates} near-duplicates)",
+            ]
+            if response_cache is not None:
+                cache_stats = response_cache.stats()
+                summary.append(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+            job.output = {"zip": cv_archive.getvalue(), "summary": summary}
+        
+        def release_batch(job):
+            """
+            Function to close the batch's manifest, dataset files and spooled ZIP, however the batch ended
+            """
+            manifest.close()
+            exporter.close()
+            cv_archive.discard()
+            workspace.unpin()
+        
+        # The batch runs on the shared job workers, at most max_concurrency CVs at a time; the page only polls it.
+        # The job id is kept in the URL, so the batch can be picked up again after a page reload.
+        # The workspace holding its dataset files is kept until it ends, however long it runs.
+        workspace.pin()
+        job = get_job_queue().submit(
+            session_id, work, run_task, max_in_flight=max_concurrency, on_done=finish_batch, on_finish=release_batch,
+            metadata={"manifest_settings": manifest_settings},
+        )
+        st.session_state["job_id"] = job.job_id
+        st.query_params["job"] = job.job_id
 
-def delete_old_pdfs():
-    """
-    Function to delete all old PDF files in the current working directory
-    """
-    old_pdfs = glob.glob("*.pdf")
-    for pdf in old_pdfs:
-        try:
-            os.remove(pdf)
-        except Exception as e:
-            st.warning(f"Could not delete {pdf}: {e}")
+# Progress and results of the session's batch (or of the batch in the URL), polled while it runs
+job_id = st.query_params.get("job") or st.session_state.get("job_id")
+job = get_job_queue().get(job_id) if job_id else None
+if job is not None:
+    show_job_progress(st, get_job_queue(), job, job.completed, job.total)
+    
+    def show_details(entry):
+        """
+        Function to show where a CV is saved, its API attempts and token usage, and whether it is a near-duplicate
+        """
+        result = entry.result
+        usage = (
+            f", tokens: {result.prompt_tokens} prompt + {result.completion_tokens} completion in {result.elapsed:.1f}s"
+            if result.completion_tokens is not None else ""
+        )
+        st.text(f"Saved as: {entry.path} (API attempts: {result.attempts}{usage})")
+        if result.duplicate_of is not None:
+            st.warning(f"⚠️ Near-duplicate of CV {result.duplicate_of.variant + 1} (similarity {result.similarity:.2f})")
+    
+    # The CVs of the session's batches, in order whatever order they complete in
+    entries = [
+        ResultEntry(batch.job_id, item.variant + 1, batch.total, item.combination.role, item.path, result)
+        for batch in session_batches(get_job_queue(), session_id, job)
+        for item, result in sorted(batch.results(), key=lambda pair: pair[0].variant)
+    ]
+    show_result_entries(st, entries, show_details=show_details)
+    
+    if job.status == CANCELLED:
+        st.info("🛑 The batch was cancelled; generate the same settings again to resume it.")
+    elif job.error is not None:
+        st.error(f"⚠️ The batch failed: {job.error}")
+    elif job.finished:
+        for line in job.output["summary"]:
+            st.text(line)
+        
+        # Provide a download button for the ZIP file once every CV is in it
+        st.markdown("---")
+        st.download_button(
+            label="📦 Download All CVs as ZIP",
+            data=job.output["zip"],
+            file_name="generated_cvs.zip",
+            mime="application/zip"
+        )
 
-if st.button("✨ Generate Random CVs"):
-    # Delete old PDF files before generating new ones
-    delete_old_pdfs()
-    if job_role:
-        with st.spinner('⏳ Generating CVs, please wait...'):
-            generated_cvs = []
-            random_hashes = [str(random.randint(1000, 9999)) for _ in range(num_cvs)]  # Generate random hashes for email uniqueness
-            fake = faker.Faker()
-            random_names = [fake.name() for _ in range(num_cvs)]  # Generate random names
-            random_emails = [f"{name.replace(' ', '.').lower()}{hash_}@example.com" for name, hash_ in zip(random_names, random_hashes)]  # Generate random emails
-            random_phone_numbers = [fake.phone_number() for _ in range(num_cvs)]  # Generate random phone numbers
-            random_locations = [location for _ in range(num_cvs)]  # Use the specified location for all CVs
-            
-            for i in range(num_cvs):
-                # Extract details for each CV
-                name = random_names[i]
-                email = random_emails[i]
-                phone_number = random_phone_numbers[i]
-                location = random_locations[i]
-                
-                # Generate the CV content using the Groq API
-                cv = generate_cv(job_role, name, email, phone_number, location, experience_level)
-                generated_cvs.append(cv)
-                filename = f"cv_{job_role}_{i+1}.pdf"
-                save_cv_as_pdf(cv, filename)  # Save each CV as a PDF file
-            
-            # Create a ZIP file to download all CVs
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-                for idx, cv in enumerate(generated_cvs):
-                    st.subheader(f"CV {idx + 1} of {num_cvs}")
-                    st.text_area("", cv, height=300)
-                    st.text(f"Saved as: cv_{job_role}_{idx + 1}.pdf")
-                    zip_file.write(f"cv_{job_role}_{idx + 1}.pdf")
-            
-            # Provide a download button for the ZIP file
-            st.markdown("---")
-            st.download_button(
-                label="📦 Download All CVs as ZIP",
-                data=zip_buffer.getvalue(),
-                file_name="generated_cvs.zip",
-                mime="application/zip"
-            )
-    else:
-        st.error("⚠️ Please enter a job role to generate CVs.")
+        # Time spent in each stage of the pipeline, over the recent CVs of every session of this process
+        with st.expander("📊 Pipeline stats"):
+            st.table(pipeline_stats.summary())
+            st.json(pipeline_stats.counters())
 
 # Footer
 st.markdown("---")
 st.markdown("Built with ❤️ and Gen-AI by [waqasobeidy@gmail.com](mailto:waqasobeidy@gmail.com)")
 
+# While the batch runs, wait for its next CV (at most JOB_POLL_SECONDS) and rerun to show it
+poll_job(st, job, JOB_POLL_SECONDS)
+
 # Note:
-# - Make sure you set the GROQ_API_KEY in your environment variables.
+# - Make sure you set the GROQ_API_KEY in your environment variables (or the key of the provider set in CV_PROVIDER).
@@ -1,19 +1,40 @@
 import os
+import threading
+import time
+import uuid
 import streamlit as st
-import openai
-import random
-from fpdf import FPDF
 from dotenv import load_dotenv
-import faker
-import zipfile
-from io import BytesIO
-import glob
+
+from cv_generator import generation, openai_batch
+from cv_generator.archive import CVArchive
+from cv_generator.estimator import estimate_run, get_usage_history, max_cvs_for_budget
+from cv_generator.identities import generate_identities
+from cv_generator.jobs import CANCELLED, Requeue, get_job_queue
+from cv_generator.metrics import get_stats_sink
+from cv_generator.pdf import cv_filename
+from cv_generator.planner import Combination
+from cv_generator.providers import get_client, get_provider
+from cv_generator.ratelimit import get_rate_limiter
+from cv_generator.render_pool import get_render_pool
+from cv_generator.results import STATUS_FILTERS, ResultEntry
+from cv_generator.results_view import poll_job, session_batches, show_job_progress, show_result_entries
+from cv_generator.roles import EXPERIENCE_LEVELS, JOB_ROLES
+from cv_generator.workspace import get_workspace_registry, parse_session_id
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Set up the OpenAI client with API key
-openai.api_key = os.environ.get("OPENAI_API_KEY")
+# Chat client of the configured provider (CV_PROVIDER: openai by default, or groq, local, fake).
+# It is created once per process, so reruns and sessions share its warm connections.
+provider = get_provider(os.environ.get("CV_PROVIDER", "openai"))
+client = get_client(provider.name)
+
+# Seconds between two refreshes of a running batch's progress
+JOB_POLL_SECONDS = 1.0
+
+# Pipeline timings, token usage, retries and errors for the stats panel
+# (CV_METRICS_JSONL and CV_METRICS_PORT add a JSONL log and a Prometheus endpoint)
+pipeline_stats = get_stats_sink()
 
 # Streamlit App
 st.title("🌟 Random CV Generator")
@@ -39,157 +60,178 @@ st.markdown("---")
 
 # Input form for the job role and other details
 location = st.text_input("🌍 Enter the location:", value="Saudi Arabia")
-experience_level = st.selectbox("🔧 Select the experience level:", ["High", "Low", "Random"], index=2)
-num_cvs = st.number_input("📄 Enter the number of CVs to generate:", min_value=1, max_value=50, value=5)
+experience_level = st.selectbox("🔧 Select the experience level:", EXPERIENCE_LEVELS, index=2)
+# The batch size is capped by how many CVs fit in the budget (CV_BUDGET_USD by default) at the estimated cost per CV
+usage_history = get_usage_history()
+budget = st.number_input("💰 Budget for this batch (USD):", min_value=0.0, value=float(os.environ.get("CV_BUDGET_USD", "1.0")), step=0.5)
+cv_estimate = estimate_run([Combination(max(JOB_ROLES, key=len), location, experience_level, 1, provider.name)], provider.name, provider.model, history=usage_history)
+max_cvs = max(1, max_cvs_for_budget(cv_estimate.cost_per_cv, budget))
+num_cvs = st.number_input("📄 Enter the number of CVs to generate:", min_value=1, max_value=max_cvs, value=min(5, max_cvs))
+use_batch_api = provider.supports_batch and st.checkbox("🕒 Submit as an OpenAI Batch job (half the cost, results can take up to 24h)", value=False)
 
 # List of common job roles to choose from
-job_roles = [
-    "Software Engineer", "Data Scientist", "Security Data Scientist", "Product Manager", "Project Coordinator", "Marketing Specialist",
-    "Sales Executive", "Financial Analyst", "Human Resources Manager", "Graphic Designer", "Content Writer",
-    "Customer Service Representative", "Business Analyst", "Accountant", "UX/UI Designer", "Network Administrator",
-    "IT Support Specialist", "Operations Manager", "Administrative Assistant", "Legal Advisor", "Quality Assurance Tester",
-    "Mechanical Engineer", "Electrical Engineer", "Civil Engineer", "Biomedical Engineer", "Chemical Engineer",
-    "Systems Analyst", "Database Administrator", "DevOps Engineer", "Full Stack Developer", "Backend Developer",
-    "Frontend Developer", "Cloud Architect", "Machine Learning Engineer", "AI Researcher", "Cybersecurity Specialist",
-    "SEO Specialist", "Content Strategist", "Social Media Manager", "Public Relations Specialist", "Event Planner",
-    "Supply Chain Manager", "Procurement Specialist", "Warehouse Manager", "Retail Store Manager", "Fitness Trainer",
-    "Nutritionist", "Psychologist", "Teacher", "School Principal", "Professor", "Research Scientist", "Lab Technician",
-    "Nurse", "Doctor", "Paramedic", "Pharmacist", "Veterinarian", "Pilot", "Chef",
-]
+job_roles = JOB_ROLES
 job_role = st.selectbox("💼 Select the job role:", job_roles)
 
-def generate_cvs_batch(roles, names, emails, phone_numbers, locations, experience_levels):
-    """
-    Function to generate multiple CVs using OpenAI's Batch API
-    """
-    messages = [
-        {
-            "role": "user",
-            "content": (
-                f"Generate a CV for the role of {role}.\n"
-                f"Location: {location}\n"
-                f"Name: {name}\n"
-                f"Email: {email}\n"
-                f"Phone Number: {phone_number}\n"
-                f"Years of Experience: value should be an integer number based on {experience_level} number of years\n"
-            )
-        }
-        for role, name, email, phone_number, location, experience_level in zip(roles, names, emails, phone_numbers, locations, experience_levels)
-    ]
-
-    # Generate each CV sequentially
-    responses = []
-    for message in messages:
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[message],
-            )
-            responses.append(response.choices[0].message["content"])
-        except Exception as e:
-            responses.append(f"Error generating CV: {e}")
-    return responses
-
-def save_cv_as_pdf(cv_content, filename):
-    """
-    Function to save CV content to a PDF file with improved formatting
-    """
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-
-    # Title section of the PDF
-    pdf.set_font("Arial", 'B', 16)
-    pdf.set_text_color(0, 102, 204)  # Blue color for title
-    pdf.cell(0, 10, "Curriculum Vitae", ln=True, align='C')
-    pdf.ln(10)
-
-    # Add a decorative line below the title
-    pdf.set_draw_color(0, 102, 204)
-    pdf.set_line_width(0.5)
-    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-    pdf.ln(10)
-
-    # Content Sections
-    sections = cv_content.split('\n')
-    current_section = ""
-    for line in sections:
-        if line.endswith(":"):
-            # New section heading detected
-            current_section = line.strip()
-            pdf.set_font("Arial", 'B', 12)
-            pdf.set_text_color(0, 51, 102)  # Dark blue color for section headings
-            pdf.cell(0, 10, current_section, ln=True)
-            pdf.set_font("Arial", size=12)
-            pdf.set_text_color(0, 0, 0)  # Reset color to black for content
-        else:
-            # Content under the current section
-            pdf.multi_cell(0, 10, line.strip())
-        pdf.ln(5)
-
-    # Save the PDF to the given filename
-    pdf.output(filename)
+# Pre-flight estimate of the batch: tokens, cost, and time against the rate limits (Batch API jobs at half the price)
+estimate_provider = "openai-batch" if use_batch_api else provider.name
+estimate = estimate_run(
+    [Combination(job_role, location, experience_level, num_cvs, estimate_provider)], estimate_provider, provider.model,
+    rate_limiter=get_rate_limiter(provider.name), history=usage_history,
+)
+st.info(f"📐 Estimate: {estimate.summary()}")
 
-def delete_old_pdfs():
-    """
-    Function to delete all old PDF files in the current working directory
-    """
-    old_pdfs = glob.glob("*.pdf")
-    for pdf in old_pdfs:
-        try:
-            os.remove(pdf)
-        except Exception as e:
-            st.warning(f"Could not delete {pdf}: {e}")
+# The session id is kept in the URL next to the job id, so a reloaded page finds the session's batches again
+session_id = st.session_state.setdefault("session_id", parse_session_id(st.query_params.get("session")) or uuid.uuid4().hex)
+st.query_params["session"] = session_id
 
 # Generate CVs button
 if st.button("✨ Generate Random CVs"):
-    # Delete old PDF files before generating new ones
-    delete_old_pdfs()
-    if job_role:
-        with st.spinner('⏳ Generating CVs, please wait...'):
-            random_hashes = [str(random.randint(1000, 9999)) for _ in range(num_cvs)]  # Generate random hashes for email uniqueness
-            fake = faker.Faker()
-            random_names = [fake.name() for _ in range(num_cvs)]  # Generate random names
-            random_emails = [f"{name.replace(' ', '.').lower()}{hash_}@example.com" for name, hash_ in zip(random_names, random_hashes)]  # Generate random emails
-            random_phone_numbers = [fake.phone_number() for _ in range(num_cvs)]  # Generate random phone numbers
-            random_locations = [location for _ in range(num_cvs)]  # Use the specified location for all CVs
-            experience_levels = [experience_level for _ in range(num_cvs)]  # Use the specified experience level for all CVs
-            
-            # Generate the CV content using the OpenAI Batch API
-            generated_cvs = generate_cvs_batch(
-                roles=[job_role] * num_cvs,
-                names=random_names,
-                emails=random_emails,
-                phone_numbers=random_phone_numbers,
-                locations=random_locations,
-                experience_levels=experience_levels
+    # Each browser session gets its own workspace, so concurrent users never touch each other's files
+    workspace = get_workspace_registry().get(session_id)
+    if estimate.cost > budget:
+        st.error(f"⚠️ The estimated cost ${estimate.cost:.4f} exceeds the budget of ${budget:.2f}.")
+    elif job_role:
+        random_names, random_emails, random_phone_numbers = generate_identities(num_cvs, location)  # Generate random names, emails and phone numbers local to the location
+        
+        # Each CV's PDF goes into a ZIP file to download all CVs
+        cv_paths = [cv_filename(job_role, idx + 1, random_names[idx]) for idx in range(num_cvs)]
+        cv_archive = CVArchive(spool=True, spool_dir=workspace.path)
+        archive_lock = threading.Lock()
+        # Token usage and API time of the CVs, recorded once the batch is done
+        usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "api_seconds": 0.0}
+        rate_limiter = get_rate_limiter(provider.name)
+        
+        def render_cvs(completed_cvs):
+            """
+            Function to render (index, cv) pairs in the render worker processes and add their PDFs to the ZIP file
+            """
+            futures = [(idx, cv, get_render_pool().submit(cv)) for idx, cv in completed_cvs]
+            for idx, cv, future in futures:
+                pdf_bytes = future.result()
+                with archive_lock:
+                    cv_archive.add(cv_paths[idx], pdf_bytes)
+            return [(idx, cv) for idx, cv, _ in futures]
+        
+        def run_task(idx):
+            """
+            Function to generate and render one CV (with one chat completion request) on a job worker
+            """
+            result = generation.generate_cv_result(
+                client, job_role, random_names[idx], random_emails[idx], random_phone_numbers[idx], location, experience_level,
+                model=provider.model, rate_limiter=rate_limiter,
+            )
+            if result.completion_tokens is not None:
+                with archive_lock:
+                    usage["calls"] += 1
+                    usage["prompt_tokens"] += result.prompt_tokens or 0
+                    usage["completion_tokens"] += result.completion_tokens
+                    usage["api_seconds"] += result.elapsed
+            return render_cvs([(idx, result.content)])
+        
+        # The OpenAI Batch API job of this batch: its id once submitted, and the delay before its next check
+        remote_batch = {"id": None, "delay": openai_batch.BATCH_POLL_SECONDS, "submitted_at": None}
+        
+        def run_batch_api(_):
+            """
+            Function to take one step of the OpenAI Batch API job: submit it, check on it, or render every CV once it ended.
+            Between two checks the task is requeued with backoff, so a batch taking up to 24h never holds a job worker.
+            """
+            if remote_batch["id"] is None:
+                messages = openai_batch.build_cv_messages(
+                    [job_role] * num_cvs, random_names, random_emails, random_phone_numbers, [location] * num_cvs, [experience_level] * num_cvs,
+                )
+                remote_batch["id"] = openai_batch.submit_cv_batch(client, messages, model=provider.model).id
+                remote_batch["submitted_at"] = time.perf_counter()
+                raise Requeue(remote_batch["delay"])
+            batch = openai_batch.check_batch(client, remote_batch["id"])
+            if batch.status not in openai_batch.BATCH_TERMINAL_STATUSES:
+                delay = remote_batch["delay"]
+                remote_batch["delay"] = min(delay * 2, openai_batch.MAX_BATCH_POLL_SECONDS)
+                raise Requeue(delay)
+            usage["api_seconds"] = time.perf_counter() - remote_batch["submitted_at"]
+            cvs = openai_batch.assemble_cvs(
+                openai_batch.collect_batch_results(client, batch, num_cvs, usage=usage),
+                random_names, random_emails, random_phone_numbers, [location] * num_cvs,
+            )
+            return render_cvs(enumerate(cvs))
+        
+        def finish_batch(job):
+            """
+            Function to package the ZIP and record the actual usage next to the estimate, so later estimates are calibrated on it
+            """
+            usage_history.record(
+                estimate, usage["calls"], usage["prompt_tokens"], usage["completion_tokens"], usage["api_seconds"], time.time() - job.created_at,
             )
-            
-            # Create a ZIP file to download all CVs
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-                for idx, cv in enumerate(generated_cvs):
-                    filename = f"cv_{job_role}_{idx + 1}_{random_names[idx].replace(' ', '_')}.pdf"
-                    save_cv_as_pdf(cv, filename)
-                    st.subheader(f"CV {idx + 1} of {num_cvs}")
-                    st.text_area("", cv, height=300)
-                    st.text(f"Saved as: {filename}")
-                    zip_file.write(filename)
-            
-            # Provide a download button for the ZIP file
-            st.markdown("---")
-            st.download_button(
-                label="📦 Download All CVs as ZIP",
-                data=zip_buffer.getvalue(),
-                file_name="generated_cvs.zip",
-                mime="application/zip"
+            job.output = {"zip": cv_archive.getvalue()}
+        
+        def release_batch(job):
+            """
+            Function to remove the spooled ZIP and let the workspace expire, however the batch ended.
+            A cancelled Batch API job is cancelled on OpenAI's side too.
+            """
+            try:
+                if job.status == CANCELLED and remote_batch["id"] is not None:
+                    openai_batch.cancel_batch(client, remote_batch["id"])
+            finally:
+                cv_archive.discard()
+                workspace.unpin()
+        
+        # The batch runs on the shared job workers (one request per CV, or one task checking on the Batch API job)
+        # and the page only polls it. The job id is kept in the URL, so the batch can be picked up again after a page reload.
+        # The workspace holding the spooled ZIP is kept until the batch ends (Batch API jobs can take up to 24h)
+        batch_metadata = {"role": job_role, "paths": cv_paths}
+        workspace.pin()
+        if use_batch_api:
+            job = get_job_queue().submit(session_id, [None], run_batch_api, on_done=finish_batch, on_finish=release_batch, metadata=batch_metadata)
+        else:
+            job = get_job_queue().submit(
+                session_id, range(num_cvs), run_task, max_in_flight=generation.DEFAULT_CONCURRENCY, on_done=finish_batch, on_finish=release_batch, metadata=batch_metadata,
             )
+        st.session_state["job_id"] = job.job_id
+        st.query_params["job"] = job.job_id
     else:
         st.error("⚠️ Please enter a job role to generate CVs.")
 
+# Progress and results of the session's batch (or of the batch in the URL), polled while it runs
+job_id = st.query_params.get("job") or st.session_state.get("job_id")
+job = get_job_queue().get(job_id) if job_id else None
+if job is not None:
+    show_job_progress(st, get_job_queue(), job, sum(len(pairs) for _, pairs in job.results()), len(job.metadata["paths"]))
+    
+    # The CVs of the session's batches, in order whatever order they complete in (this app does not check for near-duplicates)
+    entries = [
+        ResultEntry(batch.job_id, idx + 1, len(batch.metadata["paths"]), batch.metadata["role"], batch.metadata["paths"][idx], cv)
+        for batch in session_batches(get_job_queue(), session_id, job)
+        for idx, cv in sorted(pair for _, pairs in batch.results() for pair in pairs)
+    ]
+    show_result_entries(st, entries, statuses=[status for status in STATUS_FILTERS if status != "Near-duplicates"])
+    
+    if job.status == CANCELLED:
+        st.info("🛑 The batch was cancelled.")
+    elif job.error is not None:
+        st.error(f"⚠️ The batch failed: {job.error}")
+    elif job.finished:
+        # Provide a download button for the ZIP file once every CV is in it
+        st.markdown("---")
+        st.download_button(
+            label="📦 Download All CVs as ZIP",
+            data=job.output["zip"],
+            file_name="generated_cvs.zip",
+            mime="application/zip"
+        )
+
+        # Time spent in each stage of the pipeline, over the recent CVs of every session of this process
+        with st.expander("📊 Pipeline stats"):
+            st.table(pipeline_stats.summary())
+            st.json(pipeline_stats.counters())
+
 # Footer
 st.markdown("---")
 st.markdown("Built with ❤️ and Gen-AI by [waqasobeidy@gmail.com](mailto:waqasobeidy@gmail.com)")
 
+# While the batch runs, wait for its next CV (at most JOB_POLL_SECONDS) and rerun to show it
+poll_job(st, job, JOB_POLL_SECONDS)
+
 # Note:
-# - Make sure you set the OPENAI_API_KEY in your environment variables.
+# - Make sure you set the OPENAI_API_KEY in your environment variables (or the key of the provider set in CV_PROVIDER).
@@ -0,0 +1,19 @@
+"""
+Random CV Generator core: CV generation, PDF rendering and the headless command line interface.
+
+Nothing in this package imports Streamlit, and the Groq/OpenAI/Faker libraries are only
+imported when a client or identity batch is actually created, so batch jobs start quickly.
+"""
+from cv_generator.roles import EXPERIENCE_LEVELS, JOB_ROLES
+from cv_generator.generation import GROQ_MODEL, create_groq_client, generate_cv, generate_cvs_concurrently
+from cv_generator.pdf import save_cv_as_pdf
+
+__all__ = [
+    "EXPERIENCE_LEVELS",
+    "GROQ_MODEL",
+    "JOB_ROLES",
+    "create_groq_client",
+    "generate_cv",
+    "generate_cvs_concurrently",
+    "save_cv_as_pdf",
+]
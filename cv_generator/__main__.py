@@ -0,0 +1,5 @@
+import sys
+
+from cv_generator.cli import main
+
+sys.exit(main())
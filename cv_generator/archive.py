@@ -0,0 +1,88 @@
+"""
+ZIP packaging of rendered CVs
+"""
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+
+from cv_generator.metrics import ZIP, get_metrics
+
+# Archives larger than this are spilled from memory to a temporary file when spooling is enabled
+DEFAULT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+class CVArchive:
+    """
+    ZIP archive that PDFs are added to as soon as each CV is rendered.
+
+    By default the archive is built in memory. With spool=True it is built in a
+    SpooledTemporaryFile that moves to disk once it grows past spool_max_size, and
+    with target set it is written straight to that path or binary file object.
+    Either way no intermediate PDF files are written.
+    """
+
+    def __init__(self, target=None, spool=False, spool_max_size=DEFAULT_SPOOL_MAX_SIZE, spool_dir=None, compression=zipfile.ZIP_STORED):
+        self._owns_file = False
+        self._temporary = target is None
+        if target is None:
+            self._file = tempfile.SpooledTemporaryFile(max_size=spool_max_size, dir=spool_dir) if spool else BytesIO()
+        elif isinstance(target, (str, bytes)) or hasattr(target, "__fspath__"):
+            self._file = open(target, "wb")
+            self._owns_file = True
+        else:
+            self._file = target
+        self._zip = zipfile.ZipFile(self._file, "w", compression=compression)
+        self.names = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, filename, pdf_bytes):
+        """
+        Function to add one rendered PDF to the archive
+        """
+        start = time.perf_counter()
+        self._zip.writestr(filename, pdf_bytes)
+        self.names.append(filename)
+        get_metrics().timing(ZIP, time.perf_counter() - start)
+
+    def close(self):
+        """
+        Function to write the ZIP central directory; the archive is complete after this
+        """
+        if self._zip.fp is not None:
+            self._zip.close()
+            if self._owns_file:
+                self._file.close()
+
+    def discard(self):
+        """
+        Function to release the archive's file once its content is no longer needed (removing a spooled temporary file)
+        """
+        self.close()
+        if self._temporary:
+            self._file.close()
+
+    def open(self):
+        """
+        Function to finish the archive and return its file object positioned at the start
+        """
+        self.close()
+        self._file.seek(0)
+        return self._file
+
+    def getvalue(self):
+        """
+        Function to finish the archive and return its content as bytes
+        """
+        if isinstance(self._file, BytesIO):
+            self.close()
+            return self._file.getvalue()
+        return self.open().read()
@@ -0,0 +1,119 @@
+"""
+On-disk cache of generated CVs keyed by the request that produced them
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = ".cv_cache"
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of LLM responses.
+
+    Entries are keyed by a hash of (model, messages, sampling params) plus a variant slot,
+    so the n-th CV of a batch replays the n-th cached answer for the same prompt.
+    The least recently used entries are evicted past max_entries, and entries older
+    than ttl seconds are treated as misses.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES, ttl=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Index of the entries on disk, least recently used first
+        self._index = OrderedDict(
+            (entry.name[:-len(".json")], entry.stat().st_mtime)
+            for entry in sorted(os.scandir(directory), key=lambda e: e.stat().st_mtime)
+            if entry.name.endswith(".json")
+        )
+
+    @staticmethod
+    def make_key(model, messages, params=None, variant=0):
+        """
+        Function to build the cache key of a request
+        """
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params or {}, "variant": variant},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """
+        Function to return the cached content for a key, or None on a miss
+        """
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._index.pop(key, None)
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return entry["content"]
+
+    def set(self, key, content):
+        """
+        Function to store content under a key, evicting the least recently used entries if the cache is full
+        """
+        data = json.dumps({"created": time.time(), "content": content}, ensure_ascii=False)
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        with self._lock:
+            os.replace(tmp_path, self._path(key))
+            self._index[key] = time.time()
+            self._index.move_to_end(key)
+            while len(self._index) > self.max_entries:
+                self._remove(next(iter(self._index)))
+
+    def _remove(self, key):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """
+        Function to remove every entry from the cache
+        """
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+
+    def __len__(self):
+        return len(self._index)
+
+    def stats(self):
+        """
+        Function to return the hit/miss counters and the number of entries
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._index)}
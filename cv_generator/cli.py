@@ -0,0 +1,366 @@
+"""
+Headless command line interface: python -m cv_generator --role "Data Scientist" --count 20,
+or python -m cv_generator --spec jobs.yaml for many role x location x experience combinations
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from dataclasses import asdict, replace
+
+from cv_generator.archive import CVArchive
+from cv_generator.cache import ResponseCache
+from cv_generator.dedup import DEFAULT_THRESHOLD, DedupIndex, dedup_results
+from cv_generator.estimator import UsageHistory, estimate_run, max_cvs_for_budget, token_cost
+from cv_generator.exporters import EXPORT_FORMATS, FILE_FORMATS, CVExporter, ExportError, parse_formats
+from cv_generator.generation import DEFAULT_CONCURRENCY, generate_cv_result
+from cv_generator.manifest import JobManifest, split_resumed_work
+from cv_generator.metrics import JSONLSink, PrometheusSink, StatsSink, get_metrics
+from cv_generator.planner import BATCH_PROVIDERS, PROVIDERS, Combination, JobSpec, JobSpecError, client_for, iter_work_results, load_job_spec, plan_work
+from cv_generator.providers import get_provider
+from cv_generator.ratelimit import RetryPolicy, get_rate_limiter, rate_limiter_from_env
+from cv_generator.render_pool import PDFRenderPool, render_as_completed
+from cv_generator.roles import EXPERIENCE_LEVELS
+
+
+def build_parser():
+    """
+    Function to build the argument parser for the command line interface
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m cv_generator",
+        description="Generate random CVs as PDF files without starting the Streamlit app.",
+    )
+    parser.add_argument("--role", default="Software Engineer", help="job role to generate CVs for")
+    parser.add_argument("--location", default="Saudi Arabia", help="location of the candidates")
+    parser.add_argument("--experience-level", choices=EXPERIENCE_LEVELS, default="Random", help="experience level of the candidates")
+    parser.add_argument("--count", type=int, default=5, help="number of CVs to generate")
+    parser.add_argument("--spec", metavar="PATH", help="YAML or JSON job specification of role x location x experience combinations (replaces --role, --location, --experience-level, --count and --provider)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="maximum number of API calls in flight (chat providers)")
+    parser.add_argument("--output-dir", default="generated_cvs", help="directory the PDF files are written to")
+    parser.add_argument("--zip", metavar="PATH", help="write the PDFs into this ZIP file as they finish instead of into --output-dir")
+    parser.add_argument("--formats", help=f"comma-separated export formats ({', '.join(EXPORT_FORMATS)}); default pdf, or the formats of --spec")
+    parser.add_argument("--provider", choices=PROVIDERS, default=os.environ.get("CV_PROVIDER", "groq"), help="API used to generate the CVs (fake runs offline; local is an OpenAI-compatible server at LOCAL_LLM_BASE_URL)")
+    parser.add_argument("--render-workers", type=int, help="PDF render processes (default: one per CPU, 0 renders in-process)")
+    parser.add_argument("--rpm", type=float, help="requests-per-minute budget of each provider (default: <PROVIDER>_RPM)")
+    parser.add_argument("--tpm", type=float, help="tokens-per-minute budget of each provider (default: <PROVIDER>_TPM)")
+    parser.add_argument("--max-attempts", type=int, default=4, help="attempts per CV before giving up on transient errors")
+    parser.add_argument("--cache-dir", help="replay CVs from an on-disk response cache in this directory (chat providers)")
+    parser.add_argument("--cache-ttl", type=float, help="seconds after which cached CVs are regenerated")
+    parser.add_argument("--fresh", action="store_true", help="ignore cached CVs and store freshly generated ones")
+    parser.add_argument("--structured", action="store_true", help="ask for the CV sections as JSON and lay the PDFs out from them (chat providers)")
+    parser.add_argument("--dedup", choices=["off", "flag", "regenerate"], default="flag", help="check each CV against the batch for near-duplicates and report them (flag) or regenerate them (regenerate)")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_THRESHOLD, help="estimated Jaccard similarity of the CV sections above which a CV is a near-duplicate")
+    parser.add_argument("--manifest", metavar="PATH", help="record progress in this SQLite file; rerunning an interrupted job resumes it, only calling the API for missing or failed CVs")
+    parser.add_argument("--metrics-jsonl", metavar="PATH", help="append stage timings, token usage, retries and errors to this JSONL file")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics at http://localhost:PORT/metrics while the run lasts")
+    parser.add_argument("--stats", action="store_true", help="print the time spent in each pipeline stage at the end of the run")
+    parser.add_argument("--budget", type=float, help="maximum estimated cost of the run in USD; the run stops before any API call when the estimate is higher")
+    parser.add_argument("--estimate", action="store_true", help="print the estimated tokens, cost and time of the run and exit without generating")
+    parser.add_argument("--usage-db", metavar="PATH", help="SQLite file of estimated and actual usage of past runs, used to calibrate estimates (default: CV_USAGE_DB or ~/.cache/cv_generator/usage.db)")
+    parser.add_argument("--seed", type=int, help="seed for the candidate names, emails and phone numbers")
+    return parser
+
+
+def main(argv=None):
+    """
+    Function to run the command line interface, returning the process exit code
+    """
+    # Load environment variables from a .env file when python-dotenv is available
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+
+    args = build_parser().parse_args(argv)
+    if args.count < 1:
+        print("--count must be at least 1", file=sys.stderr)
+        return 2
+    if args.max_attempts < 1:
+        print("--max-attempts must be at least 1", file=sys.stderr)
+        return 2
+    if args.render_workers is not None and args.render_workers < 0:
+        print("--render-workers must not be negative", file=sys.stderr)
+        return 2
+    if args.concurrency < 1:
+        print("--concurrency must be at least 1", file=sys.stderr)
+        return 2
+    if args.budget is not None and args.budget < 0:
+        print("--budget must not be negative", file=sys.stderr)
+        return 2
+    if not 0 < args.dedup_threshold <= 1:
+        print("--dedup-threshold must be between 0 and 1", file=sys.stderr)
+        return 2
+
+    if args.spec:
+        try:
+            spec = load_job_spec(args.spec)
+        except (OSError, JobSpecError) as e:
+            print(f"Invalid job specification: {e}", file=sys.stderr)
+            return 2
+        if args.seed is not None and spec.seed is None:
+            spec.seed = args.seed
+    else:
+        spec = JobSpec([Combination(args.role, args.location, args.experience_level, args.count, args.provider)], seed=args.seed)
+    if args.formats:
+        try:
+            spec.formats = parse_formats(args.formats)
+        except ExportError as e:
+            print(f"--formats: {e}", file=sys.stderr)
+            return 2
+    spec.concurrency = {provider: spec.concurrency.get(provider, args.concurrency) for provider in PROVIDERS}
+
+    # Stage timings, tokens, retries and errors go to the requested metric sinks for this run
+    sinks = []
+    if args.metrics_jsonl:
+        sinks.append(JSONLSink(args.metrics_jsonl))
+    if args.metrics_port:
+        prometheus = PrometheusSink()
+        server = prometheus.serve(args.metrics_port)
+        sinks.append(prometheus)
+    if args.stats:
+        stats = StatsSink()
+        sinks.append(stats)
+    try:
+        with get_metrics().attached(*sinks):
+            exit_code = run(args, spec)
+    finally:
+        for sink in sinks:
+            if isinstance(sink, JSONLSink):
+                sink.close()
+        if args.metrics_port:
+            server.shutdown()
+            server.server_close()
+    if args.stats:
+        print_stats(stats)
+    return exit_code
+
+
+def print_stats(stats):
+    """
+    Function to print the time spent in each pipeline stage and the counters of a run
+    """
+    print(f"{'stage':<16}{'count':>8}{'total s':>10}{'mean s':>10}{'p50 s':>10}{'p95 s':>10}{'max s':>10}")
+    for row in stats.summary():
+        print(
+            f"{row['stage']:<16}{row['count']:>8}{row['total_s']:>10.3f}{row['mean_s']:>10.4f}"
+            f"{row['p50_s']:>10.4f}{row['p95_s']:>10.4f}{row['max_s']:>10.4f}"
+        )
+    for name, value in stats.counters().items():
+        print(f"{name}: {value}")
+
+
+def model_of(provider):
+    """
+    Function to return the model a provider (or a Batch API provider's chat provider) generates with
+    """
+    return get_provider(BATCH_PROVIDERS.get(provider, provider)).model
+
+
+def remaining_combinations(items, provider):
+    """
+    Function to count a provider's work items per combination, returning combinations with those counts
+    """
+    counts = {}
+    for item in items:
+        if item.combination.provider == provider:
+            entry = counts.setdefault(id(item.combination), [item.combination, 0])
+            entry[1] += 1
+    return [replace(combination, count=count) for combination, count in counts.values()]
+
+
+def run(args, spec):
+    """
+    Function to generate, render and write the CVs of a job specification, returning the process exit code
+    """
+    # One work queue over every combination; spec runs write each combination into its own folder
+    work = plan_work(spec, per_combination_folders=bool(args.spec))
+    destination = args.zip or args.output_dir
+
+    # With a manifest, CVs that already have a stored answer (or a written file) are not sent to the API again
+    manifest = JobManifest(args.manifest) if args.manifest else None
+    written, stored = [], []
+    remaining = work
+    if manifest is not None:
+        job_id, resumed = manifest.start_job({
+            "combinations": [asdict(combination) for combination in spec.combinations],
+            "seed": spec.seed,
+            "structured": args.structured,
+            "destination": os.path.abspath(destination),
+            "formats": spec.formats,
+        })
+        work = manifest.add_items(job_id, work)
+        # A new ZIP file and new dataset files are written on every run, so every stored answer is exported again
+        rewritten = args.zip or not any(name in FILE_FORMATS for name in spec.formats)
+        written, stored, remaining = split_resumed_work(
+            manifest, job_id, work, artifact_exists=(lambda path: False) if rewritten else os.path.exists,
+        )
+        if resumed:
+            print(f"Resuming job {job_id}: {len(written) + len(stored)} of {len(work)} CVs already generated")
+
+    # Pre-flight estimate of the CVs still to generate, checked against the budget before any API call
+    providers = {item.combination.provider for item in remaining}
+    # Each provider has its own budgets, from its <PROVIDER>_RPM and <PROVIDER>_TPM variables unless --rpm or --tpm is given
+    rate_limiters = {
+        provider: get_rate_limiter(provider) if args.rpm is None and args.tpm is None else rate_limiter_from_env(provider, args.rpm, args.tpm)
+        for provider in providers
+    }
+    history = UsageHistory(args.usage_db)
+    estimates = {
+        provider: estimate_run(
+            remaining_combinations(remaining, provider), provider, model_of(provider), structured=args.structured,
+            concurrency=spec.concurrency[provider], rate_limiter=rate_limiters[provider], history=history,
+        )
+        for provider in sorted(providers)
+    }
+    for estimate in estimates.values():
+        print(f"Estimate: {estimate.summary()}")
+    estimated_cost = sum(estimate.cost for estimate in estimates.values())
+    over_budget = args.budget is not None and estimated_cost > args.budget
+    if over_budget:
+        fits = max_cvs_for_budget(estimated_cost / len(remaining), args.budget, ceiling=len(remaining))
+        print(f"The estimated cost ${estimated_cost:.4f} exceeds --budget ${args.budget:.2f}: about {fits} of {len(remaining)} CVs fit", file=sys.stderr)
+    if args.estimate or over_budget:
+        history.close()
+        if manifest is not None:
+            manifest.close()
+        return 2 if over_budget else 0
+
+    if args.zip:
+        cv_archive = CVArchive(target=args.zip)
+        dataset_dir, dataset_name = os.path.dirname(args.zip), os.path.splitext(os.path.basename(args.zip))[0]
+    else:
+        cv_archive = None
+        os.makedirs(args.output_dir, exist_ok=True)
+        dataset_dir, dataset_name = args.output_dir, "cvs"
+
+    def write_file(relpath, data):
+        if cv_archive is not None:
+            cv_archive.add(relpath, data)
+        else:
+            path = os.path.join(destination, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+    # Every CV is written in each selected format as it finishes
+    exporter = CVExporter(spec.formats, write_file, dataset_dir=dataset_dir, dataset_name=dataset_name)
+
+    clients = {provider: client_for(provider, concurrency=spec.concurrency[provider]) for provider in providers}
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    retry_policy = RetryPolicy(max_attempts=args.max_attempts)
+    generated_cvs = iter_work_results(
+        remaining,
+        clients,
+        concurrency=spec.concurrency,
+        manifest=manifest,
+        job_id=job_id if manifest is not None else None,
+        cache=cache,
+        refresh=args.fresh,
+        rate_limiters=rate_limiters,
+        retry_policy=retry_policy,
+        structured=args.structured,
+    )
+
+    def record(results):
+        for item, result in results:
+            if manifest is not None:
+                manifest.record_result(job_id, item, result)
+            yield item, result
+
+    completed_cvs = itertools.chain(stored, record(generated_cvs))
+
+    def regenerate(item):
+        # A fresh call without the cache; Batch API CVs cannot be regenerated one at a time
+        provider = item.combination.provider
+        if provider in BATCH_PROVIDERS or provider not in clients:
+            return None
+        result = generate_cv_result(
+            clients[provider], item.combination.role, item.name, item.email, item.phone_number,
+            item.combination.location, item.combination.experience_level, model=get_provider(provider).model,
+            rate_limiter=rate_limiters[provider], retry_policy=retry_policy, structured=args.structured,
+        )
+        if manifest is not None and result.ok:
+            manifest.record_result(job_id, item, result)
+        return result
+
+    # Each CV is compared with the CVs before it as it arrives
+    dedup_index = None
+    if args.dedup != "off":
+        dedup_index = DedupIndex(threshold=args.dedup_threshold)
+        completed_cvs = dedup_results(completed_cvs, dedup_index, regenerate=regenerate if args.dedup == "regenerate" else None)
+
+    # Each PDF is rendered in a worker process and every format is written out as soon as its CV is ready
+    failures = 0
+    retries = 0
+    prompt_tokens = completion_tokens = 0
+    api_seconds = 0.0
+    # Actual API calls, prompt and completion tokens and API seconds per provider, to compare with the estimates
+    usage = {provider: [0, 0, 0, 0.0] for provider in estimates}
+    start = time.perf_counter()
+    with PDFRenderPool(args.render_workers if exporter.needs_pdf else 0) as render_pool, exporter:
+        if exporter.needs_pdf:
+            exported_cvs = render_as_completed(completed_cvs, render_pool)
+        else:
+            exported_cvs = ((item, result, None) for item, result in completed_cvs)
+        for item, result, pdf_bytes in exported_cvs:
+            if not result.ok:
+                failures += 1
+                print(f"{item.path}: {result.content} (after {result.attempts} attempts)", file=sys.stderr)
+            elif result.duplicate_of is not None:
+                print(f"{item.path}: near-duplicate of {result.duplicate_of.path} (similarity {result.similarity:.2f})", file=sys.stderr)
+            retries += max(0, result.attempts - 1)
+            prompt_tokens += result.prompt_tokens or 0
+            completion_tokens += result.completion_tokens or 0
+            api_seconds += result.elapsed
+            if result.completion_tokens is not None and not result.cached and item.combination.provider in usage:
+                provider_usage = usage[item.combination.provider]
+                provider_usage[0] += 1
+                provider_usage[1] += result.prompt_tokens or 0
+                provider_usage[2] += result.completion_tokens
+                provider_usage[3] += result.elapsed
+            files = exporter.export(
+                item.path, result, pdf_bytes, role=item.combination.role, location=item.combination.location,
+                experience_level=item.combination.experience_level, provider=item.combination.provider,
+            )
+            path = os.path.join(destination, files[0]) if files else os.path.join(destination, item.path)
+            if manifest is not None and result.ok:
+                manifest.record_artifact(job_id, item, path)
+            if files:
+                print(f"Saved as: {', '.join(os.path.join(destination, file) for file in files)}")
+    if cv_archive is not None:
+        cv_archive.close()
+    seconds = time.perf_counter() - start
+    # Actual usage is recorded next to the estimates, so the next estimates are calibrated on it
+    for provider, estimate in estimates.items():
+        calls, provider_prompt, provider_completion, provider_api_seconds = usage[provider]
+        history.record(estimate, calls, provider_prompt, provider_completion, provider_api_seconds, seconds)
+        if calls:
+            actual_cost = token_cost(provider, provider_prompt, provider_completion)
+            print(
+                f"Actual ({provider}): {provider_prompt} prompt + {provider_completion} completion tokens over {calls} calls, "
+                f"${actual_cost:.4f} in {seconds:.1f}s (estimated ${estimate.cost:.4f} for {estimate.cvs} CVs)"
+            )
+    history.close()
+    if manifest is not None:
+        if not manifest.finish_job(job_id):
+            print(f"Job {job_id} is incomplete; run the same command again to retry the missing CVs", file=sys.stderr)
+        manifest.close()
+
+    print(f"Generated {len(work) - failures} of {len(work)} CVs in {destination} ({retries} retries)")
+    for writer in exporter.datasets.values():
+        print(f"Dataset: {writer.path}")
+    if prompt_tokens or completion_tokens:
+        print(f"Tokens: {prompt_tokens} prompt + {completion_tokens} completion, {api_seconds:.1f}s of API time")
+    if dedup_index is not None and len(dedup_index):
+        print(
+            f"Diversity: {dedup_index.diversity():.2f} ({dedup_index.duplicates} near-duplicates flagged, "
+            f"{dedup_index.regenerated} regenerated)"
+        )
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+    return 1 if failures == len(work) else 0
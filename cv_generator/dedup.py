@@ -0,0 +1,215 @@
+"""
+Near-duplicate detection across a batch of CVs with MinHash signatures and LSH buckets
+"""
+import hashlib
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from cv_generator.metrics import get_metrics
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 4
+# Indexed CVs compared with each new CV: those sharing the most LSH buckets with it
+DEFAULT_MAX_CANDIDATES = 32
+MAX_REGENERATIONS = 2
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+IDENTITY_PREFIXES = ("Name:", "Email:", "Phone Number:", "Location:")
+
+
+def cv_text(result):
+    """
+    Function to return the sections of a CV (GenerationResult, StructuredCV or text) without the identity lines,
+    which differ between candidates by construction
+    """
+    structured = getattr(result, "structured", None) or (result if hasattr(result, "to_lines") else None)
+    if structured is not None:
+        return "\n".join(text for _, text in structured.to_lines()[len(IDENTITY_PREFIXES):])
+    content = getattr(result, "content", result)
+    return "\n".join(line for line in content.splitlines() if not line.startswith(IDENTITY_PREFIXES))
+
+
+def shingles(text, size=DEFAULT_SHINGLE_SIZE):
+    """
+    Function to split a text into its set of overlapping word n-grams
+    """
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class MinHasher:
+    """
+    MinHash signatures: num_perm minimum hash values whose agreement rate between two
+    signatures estimates the Jaccard similarity of the two shingle sets.
+    With numpy installed, every permutation is applied to every shingle in one array operation;
+    without it the same values are computed in pure Python.
+    """
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        # 32-bit hashes and coefficients keep a * h + b below 2**64, so numpy's uint64 arithmetic is exact
+        self._permutations = [(rng.randrange(1, _MAX_HASH + 1), rng.randrange(0, _MAX_HASH + 1)) for _ in range(num_perm)]
+        self._numpy = _load_numpy()
+        if self._numpy is not None:
+            self._a = self._numpy.array([a for a, _ in self._permutations], dtype=self._numpy.uint64)[:, None]
+            self._b = self._numpy.array([b for _, b in self._permutations], dtype=self._numpy.uint64)[:, None]
+
+    def signature(self, shingle_set):
+        """
+        Function to compute the signature of a set of shingles
+        """
+        if not shingle_set:
+            return (_MAX_HASH,) * self.num_perm
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingle_set]
+        if self._numpy is not None:
+            np = self._numpy
+            values = (self._a * np.array(hashes, dtype=np.uint64) + self._b) % np.uint64(_MERSENNE_PRIME) & np.uint64(_MAX_HASH)
+            return tuple(values.min(axis=1).tolist())
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        )
+
+
+def similarity(signature, other):
+    """
+    Function to estimate the Jaccard similarity of two CVs from their signatures
+    """
+    return sum(x == y for x, y in zip(signature, other)) / len(signature)
+
+
+def lsh_bands(num_perm, threshold):
+    """
+    Function to choose (bands, rows) for LSH so that pairs around the threshold almost always share a bucket.
+    With b bands of r rows, pairs of similarity s become candidates with probability 1 - (1 - s^r)^b,
+    which rises steeply around (1/b)^(1/r); that point is put a little below the threshold.
+    """
+    target = max(0.0, threshold - 0.1)
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+    below = [(bands, rows) for bands, rows in options if (1 / bands) ** (1 / rows) <= target] or options[:1]
+    return max(below, key=lambda option: (1 / option[0]) ** (1 / option[1]))
+
+
+@dataclass
+class DuplicateMatch:
+    """
+    The most similar earlier CV found for a CV, and their estimated Jaccard similarity
+    """
+    key: object
+    similarity: float
+
+
+class DedupIndex:
+    """
+    Incremental index of the CVs of a batch. Signatures are split into LSH bands and only CVs
+    sharing a band bucket are compared, at most max_candidates of them (those sharing the most buckets),
+    so each check and insert costs about the same at 10 or 10,000 CVs, even when many CVs look alike.
+    Tracks how many CVs were near-duplicates and the diversity of the batch.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, shingle_size=DEFAULT_SHINGLE_SIZE, seed=1, max_candidates=DEFAULT_MAX_CANDIDATES):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.max_candidates = max_candidates
+        self._hasher = MinHasher(num_perm, seed=seed)
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._keys = []
+        self._signatures = []
+        self._similarity_total = 0.0
+        self.duplicates = 0
+        self.regenerated = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows] for band in range(self.bands)]
+
+    def check(self, text):
+        """
+        Function to compare a CV's text with the indexed CVs, returning (signature, match) where match
+        is the most similar indexed CV sharing an LSH bucket, or None
+        """
+        signature = self._hasher.signature(shingles(text, self.shingle_size))
+        # The more bands two signatures share, the more similar they are likely to be
+        band_hits = Counter()
+        for buckets, band in zip(self._buckets, self._band_keys(signature)):
+            band_hits.update(buckets.get(band, ()))
+        best = None
+        for position, _ in band_hits.most_common(self.max_candidates):
+            score = similarity(signature, self._signatures[position])
+            if best is None or score > best.similarity:
+                best = DuplicateMatch(self._keys[position], score)
+        return signature, best
+
+    def is_duplicate(self, match):
+        return match is not None and match.similarity >= self.threshold
+
+    def add(self, key, signature, match=None):
+        """
+        Function to index a CV's signature, counting it as a near-duplicate if match is above the threshold
+        """
+        position = len(self._keys)
+        self._keys.append(key)
+        self._signatures.append(signature)
+        for buckets, band in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band, []).append(position)
+        if match is not None:
+            self._similarity_total += match.similarity
+        if self.is_duplicate(match):
+            self.duplicates += 1
+
+    def diversity(self):
+        """
+        Function to score the batch from 0 (every CV repeats an earlier one) to 1 (no CV resembles another):
+        one minus the mean similarity of each CV to its closest earlier CV
+        """
+        return 1.0 - self._similarity_total / len(self._keys) if self._keys else 1.0
+
+
+def dedup_results(completed_cvs, index, regenerate=None, max_regenerations=MAX_REGENERATIONS):
+    """
+    Function to check each CV of a (key, GenerationResult) stream against the CVs before it as it arrives.
+
+    Near-duplicates are regenerated with regenerate(key) (which returns a new GenerationResult, or None
+    when the CV cannot be regenerated) up to max_regenerations times. CVs that are still near-duplicates
+    are flagged with duplicate_of and similarity. Failed CVs are passed through unchecked.
+    """
+    metrics = get_metrics()
+    for key, result in completed_cvs:
+        if not result.ok:
+            yield key, result
+            continue
+        signature, match = index.check(cv_text(result))
+        regenerations = 0
+        while index.is_duplicate(match) and regenerate is not None and regenerations < max_regenerations:
+            regenerations += 1
+            candidate = regenerate(key)
+            if candidate is None or not candidate.ok:
+                break
+            metrics.count("regenerations")
+            index.regenerated += 1
+            result = candidate
+            signature, match = index.check(cv_text(result))
+        if index.is_duplicate(match):
+            result.duplicate_of = match.key
+            result.similarity = round(match.similarity, 3)
+            metrics.count("near_duplicates")
+        index.add(key, signature, match)
+        yield key, result
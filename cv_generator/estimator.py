@@ -0,0 +1,280 @@
+"""
+Pre-flight estimates of a batch's tokens, cost and wall-clock time, refined by the recorded usage of earlier runs
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from cv_generator.generation import DEFAULT_CONCURRENCY, estimate_request_tokens
+from cv_generator.prompts import build_cv_messages
+from cv_generator.ratelimit import DEFAULT_COMPLETION_TOKENS
+
+# Usage history is kept per user, so runs from any directory calibrate the same estimates
+DEFAULT_USAGE_DB = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "cv_generator", "usage.db")
+# Latency of one CV's API call until earlier runs tell otherwise
+DEFAULT_CALL_SECONDS = 10.0
+# Number of recent runs of the same model the estimates are learned from
+HISTORY_RUNS = 20
+# Ceiling of one batch in the apps, however large the budget
+MAX_CVS = 1000
+
+# USD per million (prompt, completion) tokens of each provider's default model.
+# <PROVIDER>_PRICE_INPUT and <PROVIDER>_PRICE_OUTPUT override them, e.g. for another model.
+PRICES = {
+    "groq": (0.90, 0.90),
+    "openai": (0.50, 1.50),
+    "local": (0.0, 0.0),
+    "fake": (0.0, 0.0),
+}
+# Batch providers are billed at their chat provider's prices with this discount
+BATCH_DISCOUNTS = {"openai-batch": ("openai", 0.5)}
+
+# Placeholder identity of the same length as typical generated ones, for the prompt template
+_IDENTITY = ("Firstname Lastname", "firstname.lastname@example.com", "+000 00 000 0000")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    structured INTEGER NOT NULL,
+    cvs INTEGER NOT NULL,
+    estimated_prompt_tokens INTEGER NOT NULL,
+    estimated_completion_tokens INTEGER NOT NULL,
+    estimated_cost REAL NOT NULL,
+    estimated_seconds REAL,
+    calls INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    api_seconds REAL NOT NULL,
+    cost REAL NOT NULL,
+    seconds REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def provider_prices(provider):
+    """
+    Function to return the (prompt, completion) price of a provider in USD per million tokens
+    """
+    base, discount = BATCH_DISCOUNTS.get(provider, (provider, 1.0))
+    prefix = base.upper().replace("-", "_")
+    prompt_price, completion_price = PRICES.get(base, (0.0, 0.0))
+    prompt_price = float(os.environ.get(f"{prefix}_PRICE_INPUT", prompt_price))
+    completion_price = float(os.environ.get(f"{prefix}_PRICE_OUTPUT", completion_price))
+    return prompt_price * discount, completion_price * discount
+
+
+def token_cost(provider, prompt_tokens, completion_tokens):
+    """
+    Function to price a number of prompt and completion tokens, in USD
+    """
+    prompt_price, completion_price = provider_prices(provider)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def template_prompt_tokens(role, location, experience_level, structured=False):
+    """
+    Function to estimate the prompt tokens of one CV from the prompt template (about 4 characters per token)
+    """
+    messages = build_cv_messages(role, *_IDENTITY, location, experience_level, structured=structured)
+    return estimate_request_tokens(messages, completion_tokens=0)
+
+
+@dataclass
+class Estimate:
+    """
+    Projected tokens, cost and wall-clock time of generating cvs CVs with one provider.
+    seconds is None when it cannot be projected (Batch API jobs without history); limited_by names
+    what bounds it: concurrency, requests per minute, tokens per minute or the batch window.
+    """
+    provider: str
+    model: str
+    structured: bool
+    cvs: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    seconds: Optional[float]
+    limited_by: str
+    runs: int = 0
+
+    @property
+    def cost_per_cv(self):
+        return self.cost / self.cvs if self.cvs else 0.0
+
+    def summary(self):
+        """
+        Function to describe the estimate in one line
+        """
+        if self.seconds is None:
+            duration = "up to 24h"
+        elif self.seconds < 120:
+            duration = f"~{self.seconds:.0f}s"
+        else:
+            duration = f"~{self.seconds / 60:.1f} min"
+        basis = f"{self.runs} earlier runs" if self.runs else "the prompt template"
+        return (
+            f"{self.cvs} CVs with {self.provider}: ~{self.prompt_tokens} prompt + {self.completion_tokens} completion tokens, "
+            f"~${self.cost:.4f}, {duration} (limited by {self.limited_by}; based on {basis})"
+        )
+
+
+class UsageHistory:
+    """
+    Estimated and actual tokens, cost and time of past runs, in SQLite. Estimates for a model
+    are calibrated on its most recent runs, so they improve as runs are recorded.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("CV_USAGE_DB", DEFAULT_USAGE_DB)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, estimate, calls, prompt_tokens, completion_tokens, api_seconds, seconds):
+        """
+        Function to store the actual usage of a run next to its estimate. calls counts the CVs that
+        went to the API (not replayed from a cache or manifest), over which tokens and API time were spent.
+        """
+        row = {
+            "provider": estimate.provider,
+            "model": estimate.model,
+            "structured": int(estimate.structured),
+            "cvs": estimate.cvs,
+            "estimated_prompt_tokens": estimate.prompt_tokens,
+            "estimated_completion_tokens": estimate.completion_tokens,
+            "estimated_cost": estimate.cost,
+            "estimated_seconds": estimate.seconds,
+            "calls": calls,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "api_seconds": api_seconds,
+            "cost": token_cost(estimate.provider, prompt_tokens, completion_tokens),
+            "seconds": seconds,
+            "created_at": time.time(),
+        }
+        with self._lock, self._db:
+            self._db.execute(f"INSERT INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", tuple(row.values()))
+
+    def runs(self, provider=None, model=None, structured=None, limit=HISTORY_RUNS):
+        """
+        Function to return the most recent runs (optionally of one provider, model and prompt kind) as dicts, newest first
+        """
+        conditions, params = ["calls > 0"], []
+        for column, value in (("provider", provider), ("model", model), ("structured", structured)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(int(value) if column == "structured" else value)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM runs WHERE {' AND '.join(conditions)} ORDER BY run_id DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def calibration(self, provider, model, structured):
+        """
+        Function to learn from recent runs, returning None without history or a dict of: prompt_ratio (actual over
+        template prompt tokens), completion_tokens and call_seconds per CV, and the mean wall-clock seconds of a run
+        """
+        runs = self.runs(provider, model, structured)
+        if not runs:
+            return None
+        calls = sum(run["calls"] for run in runs)
+        estimated_prompt = sum(run["estimated_prompt_tokens"] * run["calls"] / run["cvs"] for run in runs)
+        actual_prompt = sum(run["prompt_tokens"] for run in runs)
+        return {
+            "runs": len(runs),
+            "prompt_ratio": actual_prompt / estimated_prompt if actual_prompt and estimated_prompt else 1.0,
+            "completion_tokens": sum(run["completion_tokens"] for run in runs) / calls or None,
+            "call_seconds": sum(run["api_seconds"] for run in runs) / calls or None,
+            "run_seconds": sum(run["seconds"] for run in runs) / len(runs),
+        }
+
+
+def _rate_limit_seconds(bucket, amount):
+    """
+    Function to return how long a token bucket takes to let amount through, after its initial burst
+    """
+    if bucket is None:
+        return 0.0
+    return max(0.0, amount - bucket.capacity) / bucket.rate
+
+
+def estimate_run(combinations, provider, model, structured=False, concurrency=DEFAULT_CONCURRENCY, rate_limiter=None, history=None):
+    """
+    Function to estimate the tokens, cost and wall-clock time of generating the CVs of some combinations
+    (role, location, experience_level and count) with one provider.
+
+    Prompt tokens come from the prompt template and completion tokens default to the rate limiter's
+    reservation; both, and the latency of one call, are calibrated on the history of the same model.
+    The time is the slowest of the concurrency limit and the rate limiter's request and token budgets.
+    """
+    cvs = sum(combination.count for combination in combinations)
+    calibration = history.calibration(provider, model, structured) if history is not None else None
+    prompt_ratio = calibration["prompt_ratio"] if calibration else 1.0
+    prompt_tokens = round(prompt_ratio * sum(
+        template_prompt_tokens(combination.role, combination.location, combination.experience_level, structured) * combination.count
+        for combination in combinations
+    ))
+    completion_per_cv = (calibration and calibration["completion_tokens"]) or DEFAULT_COMPLETION_TOKENS
+    completion_tokens = round(completion_per_cv * cvs)
+    cost = token_cost(provider, prompt_tokens, completion_tokens)
+    runs = calibration["runs"] if calibration else 0
+
+    # Batch API jobs are bounded by the batch window rather than by concurrency or rate limits
+    if provider in BATCH_DISCOUNTS:
+        seconds = calibration["run_seconds"] if calibration else None
+        return Estimate(provider, model, structured, cvs, prompt_tokens, completion_tokens, cost, seconds, "the batch window", runs)
+
+    call_seconds = (calibration and calibration["call_seconds"]) or DEFAULT_CALL_SECONDS
+    bounds = {"concurrency": math.ceil(cvs / max(1, concurrency)) * call_seconds}
+    if rate_limiter is not None and rate_limiter.requests is not None:
+        bounds["requests per minute"] = _rate_limit_seconds(rate_limiter.requests, cvs) + call_seconds
+    if rate_limiter is not None and rate_limiter.tokens is not None:
+        bounds["tokens per minute"] = _rate_limit_seconds(rate_limiter.tokens, prompt_tokens + completion_tokens) + call_seconds
+    limited_by = max(bounds, key=bounds.get)
+    return Estimate(provider, model, structured, cvs, prompt_tokens, completion_tokens, cost, bounds[limited_by], limited_by, runs)
+
+
+def max_cvs_for_budget(cost_per_cv, budget, ceiling=MAX_CVS):
+    """
+    Function to return how many CVs fit in a budget (USD), at most ceiling; free providers get the ceiling
+    """
+    if budget is None or cost_per_cv <= 0:
+        return ceiling
+    return max(0, min(ceiling, math.floor(budget / cost_per_cv)))
+
+
+_usage_history = None
+_usage_history_lock = threading.Lock()
+
+
+def get_usage_history():
+    """
+    Function to return the process-wide usage history (CV_USAGE_DB, or the per-user default), shared by every session
+    """
+    global _usage_history
+    with _usage_history_lock:
+        if _usage_history is None:
+            _usage_history = UsageHistory()
+        return _usage_history
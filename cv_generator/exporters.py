@@ -0,0 +1,248 @@
+"""
+Export of generated CVs to PDF, JSONL, Markdown, DOCX and Parquet, all from one parsed CV
+"""
+import json
+import os
+from io import BytesIO
+
+from cv_generator.structured import CV_FIELDS, parse_text_cv
+
+# Formats written as one file per CV, and formats collecting every CV of a run into one dataset file
+FILE_FORMATS = {"pdf": ".pdf", "md": ".md", "docx": ".docx"}
+DATASET_FORMATS = {"jsonl": ".jsonl", "parquet": ".parquet"}
+EXPORT_FORMATS = ["pdf", "jsonl", "md", "docx", "parquet"]
+DEFAULT_FORMATS = ["pdf"]
+DATASET_NAME = "cvs"
+DEFAULT_ROW_GROUP_SIZE = 1000
+
+METADATA_FIELDS = ["id", "path", "role", "location", "experience_level", "provider"]
+IDENTITY_FIELDS = ["name", "email", "phone_number"]
+
+
+class ExportError(RuntimeError):
+    """
+    Raised when an export format is unknown or its optional library is not installed
+    """
+
+
+def parse_formats(formats):
+    """
+    Function to validate a list (or comma-separated string) of export formats, returning them without duplicates
+    """
+    if isinstance(formats, str):
+        formats = [part.strip() for part in formats.split(",")]
+    formats = list(dict.fromkeys(part.lower() for part in formats if part))
+    if not formats:
+        raise ExportError("choose at least one export format")
+    unknown = [part for part in formats if part not in EXPORT_FORMATS]
+    if unknown:
+        raise ExportError(f"unknown export format {unknown[0]!r} (choose from {', '.join(EXPORT_FORMATS)})")
+    # Fail before any API call when a format's library is missing
+    if "docx" in formats:
+        _require_docx()
+    if "parquet" in formats:
+        _require_pyarrow()
+    return formats
+
+
+def _require_docx():
+    try:
+        import docx
+    except ImportError:
+        raise ExportError("python-docx is needed to export DOCX files (pip install python-docx)") from None
+    return docx
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("pyarrow is needed to export Parquet datasets (pip install pyarrow)") from None
+    return pyarrow, pyarrow.parquet
+
+
+def cv_record(result, path, role, location, experience_level, provider=None):
+    """
+    Function to turn a generated CV into one flat record: where it belongs, the candidate's identity and
+    every section. Structured CVs are used as they are; free-text CVs are parsed into sections first.
+    """
+    cv = getattr(result, "structured", None) or parse_text_cv(getattr(result, "content", result))
+    record = {
+        "id": os.path.splitext(path)[0],
+        "path": path,
+        "role": role,
+        "location": location,
+        "experience_level": experience_level,
+        "provider": provider,
+    }
+    record.update({key: value for key, value in cv.to_dict().items() if key != "location"})
+    record["text"] = cv.to_text()
+    return record
+
+
+def to_markdown(record):
+    """
+    Function to lay a CV record out as Markdown
+    """
+    lines = [
+        f"# {record['name']}",
+        "",
+        f"- **Email:** {record['email']}",
+        f"- **Phone Number:** {record['phone_number']}",
+        f"- **Location:** {record['location']}",
+    ]
+    for key, heading, kind in CV_FIELDS:
+        value = record[key]
+        lines += ["", f"## {heading}", ""]
+        if kind is list:
+            lines += [f"- {entry}" for entry in value]
+        elif value not in (None, ""):
+            lines.append(str(value))
+    return "\n".join(lines) + "\n"
+
+
+def to_docx(record):
+    """
+    Function to lay a CV record out as a Word document, returning its bytes
+    """
+    docx = _require_docx()
+    document = docx.Document()
+    document.add_heading(record["name"], level=0)
+    for label, key in (("Email", "email"), ("Phone Number", "phone_number"), ("Location", "location")):
+        document.add_paragraph(f"{label}: {record[key]}")
+    for key, heading, kind in CV_FIELDS:
+        value = record[key]
+        document.add_heading(heading, level=1)
+        if kind is list:
+            for entry in value:
+                document.add_paragraph(entry, style="List Bullet")
+        elif value not in (None, ""):
+            document.add_paragraph(str(value))
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class JSONLWriter:
+    """
+    Dataset file with one JSON record per line, flushed as each CV is written
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Columnar dataset file, written in row groups of row_group_size CVs so memory stays bounded
+    """
+
+    def __init__(self, path, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        pa, pq = _require_pyarrow()
+        self.path = path
+        self.row_group_size = row_group_size
+        columns = [(name, pa.string()) for name in METADATA_FIELDS + IDENTITY_FIELDS]
+        columns += [
+            (key, pa.list_(pa.string()) if kind is list else pa.int64() if kind is int else pa.string())
+            for key, _, kind in CV_FIELDS
+        ]
+        columns.append(("text", pa.string()))
+        self._pa = pa
+        self._schema = pa.schema(columns)
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+        self._rows = []
+
+    def write(self, record):
+        self._rows.append(record)
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+class CVExporter:
+    """
+    Export stage of a run: writes each CV in every selected format as soon as it is ready.
+
+    One-file-per-CV formats (pdf, md, docx) go through write_file(relative_path, data), so they can land
+    in a directory or a ZIP archive. Dataset formats (jsonl, parquet) collect every CV of the run into
+    dataset_dir/cvs.jsonl and dataset_dir/cvs.parquet.
+    """
+
+    def __init__(self, formats, write_file, dataset_dir=".", dataset_name=DATASET_NAME):
+        self.formats = parse_formats(formats)
+        self._write_file = write_file
+        self.datasets = {}
+        self._closed = False
+        writers = {"jsonl": JSONLWriter, "parquet": ParquetWriter}
+        for name, extension in DATASET_FORMATS.items():
+            if name in self.formats:
+                if dataset_dir:
+                    os.makedirs(dataset_dir, exist_ok=True)
+                self.datasets[name] = writers[name](os.path.join(dataset_dir, dataset_name + extension))
+
+    @property
+    def needs_pdf(self):
+        return "pdf" in self.formats
+
+    @property
+    def file_formats(self):
+        return [name for name in self.formats if name in FILE_FORMATS]
+
+    def file_path(self, path, name):
+        """
+        Function to return the relative path of a CV's file in one of the per-CV formats
+        """
+        return os.path.splitext(path)[0] + FILE_FORMATS[name]
+
+    def export(self, path, result, pdf_bytes=None, **metadata):
+        """
+        Function to write one CV in every selected format, returning the relative paths of its files.
+        path is the CV's relative PDF path; metadata holds role, location, experience_level and provider.
+        """
+        written = []
+        if "pdf" in self.formats and pdf_bytes is not None:
+            self._write_file(path, pdf_bytes)
+            written.append(path)
+        # Failed CVs only get their error PDF; the other formats hold CVs only
+        if self.formats == ["pdf"] or not getattr(result, "ok", True):
+            return written
+        record = cv_record(result, path, **metadata)
+        for name in ("md", "docx"):
+            if name in self.formats:
+                data = to_markdown(record).encode("utf-8") if name == "md" else to_docx(record)
+                self._write_file(self.file_path(path, name), data)
+                written.append(self.file_path(path, name))
+        for writer in self.datasets.values():
+            writer.write(record)
+        return written
+
+    def close(self):
+        # Safe to call again, e.g. from a cleanup step after the datasets were packaged
+        if self._closed:
+            return
+        self._closed = True
+        for writer in self.datasets.values():
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
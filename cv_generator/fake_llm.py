@@ -0,0 +1,124 @@
+"""
+Deterministic stand-in for the Groq/OpenAI chat completions API, for tests, benchmarks and offline runs
+"""
+import json
+import random
+import threading
+import time
+import types
+
+from cv_generator.structured import CV_FIELDS
+
+# Only the sections: the identity lines are added by the caller
+FAKE_CV_TEMPLATE = """Languages:
+- English, Español
+Applicant Key Role:
+{role}
+Years of Experience: {years}
+Skills:
+- Skill set #{n}: Python, SQL, stakeholder management, Kubernetes
+- Communication, leadership and problem solving
+Education:
+- B.Sc. in Applied Sciences, Universidad Técnica ({graduation})
+Projects:
+- Project Atlas #{n}: migrated legacy workloads, cutting costs by {saving}%
+- Project Nova: built dashboards used by {users} people
+Certifications:
+- Professional Certificate #{n}
+Experiences:
+- Senior {role}, Müller & Søn GmbH ({start}–present)
+- {role}, Acme Corp ({previous}–{start})
+References:
+- Dr. Jane Roe, Head of Department, Acme Corp
+"""
+
+
+def _as_json(content):
+    """
+    Function to turn a fake CV in text form into the JSON answer of structured mode
+    """
+    fields = {heading: (key, kind) for key, heading, kind in CV_FIELDS}
+    data = {key: [] if kind is list else None for key, _, kind in CV_FIELDS}
+    current = None
+    for line in content.splitlines():
+        heading, _, rest = line.partition(":")
+        if heading in fields:
+            current = fields[heading]
+            key, kind = current
+            if rest.strip():
+                data[key] = kind(rest.strip())
+        elif current is not None and line.strip():
+            key, kind = current
+            value = line.strip().removeprefix("- ")
+            if kind is list:
+                data[key].append(value)
+            else:
+                data[key] = kind(value)
+    return json.dumps(data, ensure_ascii=False)
+
+
+class FakeAPIError(Exception):
+    """
+    Error raised by the fake API, shaped like the SDKs' status errors (status_code, response.headers)
+    """
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"Error code: {status_code} - fake API error")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = types.SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class FakeChatClient:
+    """
+    Client exposing chat.completions.create like the Groq and OpenAI SDKs.
+
+    Each call sleeps for latency seconds (plus up to jitter seconds), fails with a
+    429/503 FakeAPIError with probability error_rate, and otherwise returns a
+    deterministic CV with token usage, as JSON when response_format asks for a
+    json_object. The same seed gives the same sequence of latencies, errors and CVs.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0, retry_after=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, messages, model, **kwargs):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+            status = self._random.choice((429, 503))
+            years = self._random.randint(1, 15)
+        time.sleep(delay)
+        if fail:
+            raise FakeAPIError(status, retry_after=self.retry_after if status == 429 else None)
+
+        prompt = "\n".join(message["content"] for message in messages)
+        role = prompt.split("role of ", 1)[1].split(".", 1)[0] if "role of " in prompt else "Professional"
+        content = FAKE_CV_TEMPLATE.format(
+            role=role, years=years, n=n,
+            graduation=2024 - years - 1, saving=10 + n % 40, users=100 * (n % 50 + 1),
+            start=2024 - years // 2, previous=2024 - years,
+        )
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            content = _as_json(content)
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content), finish_reason="stop")],
+            usage=types.SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+            model=model,
+        )
+
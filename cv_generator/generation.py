@@ -0,0 +1,199 @@
+"""
+CV generation with the Groq chat completions API
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Optional
+
+from cv_generator.metrics import PROMPT_BUILD, QUEUE_WAIT, get_metrics
+from cv_generator.prompts import assemble_cv, build_cv_messages
+from cv_generator.ratelimit import DEFAULT_COMPLETION_TOKENS, RetryError, call_with_retries
+from cv_generator.structured import CVSchemaError, StructuredCV, parse_structured_cv
+
+GROQ_MODEL = "llama-3.2-90b-text-preview"
+DEFAULT_CONCURRENCY = 5
+
+
+@dataclass
+class GenerationResult:
+    """
+    Generated CV text (or the "Error generating CV: ..." message) and how it was obtained.
+    Token counts come from the response usage and are None when the API did not report them.
+    In structured mode, structured holds the parsed CV and content its text form.
+    Failed CVs keep the class name of the error in error_type, and near-duplicates of an earlier CV
+    of the batch (see cv_generator.dedup) keep its key in duplicate_of.
+    """
+    content: str
+    attempts: int = 0
+    cached: bool = False
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    elapsed: float = 0.0
+    structured: Optional[StructuredCV] = None
+    error_type: Optional[str] = None
+    duplicate_of: Optional[object] = None
+    similarity: Optional[float] = None
+
+    @property
+    def ok(self):
+        return not self.content.startswith("Error generating CV")
+
+
+def create_groq_client(api_key=None, **kwargs):
+    """
+    Function to create a Groq client, reading GROQ_API_KEY from the environment by default.
+    Keyword arguments (http_client, timeout, max_retries) are passed on to the client.
+    """
+    # Imported here so that importing the package does not pay for the Groq SDK
+    from groq import Groq
+
+    return Groq(api_key=api_key or os.environ.get("GROQ_API_KEY"), **kwargs)
+
+
+def estimate_request_tokens(messages, completion_tokens=DEFAULT_COMPLETION_TOKENS):
+    """
+    Function to roughly estimate the total tokens of a request (about 4 characters per token) for rate limiting
+    """
+    return sum(len(message["content"]) for message in messages) // 4 + completion_tokens
+
+
+def usage_tokens(response):
+    """
+    Function to read the (prompt, completion) token counts from a chat completion's usage, if reported
+    """
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+
+
+def generate_cv_result(client, role, name, email, phone_number, location, experience_level, model=GROQ_MODEL, cache=None, variant=0, refresh=False, rate_limiter=None, retry_policy=None, structured=False):
+    """
+    Function to generate a random CV using the Groq API, returning a GenerationResult.
+    The model only writes the CV sections; the given name, email and phone number are put on top.
+    With structured set, the sections are requested in JSON mode and parsed into a StructuredCV.
+    Calls wait for the rate limiter's budgets and transient failures are retried per retry_policy.
+    With a ResponseCache, the sections in the given variant slot are replayed from the cache unless refresh is set.
+    Prompt building, the API call, token usage, retries and errors are recorded in the pipeline metrics.
+    """
+    metrics = get_metrics()
+    with metrics.time(PROMPT_BUILD, model=model):
+        messages = build_cv_messages(role, name, email, phone_number, location, experience_level, structured=structured)
+
+    def make_result(sections, **kwargs):
+        if not structured:
+            return GenerationResult(assemble_cv(name, email, phone_number, location, sections), **kwargs)
+        cv = parse_structured_cv(sections, name, email, phone_number, location)
+        return GenerationResult(cv.to_text(), structured=cv, **kwargs)
+
+    # Cached sections only depend on the settings, not on the candidate
+    cache_key = cache.make_key(model, messages[:1], variant=variant) if cache is not None else None
+    if cache_key is not None and not refresh:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            metrics.count("cache_hits", model=model)
+            return make_result(cached, cached=True)
+
+    # Generate completion using Groq API, in JSON mode for structured CVs
+    create_kwargs = {"response_format": {"type": "json_object"}} if structured else {}
+    estimated_tokens = estimate_request_tokens(messages)
+    start = time.perf_counter()
+    try:
+        chat_completion, attempts = call_with_retries(
+            lambda: client.chat.completions.create(messages=messages, model=model, **create_kwargs),
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            estimated_tokens=estimated_tokens,
+            labels={"model": model},
+        )
+        sections = chat_completion.choices[0].message.content
+    except RetryError as e:
+        metrics.count("retries", e.attempts - 1, model=model)
+        metrics.count("errors", model=model, error=type(e.error).__name__)
+        return GenerationResult(
+            f"Error generating CV: {e.error}", attempts=e.attempts, elapsed=time.perf_counter() - start, error_type=type(e.error).__name__,
+        )
+    except Exception as e:
+        metrics.count("errors", model=model, error=type(e).__name__)
+        return GenerationResult(f"Error generating CV: {e}", attempts=1, elapsed=time.perf_counter() - start, error_type=type(e).__name__)
+    elapsed = time.perf_counter() - start
+
+    prompt_tokens, completion_tokens = usage_tokens(chat_completion)
+    metrics.count("retries", attempts - 1, model=model)
+    metrics.count("tokens", prompt_tokens or 0, model=model, kind="prompt")
+    metrics.count("tokens", completion_tokens or 0, model=model, kind="completion")
+    if rate_limiter is not None:
+        rate_limiter.record_usage(estimated_tokens, getattr(getattr(chat_completion, "usage", None), "total_tokens", None))
+    usage = {"attempts": attempts, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "elapsed": elapsed}
+    # A response without content (e.g. a filtered completion) fails this CV, not the whole batch
+    if not sections or not sections.strip():
+        metrics.count("errors", model=model, error="EmptyResponse")
+        return GenerationResult("Error generating CV: the response has no content", error_type="EmptyResponse", **usage)
+    try:
+        result = make_result(sections, **usage)
+    except CVSchemaError as e:
+        metrics.count("errors", model=model, error=CVSchemaError.__name__)
+        return GenerationResult(f"Error generating CV: invalid structured CV: {e}", error_type=CVSchemaError.__name__, **usage)
+    except Exception as e:
+        metrics.count("errors", model=model, error=type(e).__name__)
+        return GenerationResult(f"Error generating CV: {e}", error_type=type(e).__name__, **usage)
+    if cache_key is not None:
+        cache.set(cache_key, sections)
+    return result
+
+
+def generate_cv(client, role, name, email, phone_number, location, experience_level, **kwargs):
+    """
+    Function to generate a random CV using the Groq API for a given job role, name, email, and other details.
+    Keyword arguments are passed on to generate_cv_result.
+    """
+    return generate_cv_result(client, role, name, email, phone_number, location, experience_level, **kwargs).content
+
+
+def iter_cv_results_as_completed(client, roles, names, emails, phone_numbers, locations, experience_levels, max_concurrency=DEFAULT_CONCURRENCY, variants=None, **kwargs):
+    """
+    Function to generate multiple CVs in parallel, yielding (index, GenerationResult) pairs as soon as each CV is ready.
+    At most max_concurrency Groq API calls run at once, and a failed CV only affects its own entry.
+    Each CV uses its index (or its entry in variants) as the cache variant slot, so identical batches replay from the cache.
+    Other keyword arguments (model, cache, refresh, rate_limiter, retry_policy, structured) are passed on to generate_cv_result.
+    """
+    requests = list(zip(roles, names, emails, phone_numbers, locations, experience_levels))
+    if not requests:
+        return
+
+    metrics = get_metrics()
+
+    def run(request, variant, submitted):
+        # Time spent waiting for a free slot of the pool
+        metrics.timing(QUEUE_WAIT, time.perf_counter() - submitted)
+        return generate_cv_result(client, *request, variant=variant, **kwargs)
+
+    # The Groq client is thread-safe, so a thread pool is enough to overlap the network round-trips
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(requests)))) as executor:
+        futures = {
+            executor.submit(run, request, variants[idx] if variants else idx, time.perf_counter()): idx
+            for idx, request in enumerate(requests)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def iter_cvs_as_completed(client, roles, names, emails, phone_numbers, locations, experience_levels, max_concurrency=DEFAULT_CONCURRENCY, **kwargs):
+    """
+    Function to generate multiple CVs in parallel, yielding (index, cv) pairs as soon as each CV is ready
+    """
+    for idx, result in iter_cv_results_as_completed(
+        client, roles, names, emails, phone_numbers, locations, experience_levels, max_concurrency=max_concurrency, **kwargs
+    ):
+        yield idx, result.content
+
+
+def generate_cvs_concurrently(client, roles, names, emails, phone_numbers, locations, experience_levels, max_concurrency=DEFAULT_CONCURRENCY, **kwargs):
+    """
+    Function to generate multiple CVs in parallel, running at most max_concurrency Groq API calls at once.
+    Results are returned in the same order as the inputs, and a failed CV only affects its own entry.
+    """
+    results = dict(iter_cvs_as_completed(
+        client, roles, names, emails, phone_numbers, locations, experience_levels, max_concurrency=max_concurrency, **kwargs
+    ))
+    return [results[idx] for idx in range(len(results))]
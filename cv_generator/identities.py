@@ -0,0 +1,187 @@
+"""
+Random candidate identities used to personalise each CV
+"""
+import os
+import random
+import re
+import threading
+from dataclasses import dataclass, field
+
+from cv_generator.text import sanitize_text
+
+DEFAULT_LOCALE = "en_US"
+POOL_SIZE = 1000
+EMAIL_DOMAIN = "example.com"
+
+# Faker locales for locations, limited to locales whose names are written in Latin script
+# since the CVs are in English. Other locations use DEFAULT_LOCALE.
+LOCATION_LOCALES = {
+    "united states": "en_US", "usa": "en_US", "us": "en_US", "america": "en_US",
+    "united kingdom": "en_GB", "uk": "en_GB", "england": "en_GB", "scotland": "en_GB", "london": "en_GB",
+    "ireland": "en_IE", "canada": "en_CA", "australia": "en_AU", "new zealand": "en_NZ",
+    "india": "en_IN", "pakistan": "en_PK", "philippines": "en_PH", "nigeria": "en_NG",
+    "germany": "de_DE", "berlin": "de_DE", "munich": "de_DE", "austria": "de_AT", "switzerland": "de_CH",
+    "france": "fr_FR", "paris": "fr_FR", "spain": "es_ES", "madrid": "es_ES", "mexico": "es_MX",
+    "argentina": "es_AR", "colombia": "es_CO", "chile": "es_CL", "italy": "it_IT", "rome": "it_IT",
+    "portugal": "pt_PT", "brazil": "pt_BR", "netherlands": "nl_NL", "amsterdam": "nl_NL", "belgium": "nl_BE",
+    "sweden": "sv_SE", "norway": "no_NO", "denmark": "da_DK", "finland": "fi_FI", "poland": "pl_PL",
+    "czech republic": "cs_CZ", "czechia": "cs_CZ", "romania": "ro_RO", "hungary": "hu_HU", "croatia": "hr_HR",
+    "turkey": "tr_TR", "istanbul": "tr_TR", "indonesia": "id_ID",
+}
+
+_LOCATION_PATTERNS = [
+    (re.compile(rf"\b{re.escape(keyword)}\b"), locale)
+    for keyword, locale in sorted(LOCATION_LOCALES.items(), key=lambda item: -len(item[0]))
+]
+
+
+def locale_for_location(location):
+    """
+    Function to pick the Faker locale for a free-text location, falling back to DEFAULT_LOCALE
+    """
+    location = (location or "").lower()
+    for pattern, locale in _LOCATION_PATTERNS:
+        if pattern.search(location):
+            return locale
+    return DEFAULT_LOCALE
+
+
+def _email_slug(name):
+    """
+    Function to turn a name into the ASCII local part of an email address
+    """
+    return re.sub(r"[^a-z0-9]+", ".", sanitize_text(name).lower()).strip(".") or "candidate"
+
+
+def _phone_template(phone_number):
+    """
+    Function to turn a phone number into a format string with its last 4 digits as placeholders
+    """
+    digits = [match.start() for match in re.finditer(r"\d", phone_number)][-4:]
+    if len(digits) < 4:
+        return None
+    chars = list(phone_number)
+    for position in digits:
+        chars[position] = "{}"
+    return "".join(chars)
+
+
+@dataclass
+class _LocalePool:
+    first_names: list
+    last_names: list
+    first_slugs: list
+    last_slugs: list
+    phone_templates: list
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(locale):
+    """
+    Function to build (once per process) the name and phone pools of a locale from Faker
+    """
+    with _pools_lock:
+        pool = _pools.get(locale)
+        if pool is None:
+            # Imported here so that importing the package does not pay for Faker's providers
+            import faker
+
+            fake = faker.Faker(locale)
+            fake.seed_instance(0)  # Same pools in every process, so seeded batches are reproducible
+            first_names = sorted({fake.first_name() for _ in range(POOL_SIZE)})
+            last_names = sorted({fake.last_name() for _ in range(POOL_SIZE)})
+            phone_templates = sorted({
+                template for template in (_phone_template(fake.phone_number()) for _ in range(POOL_SIZE))
+                if template is not None
+            })
+            pool = _pools[locale] = _LocalePool(
+                first_names=first_names,
+                last_names=last_names,
+                first_slugs=[_email_slug(name) for name in first_names],
+                last_slugs=[_email_slug(name) for name in last_names],
+                phone_templates=phone_templates,
+            )
+        return pool
+
+
+@dataclass
+class IdentityBatch:
+    """
+    Columns of candidate identities, one entry per CV
+    """
+    names: list = field(default_factory=list)
+    emails: list = field(default_factory=list)
+    phone_numbers: list = field(default_factory=list)
+    hashes: list = field(default_factory=list)
+    locale: str = DEFAULT_LOCALE
+
+    def __len__(self):
+        return len(self.names)
+
+
+class IdentityGenerator:
+    """
+    Generator of candidate identities for whole batches at once.
+
+    Names and phone formats are sampled from per-locale pools built once per process
+    with Faker, so a batch costs a few list comprehensions rather than a Faker call per
+    field. The same seed gives the same identities.
+    """
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, num_cvs, location=None):
+        """
+        Function to generate num_cvs identities for a location. Emails are unique within the batch.
+        """
+        locale = locale_for_location(location)
+        pool = _get_pool(locale)
+        # Distinct hashes without leading zeros, from a range at least 9 times the batch size
+        hash_digits = max(4, len(str(num_cvs)) + 1)
+        with self._lock:
+            first = self._random.choices(range(len(pool.first_names)), k=num_cvs)
+            last = self._random.choices(range(len(pool.last_names)), k=num_cvs)
+            hashes = [str(h) for h in self._random.sample(range(10 ** (hash_digits - 1), 10 ** hash_digits), num_cvs)]
+            phone_templates = self._random.choices(pool.phone_templates, k=num_cvs)
+            phone_digits = [f"{self._random.randrange(10000):04d}" for _ in range(num_cvs)]
+
+        return IdentityBatch(
+            names=[f"{pool.first_names[i]} {pool.last_names[j]}" for i, j in zip(first, last)],
+            emails=[
+                f"{pool.first_slugs[i]}.{pool.last_slugs[j]}{hash_}@{EMAIL_DOMAIN}"
+                for i, j, hash_ in zip(first, last, hashes)
+            ],
+            phone_numbers=[template.format(*digits) for template, digits in zip(phone_templates, phone_digits)],
+            hashes=hashes,
+            locale=locale,
+        )
+
+
+_identity_generator = None
+_identity_generator_lock = threading.Lock()
+
+
+def get_identity_generator():
+    """
+    Function to return the process-wide identity generator, seeded from CV_IDENTITY_SEED if set
+    """
+    global _identity_generator
+    with _identity_generator_lock:
+        if _identity_generator is None:
+            seed = os.environ.get("CV_IDENTITY_SEED")
+            _identity_generator = IdentityGenerator(int(seed) if seed else None)
+        return _identity_generator
+
+
+def generate_identities(num_cvs, location=None, seed=None):
+    """
+    Function to generate random names, emails and phone numbers for a batch of CVs
+    """
+    generator = IdentityGenerator(seed) if seed is not None else get_identity_generator()
+    batch = generator.generate(num_cvs, location)
+    return batch.names, batch.emails, batch.phone_numbers
@@ -0,0 +1,349 @@
+"""
+Background job queue: batches run on a fixed pool of worker threads shared fairly between sessions,
+so a batch survives reruns and page reloads and the Streamlit script thread only polls it
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from cv_generator.metrics import QUEUE_WAIT, get_metrics
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+DEFAULT_WORKERS = 8
+# Finished jobs are kept this many seconds for their results to be picked up
+DEFAULT_JOB_TTL = 60 * 60
+
+
+class Requeue(Exception):
+    """
+    Raised by run_task to run the same task again in delay seconds, e.g. to check on a remote job
+    without holding a worker while it runs. The task is not counted as done.
+    """
+
+    def __init__(self, delay=0.0):
+        super().__init__(delay)
+        self.delay = delay
+
+
+class Job:
+    """
+    One batch of tasks: its owner (e.g. a session id), state, progress and the results received so far.
+
+    Results are kept as (task, value) pairs in completion order. on_done(job) runs on a worker thread
+    once every task is done, before the job is marked finished, e.g. to package the results.
+    on_finish(job) runs once whichever way the job ends (done, failed or cancelled), after its running
+    tasks returned, e.g. to close the files the tasks wrote to.
+    A task raising Requeue(delay) is run again once delay seconds passed; until then the job's other tasks wait too.
+    metadata holds what the submitter needs to show the results later (e.g. the role and output paths).
+    """
+
+    def __init__(self, owner, tasks, run_task, max_in_flight=None, on_done=None, on_finish=None, metadata=None):
+        self.job_id = uuid.uuid4().hex
+        self.owner = owner
+        self.total = len(tasks)
+        self.status = QUEUED
+        self.error = None
+        self.output = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.max_in_flight = max_in_flight
+        self.metadata = metadata or {}
+        self._pending = deque((task, time.perf_counter()) for task in tasks)
+        self._run_task = run_task
+        self._on_done = on_done
+        self._on_finish = on_finish
+        self._cleaned_up = False
+        self._in_flight = 0
+        # time.monotonic() before which the job's tasks do not run (set by Requeue)
+        self._not_before = 0.0
+        self._results = []
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def completed(self):
+        return len(self._results)
+
+    @property
+    def progress(self):
+        return self.completed / self.total if self.total else 1.0
+
+    def results(self):
+        """
+        Function to return a snapshot of the (task, value) pairs received so far, in completion order
+        """
+        with self._changed:
+            return list(self._results)
+
+    def wait(self, timeout=None):
+        """
+        Function to block until the job makes progress or finishes (or timeout seconds pass), returning whether it finished
+        """
+        with self._changed:
+            if not self.finished:
+                self._changed.wait(timeout)
+            return self.finished
+
+    def _runnable(self):
+        return self.status in (QUEUED, RUNNING) and self._pending and time.monotonic() >= self._not_before and (
+            self.max_in_flight is None or self._in_flight < self.max_in_flight
+        )
+
+    def _claim_cleanup(self):
+        """
+        Function to tell whether on_finish is due: the job ended and none of its tasks still runs (queue lock held)
+        """
+        if self._cleaned_up or not self.finished or self._in_flight:
+            return False
+        self._cleaned_up = True
+        return True
+
+    def _cleanup(self):
+        try:
+            if self._on_finish is not None:
+                self._on_finish(self)
+        except Exception as e:
+            if self.error is None:
+                self.error = f"{type(e).__name__}: {e}"
+                self.status = FAILED
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+
+class JobQueue:
+    """
+    Fixed pool of worker threads running the tasks of every submitted job.
+
+    Workers take tasks round-robin across owners (and across each owner's jobs), so several users'
+    batches share the capacity fairly instead of the first big batch holding every worker.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, job_ttl=DEFAULT_JOB_TTL):
+        self.workers = workers
+        self.job_ttl = job_ttl
+        self._jobs = {}
+        # Owner -> that owner's jobs with tasks left, in submission order; owners rotate after each task
+        self._owners = OrderedDict()
+        self._lock = threading.Lock()
+        self._work_available = threading.Condition(self._lock)
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"cv-job-worker-{number}", daemon=True) for number in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, owner, tasks, run_task, max_in_flight=None, on_done=None, on_finish=None, metadata=None):
+        """
+        Function to queue a job running run_task(task) for each task, returning its Job.
+        max_in_flight caps how many of its tasks run at once (e.g. the user's concurrency setting).
+        """
+        job = Job(owner, list(tasks), run_task, max_in_flight=max_in_flight, on_done=on_done, on_finish=on_finish, metadata=metadata)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("the job queue is shut down")
+            self._drop_expired()
+            self._jobs[job.job_id] = job
+            if job.total:
+                self._schedule(job)
+                self._work_available.notify_all()
+        if not job.total:
+            self._finish(job)
+        return job
+
+    def get(self, job_id):
+        """
+        Function to return the job with this id, or None when it is unknown or expired
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        """
+        Function to return the jobs of an owner (or every job), oldest first
+        """
+        with self._lock:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def cancel(self, job_id):
+        """
+        Function to cancel a job: its queued tasks are dropped, tasks already running finish
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # A job whose tasks are all done is already being finished
+            if job is None or job.finished or (not job._pending and not job._in_flight and job.total):
+                return False
+            job._pending.clear()
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            cleanup = job._claim_cleanup()
+        if cleanup:
+            job._cleanup()
+        job._notify()
+        return True
+
+    def shutdown(self, wait=True):
+        """
+        Function to stop the workers once the tasks they are running finish; queued tasks are not run
+        """
+        with self._lock:
+            self._closed = True
+            self._work_available.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _schedule(self, job):
+        """
+        Function to put a job with tasks left in its owner's line (lock held)
+        """
+        if job.owner not in self._owners:
+            # An owner with nothing queued goes first, ahead of owners already being served
+            self._owners[job.owner] = deque()
+            self._owners.move_to_end(job.owner, last=False)
+        if job not in self._owners[job.owner]:
+            self._owners[job.owner].append(job)
+
+    def _next_delay(self):
+        """
+        Function to return the seconds until a requeued task is due, or None when none is waiting (lock held)
+        """
+        now = time.monotonic()
+        delays = [
+            job._not_before - now for owner_jobs in self._owners.values() for job in owner_jobs
+            if job._pending and not job.finished and job._not_before > now
+        ]
+        return min(delays) if delays else None
+
+    def _drop_expired(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and now - job.finished_at > self.job_ttl:
+                del self._jobs[job_id]
+
+    def _next_task(self):
+        """
+        Function to take the next task, round-robin over owners, or None when no job can run one (lock held)
+        """
+        for _ in range(len(self._owners)):
+            owner, owner_jobs = self._owners.popitem(last=False)
+            for job in [job for job in owner_jobs if not job._pending or job.finished]:
+                owner_jobs.remove(job)
+            runnable = next((job for job in owner_jobs if job._runnable()), None)
+            if runnable is not None:
+                # The owner's next task comes from its next job
+                owner_jobs.remove(runnable)
+                owner_jobs.append(runnable)
+            if owner_jobs:
+                # The owner goes to the back of the line, whether or not it got a task this time
+                self._owners[owner] = owner_jobs
+            if runnable is not None:
+                task, queued_at = runnable._pending.popleft()
+                runnable._in_flight += 1
+                runnable.status = RUNNING
+                return runnable, task, queued_at
+        return None
+
+    def _work(self):
+        metrics = get_metrics()
+        while True:
+            with self._lock:
+                taken = self._next_task()
+                while taken is None and not self._closed:
+                    self._work_available.wait(self._next_delay())
+                    taken = self._next_task()
+                if taken is None:
+                    return
+            job, task, queued_at = taken
+            metrics.timing(QUEUE_WAIT, time.perf_counter() - queued_at, queue="jobs")
+            try:
+                value = job._run_task(task)
+            except Requeue as requeue:
+                with self._lock:
+                    job._in_flight -= 1
+                    if not job.finished:
+                        job._pending.append((task, time.perf_counter() + requeue.delay))
+                        job._not_before = time.monotonic() + requeue.delay
+                        self._schedule(job)
+                    # A job cancelled while its task ran
+                    cleanup = job._claim_cleanup()
+                    self._work_available.notify_all()
+                if cleanup:
+                    job._cleanup()
+                continue
+            except Exception as e:
+                with self._lock:
+                    job._in_flight -= 1
+                    if not job.finished:
+                        job._pending.clear()
+                        job.status = FAILED
+                        job.error = f"{type(e).__name__}: {e}"
+                        job.finished_at = time.time()
+                    cleanup = job._claim_cleanup()
+                    self._work_available.notify_all()
+                if cleanup:
+                    job._cleanup()
+                job._notify()
+                continue
+            with job._changed:
+                job._results.append((task, value))
+            with self._lock:
+                job._in_flight -= 1
+                last = job.status == RUNNING and not job._pending and job._in_flight == 0
+                # The last running task of a failed or cancelled job
+                cleanup = job._claim_cleanup()
+                # A slot of this job is free again
+                self._work_available.notify_all()
+            if last:
+                self._finish(job)
+            else:
+                if cleanup:
+                    job._cleanup()
+                job._notify()
+
+    def _finish(self, job):
+        error = None
+        try:
+            if job._on_done is not None:
+                job._on_done(job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        # The state changes under the lock, like in cancel(), so submit() never sees a finished job without finished_at
+        with self._lock:
+            job.finished_at = time.time()
+            job.error = error
+            job.status = FAILED if error is not None else DONE
+            cleanup = job._claim_cleanup()
+        if cleanup:
+            job._cleanup()
+        job._notify()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Function to return the process-wide job queue, with CV_JOB_WORKERS worker threads (default 8)
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            workers = os.environ.get("CV_JOB_WORKERS")
+            _job_queue = JobQueue(int(workers) if workers else DEFAULT_WORKERS)
+        return _job_queue
@@ -0,0 +1,249 @@
+"""
+Durable job manifest in SQLite, so interrupted batch runs resume where they stopped
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import replace
+
+from cv_generator.generation import GenerationResult
+from cv_generator.structured import StructuredCV
+
+# Manifest of the Streamlit app's batches, kept per user so batches resume after a reload or a server restart
+DEFAULT_MANIFEST_DB = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "cv_generator", "manifest.db")
+
+# Item statuses: waiting for the API, API answer stored, API failed, PDF written
+PENDING = "pending"
+GENERATED = "generated"
+FAILED = "failed"
+RENDERED = "rendered"
+
+# Batch API job statuses after which the batch is not polled again on resume ("collected": its results are stored)
+CLOSED_BATCH_STATUSES = {"failed", "expired", "cancelled", "collected"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    settings_hash TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL REFERENCES jobs(job_id),
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    location TEXT NOT NULL,
+    experience_level TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    variant INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone_number TEXT NOT NULL,
+    status TEXT NOT NULL,
+    content TEXT,
+    structured TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    artifact TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, key)
+);
+CREATE TABLE IF NOT EXISTS batches (
+    job_id TEXT NOT NULL REFERENCES jobs(job_id),
+    provider TEXT NOT NULL,
+    batch_id TEXT NOT NULL,
+    input_file_id TEXT,
+    status TEXT,
+    keys TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, provider)
+);
+"""
+
+
+class JobManifest:
+    """
+    Record of every CV of a job: its inputs, status, the API's answer and the path of the rendered PDF.
+
+    Each update is committed straight away, so after a crash (or a Streamlit rerun) the next run of
+    the same settings skips the CVs that were already generated and only calls the API for the rest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # Results arrive from worker threads, so one connection is shared under the lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start_job(self, settings):
+        """
+        Function to return (job_id, resumed): the latest unfinished job with the same settings, or a new job
+        """
+        settings_json = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+        settings_hash = hashlib.sha256(settings_json.encode("utf-8")).hexdigest()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT job_id FROM jobs WHERE settings_hash = ? AND finished_at IS NULL ORDER BY created_at DESC LIMIT 1",
+                (settings_hash,),
+            ).fetchone()
+            if row is not None:
+                return row["job_id"], True
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (job_id, settings_hash, settings, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, settings_hash, settings_json, time.time()),
+            )
+            return job_id, False
+
+    def add_items(self, job_id, work):
+        """
+        Function to record the work items of a job, returning the work with each item's identity as first recorded.
+        Items already in the manifest keep their name, email and phone number, so a resumed CV matches its stored answer.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO items (job_id, key, position, role, location, experience_level, provider, variant,"
+                " name, email, phone_number, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (job_id, item.path, position, item.combination.role, item.combination.location,
+                     item.combination.experience_level, item.combination.provider, item.variant,
+                     item.name, item.email, item.phone_number, PENDING, now)
+                    for position, item in enumerate(work)
+                ],
+            )
+            rows = {
+                row["key"]: row for row in self._db.execute(
+                    "SELECT key, name, email, phone_number FROM items WHERE job_id = ?", (job_id,)
+                )
+            }
+        return [
+            replace(item, name=rows[item.path]["name"], email=rows[item.path]["email"], phone_number=rows[item.path]["phone_number"])
+            for item in work
+        ]
+
+    def entries(self, job_id):
+        """
+        Function to return the manifest rows of a job as dicts keyed by item key (the CV's output path)
+        """
+        with self._lock:
+            return {
+                row["key"]: dict(row)
+                for row in self._db.execute("SELECT * FROM items WHERE job_id = ? ORDER BY position", (job_id,))
+            }
+
+    def record_result(self, job_id, item, result):
+        """
+        Function to store the API's answer for an item (or its failure)
+        """
+        structured = json.dumps(result.structured.to_dict(), ensure_ascii=False) if result.structured is not None else None
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE items SET status = ?, content = ?, structured = ?, attempts = attempts + ?, updated_at = ?"
+                " WHERE job_id = ? AND key = ?",
+                (GENERATED if result.ok else FAILED, result.content, structured, result.attempts, time.time(), job_id, item.path),
+            )
+
+    def record_artifact(self, job_id, item, artifact):
+        """
+        Function to mark an item's PDF as written to artifact
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE items SET status = ?, artifact = ?, updated_at = ? WHERE job_id = ? AND key = ? AND status != ?",
+                (RENDERED, artifact, time.time(), job_id, item.path, FAILED),
+            )
+
+    def record_batch(self, job_id, provider, batch, keys):
+        """
+        Function to store the Batch API job generating the items with these keys (in custom_id order), and its status
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO batches (job_id, provider, batch_id, input_file_id, status, keys, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, provider, batch.id, getattr(batch, "input_file_id", None), getattr(batch, "status", None), json.dumps(keys), time.time()),
+            )
+
+    def close_batch(self, job_id, provider):
+        """
+        Function to mark a job's Batch API job as collected once its results are stored, so it is not polled again
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE batches SET status = 'collected', updated_at = ? WHERE job_id = ? AND provider = ?", (time.time(), job_id, provider)
+            )
+
+    def open_batch(self, job_id, provider):
+        """
+        Function to return the job's Batch API job that may still bring results (a dict with batch_id, input_file_id,
+        status and keys), or None when there is none
+        """
+        with self._lock:
+            row = self._db.execute("SELECT * FROM batches WHERE job_id = ? AND provider = ?", (job_id, provider)).fetchone()
+        if row is None or row["status"] in CLOSED_BATCH_STATUSES:
+            return None
+        return {**dict(row), "keys": json.loads(row["keys"])}
+
+    def finish_job(self, job_id):
+        """
+        Function to close a job once every item has its PDF, returning whether it was closed.
+        Jobs with failed or missing CVs stay open so the next run retries them.
+        """
+        with self._lock, self._db:
+            remaining = self._db.execute(
+                "SELECT COUNT(*) FROM items WHERE job_id = ? AND status != ?", (job_id, RENDERED)
+            ).fetchone()[0]
+            if remaining:
+                return False
+            self._db.execute("UPDATE jobs SET finished_at = ? WHERE job_id = ?", (time.time(), job_id))
+            return True
+
+
+def stored_result(entry):
+    """
+    Function to rebuild the GenerationResult of a manifest row whose answer was already stored
+    """
+    structured = StructuredCV(**json.loads(entry["structured"])) if entry["structured"] else None
+    return GenerationResult(entry["content"], attempts=0, cached=True, structured=structured)
+
+
+def split_resumed_work(manifest, job_id, work, artifact_exists=os.path.exists):
+    """
+    Function to sort a job's work items by what is left to do, returning (written, stored, remaining):
+    items whose PDF already exists, (item, GenerationResult) pairs whose answer is stored but whose PDF
+    must be written again, and items that still need the API (new, interrupted or failed).
+    """
+    entries = manifest.entries(job_id)
+    written, stored, remaining = [], [], []
+    for item in work:
+        entry = entries[item.path]
+        if entry["status"] == RENDERED and entry["artifact"] and artifact_exists(entry["artifact"]):
+            written.append(item)
+        elif entry["status"] in (GENERATED, RENDERED):
+            stored.append((item, stored_result(entry)))
+        else:
+            remaining.append(item)
+    return written, stored, remaining
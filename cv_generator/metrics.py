@@ -0,0 +1,290 @@
+"""
+Pipeline metrics: stage timings, token usage, retries and error classes, sent to pluggable sinks
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stages timed by the pipeline
+PROMPT_BUILD = "prompt_build"
+QUEUE_WAIT = "queue_wait"
+RATE_LIMIT_WAIT = "rate_limit_wait"
+API_CALL = "api_call"
+BATCH_POLL = "batch_poll"
+PDF_RENDER = "pdf_render"
+ZIP = "zip"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STATS_SAMPLES = 1000
+
+
+class Metrics:
+    """
+    Dispatcher of metric events to its sinks. With no sink attached, recording costs a clock read.
+
+    Events are dicts: {"type": "timing", "stage": ..., "seconds": ...} or
+    {"type": "count", "name": ..., "value": ...}, plus labels such as model or error.
+    """
+
+    def __init__(self, sinks=None):
+        self._sinks = tuple(sinks or ())
+        self._lock = threading.Lock()
+
+    @property
+    def sinks(self):
+        return self._sinks
+
+    def add_sink(self, sink):
+        with self._lock:
+            self._sinks = self._sinks + (sink,)
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self._sinks = tuple(s for s in self._sinks if s is not sink)
+
+    @contextmanager
+    def attached(self, *sinks):
+        """
+        Function to attach sinks for the duration of a with block
+        """
+        for sink in sinks:
+            self.add_sink(sink)
+        try:
+            yield self
+        finally:
+            for sink in sinks:
+                self.remove_sink(sink)
+
+    def emit(self, event):
+        for sink in self._sinks:
+            sink.emit(event)
+
+    def timing(self, stage, seconds, **labels):
+        """
+        Function to record how long one pass through a stage took
+        """
+        if self._sinks:
+            self.emit({"type": "timing", "stage": stage, "seconds": seconds, "time": time.time(), **labels})
+
+    def count(self, name, value=1, **labels):
+        """
+        Function to add value to a counter (tokens, retries, errors, cache hits)
+        """
+        if self._sinks and value:
+            self.emit({"type": "count", "name": name, "value": value, "time": time.time(), **labels})
+
+    @contextmanager
+    def time(self, stage, **labels):
+        """
+        Function to time the body of a with block as one pass through a stage
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing(stage, time.perf_counter() - start, **labels)
+
+
+def _labels(event):
+    return {key: value for key, value in event.items() if key not in ("type", "stage", "name", "seconds", "value", "time")}
+
+
+class JSONLSink:
+    """
+    Sink appending every event as one JSON line, for offline analysis of a run
+    """
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class PrometheusSink:
+    """
+    Sink aggregating events into Prometheus metrics: a cv_stage_seconds histogram per stage and
+    a cv_<name>_total counter per count, rendered in the text exposition format by render()
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        labels = tuple(sorted(_labels(event).items()))
+        with self._lock:
+            if event["type"] == "timing":
+                key = (event["stage"], labels)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = [[0] * len(self.buckets), 0, 0.0]
+                position = bisect.bisect_left(self.buckets, event["seconds"])
+                if position < len(self.buckets):
+                    histogram[0][position] += 1
+                histogram[1] += 1
+                histogram[2] += event["seconds"]
+            else:
+                key = (event["name"], labels)
+                self._counters[key] = self._counters.get(key, 0) + event["value"]
+
+    def render(self):
+        """
+        Function to return the metrics in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            if self._histograms:
+                lines.append("# HELP cv_stage_seconds Time spent in each stage of the CV pipeline")
+                lines.append("# TYPE cv_stage_seconds histogram")
+            for (stage, labels), (bucket_counts, count, total) in sorted(self._histograms.items()):
+                labels = {"stage": stage, **dict(labels)}
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"cv_stage_seconds_bucket{_prometheus_labels({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"cv_stage_seconds_bucket{_prometheus_labels({**labels, 'le': '+Inf'})} {count}")
+                lines.append(f"cv_stage_seconds_sum{_prometheus_labels(labels)} {total}")
+                lines.append(f"cv_stage_seconds_count{_prometheus_labels(labels)} {count}")
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE cv_{name}_total counter")
+                for (counter, labels), value in sorted(self._counters.items()):
+                    if counter == name:
+                        lines.append(f"cv_{name}_total{_prometheus_labels(dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """
+        Function to serve render() at http://host:port/metrics from a background thread, returning the server
+        """
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+class StatsSink:
+    """
+    Sink keeping per-stage statistics over the most recent samples, for the in-app stats panel and the CLI summary
+    """
+
+    def __init__(self, samples=STATS_SAMPLES):
+        self._samples = samples
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        with self._lock:
+            if event["type"] == "timing":
+                stage = self._stages.get(event["stage"])
+                if stage is None:
+                    stage = self._stages[event["stage"]] = [0, 0.0, deque(maxlen=self._samples)]
+                stage[0] += 1
+                stage[1] += event["seconds"]
+                stage[2].append(event["seconds"])
+            else:
+                key = event["name"] if "error" not in event else f"{event['name']} ({event['error']})"
+                self._counters[key] = self._counters.get(key, 0) + event["value"]
+
+    def summary(self):
+        """
+        Function to return one row per stage: count, total, mean, p50, p95 and max seconds (over the recent samples)
+        """
+        with self._lock:
+            stages = [(name, count, total, sorted(samples)) for name, (count, total, samples) in self._stages.items()]
+        rows = []
+        for name, count, total, samples in stages:
+            rows.append({
+                "stage": name,
+                "count": count,
+                "total_s": round(total, 3),
+                "mean_s": round(total / count, 4),
+                "p50_s": round(samples[(len(samples) - 1) // 2], 4),
+                "p95_s": round(samples[max(0, -(-len(samples) * 95 // 100) - 1)], 4),
+                "max_s": round(samples[-1], 4),
+            })
+        return rows
+
+    def counters(self):
+        """
+        Function to return the counters (tokens, retries, errors by class, cache hits) as a dict
+        """
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+
+_metrics = None
+_stats = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Function to return the process-wide metrics dispatcher. CV_METRICS_JSONL attaches a JSONL log
+    and CV_METRICS_PORT serves Prometheus metrics at /metrics on that port.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+            if os.environ.get("CV_METRICS_JSONL"):
+                _metrics.add_sink(JSONLSink(os.environ["CV_METRICS_JSONL"]))
+            if os.environ.get("CV_METRICS_PORT"):
+                prometheus = PrometheusSink()
+                prometheus.serve(int(os.environ["CV_METRICS_PORT"]))
+                _metrics.add_sink(prometheus)
+        return _metrics
+
+
+def get_stats_sink():
+    """
+    Function to return the process-wide StatsSink, attached to get_metrics() on first use
+    """
+    global _stats
+    metrics = get_metrics()
+    with _metrics_lock:
+        if _stats is None:
+            _stats = StatsSink()
+            metrics.add_sink(_stats)
+        return _stats
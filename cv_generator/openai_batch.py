@@ -0,0 +1,209 @@
+"""
+CV generation with the OpenAI chat completions and Batch APIs
+"""
+import json
+import os
+import time
+
+from cv_generator import prompts
+from cv_generator.generation import DEFAULT_CONCURRENCY, iter_cvs_as_completed
+from cv_generator.metrics import API_CALL, BATCH_POLL
+from cv_generator.ratelimit import RetryError, call_with_retries
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Seconds between two checks of a batch: doubled after each check, up to the maximum
+BATCH_POLL_SECONDS = 5.0
+MAX_BATCH_POLL_SECONDS = 60.0
+
+
+def build_cv_messages(roles, names, emails, phone_numbers, locations, experience_levels):
+    """
+    Function to build the chat messages of each CV from the candidate details
+    """
+    return [
+        prompts.build_cv_messages(role, name, email, phone_number, location, experience_level)
+        for role, name, email, phone_number, location, experience_level in zip(roles, names, emails, phone_numbers, locations, experience_levels)
+    ]
+
+
+def assemble_cvs(sections, names, emails, phone_numbers, locations):
+    """
+    Function to put each candidate's identity lines on top of the sections written by the model, leaving errors as they are
+    """
+    return [
+        cv if cv.startswith("Error generating CV") else prompts.assemble_cv(name, email, phone_number, location, cv)
+        for cv, name, email, phone_number, location in zip(sections, names, emails, phone_numbers, locations)
+    ]
+
+
+def iter_cvs_batch(client, roles, names, emails, phone_numbers, locations, experience_levels, model=OPENAI_MODEL, max_concurrency=DEFAULT_CONCURRENCY, rate_limiter=None, retry_policy=None):
+    """
+    Function to generate multiple CVs with one chat completion request per CV, yielding (index, cv) as each one is ready.
+    Requests go through the shared generation engine (at most max_concurrency at once), wait for the rate
+    limiter's budgets and retry transient failures per retry_policy.
+    See generate_cvs_batch_api for the asynchronous OpenAI Batch API path.
+    """
+    yield from iter_cvs_as_completed(
+        client, roles, names, emails, phone_numbers, locations, experience_levels,
+        model=model, max_concurrency=max_concurrency, rate_limiter=rate_limiter, retry_policy=retry_policy,
+    )
+
+
+def generate_cvs_batch(client, roles, names, emails, phone_numbers, locations, experience_levels, **kwargs):
+    """
+    Function to generate multiple CVs with one chat completion request per CV, returned in input order
+    """
+    results = dict(iter_cvs_batch(client, roles, names, emails, phone_numbers, locations, experience_levels, **kwargs))
+    return [results[idx] for idx in range(len(results))]
+
+
+def create_openai_client(api_key=None, base_url=None, **kwargs):
+    """
+    Function to create an OpenAI client (or a client of an OpenAI-compatible server at base_url).
+    Keyword arguments (http_client, timeout, max_retries) are passed on to the client.
+    """
+    # Imported here so that importing the package does not pay for the OpenAI SDK
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key or os.environ.get("OPENAI_API_KEY"), base_url=base_url, **kwargs)
+
+
+def build_batch_input(messages, model=OPENAI_MODEL):
+    """
+    Function to build the JSONL input file for the Batch API, with one request per CV.
+    Each request's custom_id is the CV's position so results can be mapped back in order.
+    """
+    lines = [
+        json.dumps({
+            "custom_id": f"cv-{idx}",
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {"model": model, "messages": cv_messages},
+        })
+        for idx, cv_messages in enumerate(messages)
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def call_batch_api(fn, retry_policy=None, sleep=time.sleep, stage=API_CALL):
+    """
+    Function to call a Files or Batches endpoint, retrying transient errors (the SDK's own retries are off, see
+    cv_generator.providers) and raising the last error once the call failed permanently
+    """
+    try:
+        result, _ = call_with_retries(fn, retry_policy=retry_policy, sleep=sleep, stage=stage)
+    except RetryError as e:
+        raise e.error
+    return result
+
+
+def submit_cv_batch(client, messages, model=OPENAI_MODEL, retry_policy=None, sleep=time.sleep):
+    """
+    Function to upload the batch input file and create the batch job, returning the batch object
+    """
+    batch_input = build_batch_input(messages, model=model)
+    input_file = call_batch_api(
+        lambda: client.files.create(file=("cv_batch_input.jsonl", batch_input), purpose="batch"),
+        retry_policy=retry_policy, sleep=sleep,
+    )
+    return call_batch_api(
+        lambda: client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT, completion_window="24h"),
+        retry_policy=retry_policy, sleep=sleep,
+    )
+
+
+def check_batch(client, batch_id, retry_policy=None, sleep=time.sleep):
+    """
+    Function to retrieve the current state of a batch job, retrying transient errors
+    """
+    return call_batch_api(lambda: client.batches.retrieve(batch_id), retry_policy=retry_policy, sleep=sleep, stage=BATCH_POLL)
+
+
+def cancel_batch(client, batch_id, retry_policy=None, sleep=time.sleep):
+    """
+    Function to cancel a batch job, so the requests it has not run yet are not billed
+    """
+    return call_batch_api(lambda: client.batches.cancel(batch_id), retry_policy=retry_policy, sleep=sleep)
+
+
+def wait_for_batch(client, batch_id, poll_interval=BATCH_POLL_SECONDS, max_poll_interval=MAX_BATCH_POLL_SECONDS, timeout=24 * 60 * 60, sleep=time.sleep, retry_policy=None):
+    """
+    Function to poll a batch job until it reaches a terminal status.
+    The delay between polls doubles after each check, up to max_poll_interval,
+    and transient errors while polling are retried instead of abandoning the job.
+    """
+    deadline = time.monotonic() + timeout
+    delay = poll_interval
+    while True:
+        batch = check_batch(client, batch_id, retry_policy=retry_policy, sleep=sleep)
+        if batch.status in BATCH_TERMINAL_STATUSES:
+            return batch
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"Batch {batch_id} did not finish within {timeout} seconds (status: {batch.status})")
+        sleep(delay)
+        delay = min(delay * 2, max_poll_interval)
+
+
+def collect_batch_results(client, batch, num_requests, retry_policy=None, sleep=time.sleep, usage=None):
+    """
+    Function to download the batch output and error files and map each line back to its CV by custom_id.
+    With a usage dict, the prompt_tokens, completion_tokens and calls of the successful requests are added to it,
+    and usage["requests"] maps each of their indexes to its (prompt_tokens, completion_tokens).
+    """
+    results = [f"Error generating CV: no result returned by batch {batch.id} (status: {batch.status})"] * num_requests
+
+    for file_id in (getattr(batch, "error_file_id", None), getattr(batch, "output_file_id", None)):
+        if not file_id:
+            continue
+        content = call_batch_api(lambda: client.files.content(file_id), retry_policy=retry_policy, sleep=sleep)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            idx = int(record["custom_id"].split("-", 1)[1])
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or response.get("body", {}).get("error") or f"HTTP {response.get('status_code')}"
+                if isinstance(error, dict):
+                    error = error.get("message", error)
+                results[idx] = f"Error generating CV: {error}"
+            else:
+                content = response["body"]["choices"][0]["message"].get("content") or ""
+                results[idx] = content if content.strip() else "Error generating CV: the response has no content"
+                if usage is not None:
+                    tokens = response["body"].get("usage") or {}
+                    usage["calls"] = usage.get("calls", 0) + 1
+                    for key in ("prompt_tokens", "completion_tokens"):
+                        usage[key] = usage.get(key, 0) + (tokens.get(key) or 0)
+                    usage.setdefault("requests", {})[idx] = (tokens.get("prompt_tokens"), tokens.get("completion_tokens"))
+    return results
+
+
+def generate_cvs_batch_api(client, roles, names, emails, phone_numbers, locations, experience_levels, model=OPENAI_MODEL, batch_id=None, on_batch=None, usage=None, **wait_kwargs):
+    """
+    Function to generate multiple CVs using OpenAI's Batch API: upload a JSONL file of requests,
+    create the batch job, poll it with backoff and map the output back to the inputs by custom_id.
+    With batch_id, the batch already submitted for the same inputs is polled instead of submitting a new one.
+    on_batch(batch) is called once the batch is created and once it reaches a terminal status, e.g. to record it.
+    With a usage dict, the token usage of the batch is added to it (see collect_batch_results).
+    """
+    messages = build_cv_messages(roles, names, emails, phone_numbers, locations, experience_levels)
+    if not messages:
+        return []
+
+    # Uploads, batch creation and downloads retry transient errors like the polls do
+    retry_kwargs = {key: wait_kwargs[key] for key in ("retry_policy", "sleep") if key in wait_kwargs}
+    try:
+        if batch_id is None:
+            batch = submit_cv_batch(client, messages, model=model, **retry_kwargs)
+            if on_batch is not None:
+                on_batch(batch)
+            batch_id = batch.id
+        batch = wait_for_batch(client, batch_id, **wait_kwargs)
+        if on_batch is not None:
+            on_batch(batch)
+        return assemble_cvs(collect_batch_results(client, batch, len(messages), usage=usage, **retry_kwargs), names, emails, phone_numbers, locations)
+    except Exception as e:
+        return [f"Error generating CV: {e}"] * len(messages)
@@ -0,0 +1,148 @@
+"""
+PDF rendering of generated CVs
+"""
+import copy
+import threading
+
+from fpdf import FPDF
+
+from cv_generator.structured import StructuredCV
+from cv_generator.text import sanitize_text
+
+# Fonts used in the body of a CV, registered once in the template
+BODY_FONTS = [('Helvetica', 'B', 12), ('Helvetica', '', 12)]
+
+
+def _build_template():
+    """
+    Function to build the first page shared by every CV: title, decorative line and registered fonts
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    
+    # Register the body fonts up front, so documents cloned from the template never load font metrics
+    for family, style, size in BODY_FONTS:
+        pdf.set_font(family, style, size)
+    
+    # Title section of the PDF
+    pdf.set_font('Helvetica', 'B', 16)
+    pdf.set_text_color(0, 102, 204)  # Blue color for title
+    pdf.cell(0, 10, 'Curriculum Vitae', ln=True, align='C')
+    pdf.ln(10)
+
+    # Add a decorative line below the title
+    pdf.set_draw_color(0, 102, 204)
+    pdf.set_line_width(0.5)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(10)
+    return pdf
+
+
+_template = None
+_template_lock = threading.Lock()
+_char_widths = {}
+
+
+def _new_document():
+    """
+    Function to start a CV from a copy of the template, built once per process
+    """
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = _build_template()
+    # A shallow copy, plus fresh copies of the containers FPDF mutates (pages, fonts, links, ...).
+    # Character width tables are shared since they never change.
+    pdf = copy.copy(_template)
+    for name, value in vars(_template).items():
+        if isinstance(value, dict):
+            setattr(pdf, name, {key: item.copy() if isinstance(item, (dict, list)) else item for key, item in value.items()})
+        elif isinstance(value, list):
+            setattr(pdf, name, list(value))
+    return pdf
+
+
+def _fits_on_one_line(pdf, line):
+    """
+    Function to check whether a line fits within the page width in the current font, as multi_cell would measure it
+    """
+    font = pdf.current_font['name']
+    widths = _char_widths.get(font)
+    if widths is None:
+        # Width of every latin-1 character, indexed by its byte value
+        cw = pdf.current_font['cw']
+        widths = _char_widths[font] = [cw.get(chr(code), 0) for code in range(256)]
+    wmax = (pdf.w - pdf.r_margin - pdf.x - 2 * pdf.c_margin) * 1000.0 / pdf.font_size
+    return sum(map(widths.__getitem__, line.encode('latin-1'))) <= wmax
+
+
+def _text_lines(cv_content):
+    """
+    Function to split free-text CV content into (is_heading, text) lines, treating lines ending in ':' as headings
+    """
+    # Made safe for the built-in fonts once for the whole document
+    return [(line.endswith(':'), line) for line in (line.strip() for line in sanitize_text(cv_content).split('\n'))]
+
+
+def _write_line(pdf, is_heading, line):
+    """
+    Function to write one heading or content line of a CV
+    """
+    if is_heading:
+        # New section heading
+        pdf.set_font('Helvetica', 'B', 12)
+        pdf.set_text_color(0, 51, 102)  # Dark blue color for section headings
+        pdf.cell(0, 10, line, ln=True)
+        pdf.set_font('Helvetica', '', 12)
+        pdf.set_text_color(0, 0, 0)  # Reset color to black for content
+    elif line:
+        # Content under the current section. Most lines fit on one line, where a single
+        # cell gives the same output as multi_cell without its per-character line breaking.
+        if '\n' not in line and _fits_on_one_line(pdf, line):
+            pdf.cell(0, 10, line, ln=True)
+        else:
+            pdf.multi_cell(0, 10, line)
+    pdf.ln(2)
+
+
+def render_cv_pdf(cv_content):
+    """
+    Function to render CV content to PDF bytes in memory using built-in fonts.
+    cv_content is either free text or a StructuredCV, whose sections are laid out without guessing headings.
+    Only the body is laid out per CV; the title page comes from a template built once per process.
+    """
+    pdf = _new_document()
+
+    # Content Sections. Structured CVs are laid out as they are; free text is laid out
+    # line by line, skipping lines FPDF cannot handle.
+    if isinstance(cv_content, StructuredCV):
+        for is_heading, text in cv_content.to_lines():
+            _write_line(pdf, is_heading, sanitize_text(text))
+    else:
+        for is_heading, line in _text_lines(cv_content):
+            try:
+                _write_line(pdf, is_heading, line)
+            except Exception:
+                continue
+
+    # Render the PDF document to bytes (FPDF builds it as a latin-1 string, which
+    # cannot fail since every line has been sanitised)
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def save_cv_as_pdf(cv_content, filename):
+    """
+    Function to save CV content to a PDF file using built-in fonts
+    """
+    with open(filename, 'wb') as f:
+        f.write(render_cv_pdf(cv_content))
+
+
+def cv_filename(role, index, name=None):
+    """
+    Function to build the PDF file name for the index-th CV (1-based) of a job role,
+    optionally followed by the candidate's name
+    """
+    parts = [role, str(index)] + ([name] if name else [])
+    return "cv_" + "_".join(part.replace(" ", "_").replace("/", "_") for part in parts) + ".pdf"
@@ -0,0 +1,317 @@
+"""
+Batch job specifications covering many role x location x experience combinations, expanded into one work queue
+"""
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from cv_generator.exporters import DEFAULT_FORMATS, ExportError, parse_formats
+from cv_generator.generation import DEFAULT_CONCURRENCY, GenerationResult, iter_cv_results_as_completed
+from cv_generator.identities import generate_identities
+from cv_generator.openai_batch import BATCH_TERMINAL_STATUSES, generate_cvs_batch_api
+from cv_generator.pdf import cv_filename
+from cv_generator.providers import PROVIDERS as CHAT_PROVIDERS, create_client, get_provider
+from cv_generator.roles import EXPERIENCE_LEVELS
+from cv_generator.text import sanitize_text
+
+# Chat providers get one request per CV; openai-batch puts the CVs into one OpenAI Batch API job
+PROVIDERS = CHAT_PROVIDERS + ["openai-batch"]
+BATCH_PROVIDERS = {"openai-batch": "openai"}
+
+_DONE = object()
+
+
+class JobSpecError(ValueError):
+    """
+    Raised when a job specification is malformed
+    """
+
+
+@dataclass
+class Combination:
+    """
+    One role, location and experience level, and how many CVs to generate for it
+    """
+    role: str
+    location: str
+    experience_level: str
+    count: int
+    provider: str = "groq"
+
+    @property
+    def folder(self):
+        """
+        Folder of this combination's PDFs, e.g. Data_Scientist/Berlin_Germany/High
+        """
+        return "/".join(
+            re.sub(r"[^A-Za-z0-9]+", "_", sanitize_text(part)).strip("_") or "_"
+            for part in (self.role, self.location, self.experience_level)
+        )
+
+
+@dataclass
+class JobSpec:
+    """
+    Combinations to generate, with the concurrency of each provider, an optional identity seed and the export formats
+    """
+    combinations: list
+    concurrency: dict = field(default_factory=dict)
+    seed: Optional[int] = None
+    formats: list = field(default_factory=lambda: list(DEFAULT_FORMATS))
+
+    @property
+    def total(self):
+        return sum(combination.count for combination in self.combinations)
+
+
+@dataclass
+class WorkItem:
+    """
+    One CV of the work queue: its combination, its number within the combination (variant), identity and output path
+    """
+    combination: Combination
+    variant: int
+    name: str
+    email: str
+    phone_number: str
+    path: str
+
+
+def _as_list(entry, plural, singular, default=None):
+    """
+    Function to read a field given either as a list (plural key) or a single value (singular key)
+    """
+    if plural in entry:
+        values = entry[plural]
+        if isinstance(values, str):
+            values = [values]
+    elif singular in entry:
+        values = [entry[singular]]
+    elif default is not None:
+        values = default
+    else:
+        raise JobSpecError(f"job is missing '{plural}'")
+    if not isinstance(values, list) or not values or not all(isinstance(value, str) and value.strip() for value in values):
+        raise JobSpecError(f"'{plural}' must be a non-empty list of names")
+    return [value.strip() for value in values]
+
+
+def parse_job_spec(data):
+    """
+    Function to validate a job specification (as loaded from YAML or JSON) and expand its jobs into combinations.
+
+    Each entry of "jobs" lists roles, locations and experience_levels (or a single role, location and
+    experience_level) and a count of CVs for every combination of them; "defaults" fills in missing fields.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("jobs"), list) or not data["jobs"]:
+        raise JobSpecError("the job specification needs a non-empty 'jobs' list")
+    defaults = data.get("defaults") or {}
+    if not isinstance(defaults, dict):
+        raise JobSpecError("'defaults' must be a mapping")
+
+    combinations = []
+    for number, job in enumerate(data["jobs"], start=1):
+        if not isinstance(job, dict):
+            raise JobSpecError(f"job {number} must be a mapping")
+        entry = {**defaults, **job}
+        try:
+            roles = _as_list(entry, "roles", "role")
+            locations = _as_list(entry, "locations", "location")
+            experience_levels = _as_list(entry, "experience_levels", "experience_level", default=["Random"])
+        except JobSpecError as e:
+            raise JobSpecError(f"job {number}: {e}") from None
+        count = entry.get("count", 1)
+        provider = entry.get("provider", "groq")
+        unknown = [level for level in experience_levels if level not in EXPERIENCE_LEVELS]
+        if unknown:
+            raise JobSpecError(f"job {number}: unknown experience level {unknown[0]!r} (choose from {', '.join(EXPERIENCE_LEVELS)})")
+        if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+            raise JobSpecError(f"job {number}: 'count' must be a positive integer")
+        if provider not in PROVIDERS:
+            raise JobSpecError(f"job {number}: unknown provider {provider!r} (choose from {', '.join(PROVIDERS)})")
+        for role, location, experience_level in itertools.product(roles, locations, experience_levels):
+            combinations.append(Combination(role, location, experience_level, count, provider))
+
+    concurrency = data.get("concurrency") or {}
+    if not isinstance(concurrency, dict) or not all(
+        provider in PROVIDERS and isinstance(slots, int) and slots >= 1 for provider, slots in concurrency.items()
+    ):
+        raise JobSpecError("'concurrency' must map providers to positive integers")
+    seed = data.get("seed")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise JobSpecError("'seed' must be an integer")
+    formats = data.get("formats", DEFAULT_FORMATS)
+    if not isinstance(formats, (str, list)):
+        raise JobSpecError("'formats' must be a list of export formats")
+    try:
+        formats = parse_formats(formats)
+    except ExportError as e:
+        raise JobSpecError(str(e)) from None
+    return JobSpec(combinations, concurrency=concurrency, seed=seed, formats=formats)
+
+
+def load_job_spec(path):
+    """
+    Function to read a job specification from a YAML (.yaml/.yml) or JSON file
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise JobSpecError("PyYAML is needed to read YAML job specifications (pip install pyyaml), or use JSON") from None
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise JobSpecError(f"{path} is not valid YAML: {e}") from None
+    else:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise JobSpecError(f"{path} is not valid JSON: {e}") from None
+    return parse_job_spec(data)
+
+
+def plan_work(spec, per_combination_folders=True):
+    """
+    Function to expand a job specification into one work queue.
+    Combinations are interleaved (the first CV of each, then the second of each, ...) so every
+    combination makes progress from the start, and each gets its own identities and output folder.
+    """
+    queues = []
+    for number, combination in enumerate(spec.combinations):
+        seed = spec.seed + number if spec.seed is not None else None
+        names, emails, phone_numbers = generate_identities(combination.count, combination.location, seed=seed)
+        folder = combination.folder + "/" if per_combination_folders else ""
+        queues.append([
+            WorkItem(combination, variant, names[variant], emails[variant], phone_numbers[variant], folder + cv_filename(combination.role, variant + 1))
+            for variant in range(combination.count)
+        ])
+    return [item for round_ in itertools.zip_longest(*queues) for item in round_ if item is not None]
+
+
+def _iter_chat(items, client, concurrency, **kwargs):
+    completed = iter_cv_results_as_completed(
+        client,
+        roles=[item.combination.role for item in items],
+        names=[item.name for item in items],
+        emails=[item.email for item in items],
+        phone_numbers=[item.phone_number for item in items],
+        locations=[item.combination.location for item in items],
+        experience_levels=[item.combination.experience_level for item in items],
+        variants=[item.variant for item in items],
+        max_concurrency=concurrency,
+        **kwargs,
+    )
+    for idx, result in completed:
+        yield items[idx], result
+
+
+def _iter_openai_batch(items, client, provider="openai-batch", manifest=None, job_id=None):
+    # A batch submitted by an interrupted run of the same items is polled again rather than paid for twice
+    submitted = manifest.open_batch(job_id, provider) if manifest is not None else None
+    if submitted is not None and sorted(submitted["keys"]) == sorted(item.path for item in items):
+        by_key = {item.path: item for item in items}
+        items = [by_key[key] for key in submitted["keys"]]
+    else:
+        submitted = None
+
+    statuses = []
+
+    def on_batch(batch):
+        statuses.append(batch.status)
+        if manifest is not None:
+            manifest.record_batch(job_id, provider, batch, [item.path for item in items])
+
+    usage = {}
+    cvs = generate_cvs_batch_api(
+        client,
+        batch_id=submitted["batch_id"] if submitted is not None else None,
+        on_batch=on_batch,
+        # The Batch API job generates with its chat provider's configured model, as priced by the estimator
+        model=get_provider(BATCH_PROVIDERS[provider]).model,
+        roles=[item.combination.role for item in items],
+        names=[item.name for item in items],
+        emails=[item.email for item in items],
+        phone_numbers=[item.phone_number for item in items],
+        locations=[item.combination.location for item in items],
+        experience_levels=[item.combination.experience_level for item in items],
+        usage=usage,
+    )
+    # Each CV carries the tokens of its own request, so the run's actual usage counts Batch API CVs too
+    tokens = usage.get("requests", {})
+    for idx, (item, cv) in enumerate(zip(items, cvs)):
+        prompt_tokens, completion_tokens = tokens.get(idx, (None, None))
+        yield item, GenerationResult(cv, attempts=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    # A batch that was never seen finishing (e.g. the wait timed out) is kept for the next run to poll
+    if manifest is not None and statuses and statuses[-1] in BATCH_TERMINAL_STATUSES:
+        manifest.close_batch(job_id, provider)
+
+
+def client_for(provider, concurrency=None):
+    """
+    Function to create the client of a work queue provider (the OpenAI client for openai-batch),
+    with a connection pool sized for concurrency calls in flight
+    """
+    return create_client(BATCH_PROVIDERS.get(provider, provider), concurrency=concurrency)
+
+
+def iter_work_results(work, clients, concurrency=None, manifest=None, job_id=None, rate_limiters=None, **kwargs):
+    """
+    Function to generate every CV of a work queue, yielding (WorkItem, GenerationResult) pairs as soon as each CV is ready.
+
+    clients maps each provider used by the queue to its client (see client_for). Chat provider CVs run
+    through the concurrent engine with the provider's model and concurrency[provider] slots, OpenAI batch
+    CVs go into one Batch API job, and the providers run side by side. With a manifest, the Batch API job is
+    recorded under job_id so a resumed run polls it instead of submitting it again. rate_limiters maps providers to
+    their rate limiters. Other keyword arguments (cache, refresh, rate_limiter, retry_policy, structured) are passed on to the engine.
+    """
+    concurrency = concurrency or {}
+    rate_limiters = rate_limiters or {}
+    by_provider = {}
+    for item in work:
+        by_provider.setdefault(item.combination.provider, []).append(item)
+
+    streams = []
+    for provider, items in by_provider.items():
+        if provider == "openai-batch":
+            streams.append(_iter_openai_batch(items, clients[provider], provider, manifest=manifest, job_id=job_id))
+        else:
+            chat_kwargs = {"model": get_provider(provider).model, **kwargs}
+            if provider in rate_limiters:
+                chat_kwargs["rate_limiter"] = rate_limiters[provider]
+            streams.append(_iter_chat(items, clients[provider], concurrency.get(provider, DEFAULT_CONCURRENCY), **chat_kwargs))
+    if len(streams) == 1:
+        yield from streams[0]
+        return
+
+    # One thread per provider, merged into a single stream as results arrive
+    results = queue.Queue()
+
+    def drain(stream):
+        try:
+            for pair in stream:
+                results.put(pair)
+        except BaseException as e:
+            results.put((_DONE, e))
+        else:
+            results.put((_DONE, None))
+
+    threads = [threading.Thread(target=drain, args=(stream,), name="provider-stream", daemon=True) for stream in streams]
+    for thread in threads:
+        thread.start()
+    running = len(threads)
+    while running:
+        item, result = results.get()
+        if item is _DONE:
+            running -= 1
+            if result is not None:
+                raise result
+            continue
+        yield item, result
@@ -0,0 +1,103 @@
+"""
+Prompts asking the model for the CV sections, with the candidate's identity supplied rather than invented
+"""
+
+# Sections the model writes, in order. The identity lines above them are filled in locally.
+CV_SECTIONS = [
+    "Languages",
+    "Applicant Key Role",
+    "Years of Experience",
+    "Skills",
+    "Education",
+    "Projects",
+    "Certifications",
+    "Experiences",
+    "References",
+]
+
+
+def build_identity_header(name, email, phone_number, location):
+    """
+    Function to build the identity lines at the top of a CV
+    """
+    return (
+        f"Name: {name}\n"
+        f"Email: {email}\n"
+        f"Phone Number: {phone_number}\n"
+        f"Location: {location}\n"
+    )
+
+
+def build_sections_message(role, location, experience_level):
+    """
+    Function to build the message asking for the CV sections. It does not depend on the
+    candidate's identity, so it also identifies cached CVs for the same settings.
+    """
+    return {
+        "role": "system",
+        "content": (
+            f"Generate a CV for the role of {role}.\n"
+            f"Please use only English characters. The candidate is based in {location}.\n"
+            f"Their name, email and phone number are given by the user and are added above your text, so do not repeat them.\n"
+            f"Write only the following sections, each heading on its own line ending with a colon:\n"
+            f"Languages: \n"
+            f"Applicant Key Role:\n"
+            f"Years of Experience: value should be an integer number based on {experience_level} number of years\n"
+            f"Skills: \n"
+            f"Education:\n"
+            f"Projects: \n"
+            f"Certifications: \n"
+            f"Experiences: \n"
+            f"References: Create Random References based on the candidate's experience\n"
+        ),
+    }
+
+
+def build_json_sections_message(role, location, experience_level):
+    """
+    Function to build the message asking for the CV sections as a JSON object matching structured.CV_JSON_SCHEMA
+    """
+    return {
+        "role": "system",
+        "content": (
+            f"Generate a CV for the role of {role}.\n"
+            f"Please use only English characters. The candidate is based in {location}.\n"
+            f"Their name, email and phone number are given by the user and are added separately, so do not include them.\n"
+            f"Answer with a single JSON object with exactly these keys:\n"
+            f'"languages": list of strings\n'
+            f'"applicant_key_role": string\n'
+            f'"years_of_experience": integer number of years based on {experience_level} experience\n'
+            f'"skills": list of strings\n'
+            f'"education": list of strings, one per degree\n'
+            f'"projects": list of strings, one per project\n'
+            f'"certifications": list of strings\n'
+            f'"experiences": list of strings, one per position\n'
+            f'"references": list of strings, random references based on the candidate\'s experience\n'
+        ),
+    }
+
+
+def build_identity_message(name, email, phone_number, location):
+    """
+    Function to build the message giving the model the pre-generated identity of the candidate
+    """
+    return {"role": "user", "content": build_identity_header(name, email, phone_number, location)}
+
+
+def build_cv_messages(role, name, email, phone_number, location, experience_level, structured=False):
+    """
+    Function to build the chat messages asking the model for the sections of one candidate's CV,
+    as free text or, with structured set, as a JSON object
+    """
+    sections_message = build_json_sections_message if structured else build_sections_message
+    return [
+        sections_message(role, location, experience_level),
+        build_identity_message(name, email, phone_number, location),
+    ]
+
+
+def assemble_cv(name, email, phone_number, location, sections):
+    """
+    Function to put the identity lines on top of the sections written by the model
+    """
+    return build_identity_header(name, email, phone_number, location) + sections.strip() + "\n"
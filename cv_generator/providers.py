@@ -0,0 +1,188 @@
+"""
+Chat completion providers (Groq, OpenAI, a local OpenAI-compatible server and an offline fake), chosen by name
+"""
+import importlib.util
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from cv_generator import generation, openai_batch
+
+DEFAULT_PROVIDER = "groq"
+LOCAL_BASE_URL = "http://localhost:11434/v1"
+LOCAL_MODEL = "llama3.2"
+
+# Connection pool of shared clients, sized for the apps' highest concurrency setting
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+
+class ProviderError(ValueError):
+    """
+    Raised when an unknown provider is requested
+    """
+
+
+@dataclass(frozen=True)
+class HTTPSettings:
+    """
+    Connection pool and timeouts of a provider client's HTTP connections
+    """
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY
+    timeout: float = DEFAULT_TIMEOUT
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+
+
+def http_settings(concurrency=None):
+    """
+    Function to build the HTTP settings for a level of concurrency: one kept-alive connection per API call
+    in flight, so no call waits for a connection or pays for a new TLS handshake.
+    CV_HTTP_MAX_CONNECTIONS, CV_HTTP_KEEPALIVE_EXPIRY, CV_HTTP_TIMEOUT and CV_HTTP_CONNECT_TIMEOUT override the defaults.
+    """
+    max_connections = os.environ.get("CV_HTTP_MAX_CONNECTIONS")
+    return HTTPSettings(
+        max_connections=int(max_connections) if max_connections else max(1, concurrency or DEFAULT_MAX_CONNECTIONS),
+        keepalive_expiry=float(os.environ.get("CV_HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY)),
+        timeout=float(os.environ.get("CV_HTTP_TIMEOUT", DEFAULT_TIMEOUT)),
+        connect_timeout=float(os.environ.get("CV_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+    )
+
+
+def create_http_client(settings):
+    """
+    Function to create the httpx client of a provider client, using HTTP/2 when the h2 package is installed
+    """
+    # Imported here so that importing the package does not pay for httpx
+    import httpx
+
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+        http2=importlib.util.find_spec("h2") is not None,
+    )
+
+
+@dataclass(frozen=True)
+class Provider:
+    """
+    A chat completions backend: its default model, how to create its client, and whether
+    it offers a Batch API. Every client exposes chat.completions.create, so the generation engine works
+    with any of them, and one client (with its connection pool) is shared by all the calls of a run.
+    The client factories take the keyword arguments of the SDK clients (http_client, max_retries).
+    """
+    name: str
+    model: str
+    create_client: Callable
+    supports_batch: bool = False
+    api_key_env: Optional[str] = None
+    uses_http: bool = True
+
+
+def _local_base_url():
+    return os.environ.get("LOCAL_LLM_BASE_URL", LOCAL_BASE_URL)
+
+
+def _local_api_key():
+    # Local servers usually ignore the key, but the OpenAI SDK insists on one
+    return os.environ.get("LOCAL_LLM_API_KEY", "local")
+
+
+def _fake_client_settings():
+    return {
+        "latency": float(os.environ.get("CV_FAKE_LATENCY", 0)),
+        "jitter": float(os.environ.get("CV_FAKE_JITTER", 0)),
+        "error_rate": float(os.environ.get("CV_FAKE_ERROR_RATE", 0)),
+    }
+
+
+def _fake_client(**kwargs):
+    from cv_generator.fake_llm import FakeChatClient
+
+    return FakeChatClient(**_fake_client_settings())
+
+
+def _providers():
+    # Built on each lookup so models and URLs follow the environment, and the client
+    # factories are looked up on their modules at call time so they can be replaced in tests
+    return {
+        "groq": Provider(
+            name="groq",
+            model=os.environ.get("GROQ_MODEL", generation.GROQ_MODEL),
+            create_client=lambda **kwargs: generation.create_groq_client(**kwargs),
+            api_key_env="GROQ_API_KEY",
+        ),
+        "openai": Provider(
+            name="openai",
+            model=os.environ.get("OPENAI_MODEL", openai_batch.OPENAI_MODEL),
+            create_client=lambda **kwargs: openai_batch.create_openai_client(**kwargs),
+            supports_batch=True,
+            api_key_env="OPENAI_API_KEY",
+        ),
+        "local": Provider(
+            name="local",
+            model=os.environ.get("LOCAL_LLM_MODEL", LOCAL_MODEL),
+            create_client=lambda **kwargs: openai_batch.create_openai_client(api_key=_local_api_key(), base_url=_local_base_url(), **kwargs),
+        ),
+        "fake": Provider(
+            name="fake",
+            model="fake-cv-model",
+            create_client=_fake_client,
+            uses_http=False,
+        ),
+    }
+
+
+PROVIDERS = ["groq", "openai", "local", "fake"]
+
+
+def get_provider(name=None):
+    """
+    Function to return a provider by name, defaulting to the CV_PROVIDER environment variable (or groq)
+    """
+    name = name or os.environ.get("CV_PROVIDER") or DEFAULT_PROVIDER
+    try:
+        return _providers()[name]
+    except KeyError:
+        raise ProviderError(f"unknown provider {name!r} (choose from {', '.join(PROVIDERS)})") from None
+
+
+def _client_kwargs(provider, concurrency):
+    if not provider.uses_http:
+        return {}
+    # Transient errors are retried by cv_generator.ratelimit, which also paces the calls,
+    # so the SDK's own retries are turned off rather than stacked on top
+    return {"http_client": create_http_client(http_settings(concurrency)), "max_retries": 0}
+
+
+def create_client(name=None, concurrency=None):
+    """
+    Function to create the chat completions client of a provider, with a connection pool sized for concurrency calls in flight
+    """
+    provider = get_provider(name)
+    return provider.create_client(**_client_kwargs(provider, concurrency))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name=None, concurrency=None):
+    """
+    Function to return the process-wide client of a provider, created on first use.
+    Streamlit reruns and concurrent sessions share it, so its warm connections are reused
+    instead of each rerun opening new sockets and paying for new TLS handshakes.
+    """
+    provider = get_provider(name)
+    key = (provider.name, provider.model, http_settings(concurrency))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = provider.create_client(**_client_kwargs(provider, concurrency))
+        return _clients[key]
@@ -0,0 +1,232 @@
+"""
+Rate limiting and retries for LLM API calls
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+
+from cv_generator.metrics import API_CALL, RATE_LIMIT_WAIT, get_metrics
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+# Rough completion size of one CV, used to reserve tokens-per-minute budget before a call
+DEFAULT_COMPLETION_TOKENS = 1000
+
+
+class RetryError(Exception):
+    """
+    Raised when a call failed permanently, carrying the original error and the number of attempts made
+    """
+
+    def __init__(self, error, attempts):
+        super().__init__(str(error))
+        self.error = error
+        self.attempts = attempts
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at rate_per_minute, holding at most capacity tokens.
+
+    reserve() deducts immediately and returns how long the caller has to wait, so
+    callers are served in arrival order without holding the lock while sleeping.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1):
+        """
+        Function to take amount tokens from the bucket, returning the seconds to wait before using them
+        """
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount):
+        """
+        Function to give back (positive) or take extra (negative) tokens after the real cost is known
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets shared by every call to one provider
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute, clock=clock) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self._clock = clock
+        self._sleep = sleep
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens=0):
+        """
+        Function to block until a request of estimated_tokens fits in the budgets, returning the seconds waited
+        """
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and estimated_tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - self._clock())
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """
+        Function to correct the tokens-per-minute budget once the real token usage of a call is known
+        """
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds):
+        """
+        Function to hold back every caller for the given number of seconds, e.g. after a Retry-After header
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+class RetryPolicy:
+    """
+    Retry settings for transient failures: jittered exponential backoff between attempts
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt):
+        """
+        Function to return the delay before the next attempt, with "equal jitter" to spread out retries
+        """
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error):
+    """
+    Function to tell whether an API error is transient (rate limits, timeouts, server errors)
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES or isinstance(error, (ConnectionError, TimeoutError))
+
+
+def retry_after_seconds(error):
+    """
+    Function to read the Retry-After (or retry-after-ms) header of an API error, in seconds
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    headers = {str(k).lower(): v for k, v in headers.items()}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def call_with_retries(fn, rate_limiter=None, retry_policy=None, estimated_tokens=0, sleep=time.sleep, stage=API_CALL, labels=None):
+    """
+    Function to call fn() within the rate limits, retrying transient failures.
+    Returns (result, attempts); raises RetryError once the call failed permanently.
+    The wait for the rate limiter and each attempt are timed (as stage, with the outcome and labels) in the pipeline metrics.
+    """
+    retry_policy = retry_policy or RetryPolicy()
+    metrics = get_metrics()
+    labels = labels or {}
+    attempt = 0
+    while True:
+        attempt += 1
+        if rate_limiter is not None:
+            metrics.timing(RATE_LIMIT_WAIT, rate_limiter.acquire(estimated_tokens), **labels)
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            metrics.timing(stage, time.perf_counter() - start, outcome=type(e).__name__, **labels)
+            if attempt >= retry_policy.max_attempts or not is_retryable(e):
+                raise RetryError(e, attempt) from e
+            retry_after = retry_after_seconds(e)
+            if retry_after is not None and rate_limiter is not None:
+                # The provider asked everyone to slow down, not just this call
+                rate_limiter.pause(retry_after)
+                continue
+            sleep(retry_after if retry_after is not None else retry_policy.backoff(attempt))
+        else:
+            metrics.timing(stage, time.perf_counter() - start, outcome="ok", **labels)
+            return result, attempt
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def rate_limiter_from_env(provider, requests_per_minute=None, tokens_per_minute=None):
+    """
+    Function to create a rate limiter for a provider; budgets not given come from the
+    <PROVIDER>_RPM and <PROVIDER>_TPM environment variables (unset means unlimited)
+    """
+    prefix = provider.upper().replace("-", "_")
+    rpm = os.environ.get(f"{prefix}_RPM")
+    tpm = os.environ.get(f"{prefix}_TPM")
+    return RateLimiter(
+        requests_per_minute=requests_per_minute if requests_per_minute is not None else float(rpm) if rpm else None,
+        tokens_per_minute=tokens_per_minute if tokens_per_minute is not None else float(tpm) if tpm else None,
+    )
+
+
+def get_rate_limiter(provider):
+    """
+    Function to return the process-wide rate limiter of a provider, with the budgets of its environment variables
+    (see rate_limiter_from_env)
+    """
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = rate_limiter_from_env(provider)
+        return _rate_limiters[provider]
@@ -0,0 +1,123 @@
+"""
+PDF rendering in worker processes, decoupled from CV generation
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from cv_generator.metrics import PDF_RENDER, get_metrics
+from cv_generator.pdf import render_cv_pdf
+
+_FEED_DONE = object()
+_FEED_ERROR = object()
+
+
+class PDFRenderPool:
+    """
+    Pool of worker processes rendering CV text to PDF bytes, so FPDF layout uses every core
+    and overlaps with the API calls still in flight. With max_workers=0 PDFs are rendered
+    in the calling process instead, which avoids the process start-up cost for tiny batches.
+    """
+
+    def __init__(self, max_workers=None, mp_context=None):
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self._executor = None
+        if self.max_workers > 0:
+            # "spawn" workers do not inherit the threads (and locks) of a Streamlit server
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=mp_context or multiprocessing.get_context("spawn"),
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def submit(self, cv_content):
+        """
+        Function to queue one CV for rendering, returning a Future of its PDF bytes
+        """
+        if self._executor is not None:
+            return self._executor.submit(render_cv_pdf, cv_content)
+        future = Future()
+        try:
+            future.set_result(render_cv_pdf(cv_content))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self):
+        """
+        Function to stop the worker processes
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def render_as_completed(completed_cvs, render_pool):
+    """
+    Function to render CVs while they are still being generated.
+
+    completed_cvs yields (key, item) pairs, where item is the CV text, a StructuredCV or a GenerationResult.
+    A feeder thread hands each CV to the render pool as soon as it arrives, and this
+    generator yields (key, item, pdf_bytes) as soon as each PDF is rendered. Each PDF's time
+    from submission to completion (waiting for a worker included) is recorded in the pipeline metrics.
+    """
+    rendered = queue.Queue()
+    metrics = get_metrics()
+
+    def done(future, key, item, start):
+        metrics.timing(PDF_RENDER, time.perf_counter() - start)
+        rendered.put((key, item, future))
+
+    def feed():
+        submitted = 0
+        try:
+            for key, item in completed_cvs:
+                # Structured CVs are laid out from their sections, other results from their text
+                start = time.perf_counter()
+                future = render_pool.submit(getattr(item, "structured", None) or getattr(item, "content", item))
+                future.add_done_callback(lambda f, key=key, item=item, start=start: done(f, key, item, start))
+                submitted += 1
+        except BaseException as e:
+            rendered.put((_FEED_ERROR, e, None))
+        finally:
+            rendered.put((_FEED_DONE, submitted, None))
+
+    feeder = threading.Thread(target=feed, name="render-feeder", daemon=True)
+    feeder.start()
+
+    total = None
+    received = 0
+    while total is None or received < total:
+        key, item, future = rendered.get()
+        if key is _FEED_DONE:
+            total = item
+            continue
+        if key is _FEED_ERROR:
+            raise item
+        received += 1
+        yield key, item, future.result()
+    feeder.join()
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool():
+    """
+    Function to return the process-wide render pool, sized by CV_RENDER_WORKERS (default: one per CPU)
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            workers = os.environ.get("CV_RENDER_WORKERS")
+            _render_pool = PDFRenderPool(int(workers) if workers else None)
+        return _render_pool
@@ -0,0 +1,103 @@
+"""
+Searchable, paginated views over the CVs of a session's batches, so the page only holds the visible CVs
+"""
+import math
+from dataclasses import dataclass
+
+DEFAULT_PAGE_SIZE = 10
+PAGE_SIZES = [5, 10, 25, 50]
+# Characters of a CV shown until its full text is asked for
+PREVIEW_CHARS = 300
+
+# Result statuses, and the status filters offered for them
+OK = "ok"
+ERROR = "error"
+NEAR_DUPLICATE = "near-duplicate"
+STATUS_FILTERS = {"All": None, "Generated": OK, "Errors": ERROR, "Near-duplicates": NEAR_DUPLICATE}
+
+
+@dataclass
+class ResultEntry:
+    """
+    One CV of a batch: its batch, 1-based number and size of the batch, role, output path and result
+    (a GenerationResult, or the CV text)
+    """
+    job_id: str
+    number: int
+    total: int
+    role: str
+    path: str
+    result: object
+
+    @property
+    def content(self):
+        return getattr(self.result, "content", self.result)
+
+    @property
+    def status(self):
+        ok = getattr(self.result, "ok", None)
+        if ok is None:
+            ok = not self.content.startswith("Error generating CV")
+        if not ok:
+            return ERROR
+        return NEAR_DUPLICATE if getattr(self.result, "duplicate_of", None) is not None else OK
+
+    @property
+    def key(self):
+        return f"{self.job_id}_{self.number}"
+
+    def preview(self, chars=PREVIEW_CHARS):
+        """
+        Function to return the start of the CV text, cut at the end of a line when there is one
+        """
+        content = self.content
+        if len(content) <= chars:
+            return content
+        cut = content.rfind("\n", 0, chars)
+        return content[:cut if cut > 0 else chars].rstrip() + " …"
+
+
+def filter_entries(entries, query="", role=None, status=None):
+    """
+    Function to keep the entries of a role and status whose text contains query (case-insensitive)
+    """
+    query = query.strip().lower()
+    return [
+        entry for entry in entries
+        if (role is None or entry.role == role)
+        and (status is None or entry.status == status)
+        and (not query or query in entry.content.lower())
+    ]
+
+
+@dataclass
+class Page:
+    """
+    The entries of one page, its 1-based number, the number of pages and the number of matching entries
+    """
+    entries: list
+    number: int
+    pages: int
+    total: int
+    start: int
+
+    @property
+    def end(self):
+        return self.start + len(self.entries)
+
+
+def page_count(total, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Function to return the number of pages of total entries (at least one, so an empty view has a page)
+    """
+    return max(1, math.ceil(total / page_size))
+
+
+def paginate(entries, page, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Function to return one page of entries; page numbers out of range are clamped to the first or last page
+    """
+    pages = page_count(len(entries), page_size)
+    number = min(max(1, page), pages)
+    start = (number - 1) * page_size
+    return Page(entries[start:start + page_size], number, pages, len(entries), start)
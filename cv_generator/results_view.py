@@ -0,0 +1,66 @@
+"""
+Streamlit view of a session's batches shared by both apps: progress, the searchable and paginated CVs, and the poll
+while a batch runs. The page's streamlit module is passed in as st, so the package itself does not import Streamlit.
+"""
+from cv_generator.results import DEFAULT_PAGE_SIZE, PAGE_SIZES, STATUS_FILTERS, filter_entries, page_count, paginate
+
+
+def session_batches(job_queue, owner, job):
+    """
+    Function to return the batches of a session, including the given batch (e.g. one opened from its URL)
+    """
+    batches = job_queue.jobs(owner)
+    if job not in batches:
+        batches.append(job)
+    return batches
+
+
+def show_job_progress(st, job_queue, job, completed, total):
+    """
+    Function to show how many of a batch's CVs are ready, with a button to cancel it while it runs
+    """
+    progress_text = f"✅ {completed} of {total} CVs ready" if job.finished else f"⏳ Generating {total} CVs: {completed} ready"
+    st.progress(completed / total if total else 1.0, text=progress_text)
+    if not job.finished and st.button("🛑 Cancel batch"):
+        job_queue.cancel(job.job_id)
+
+
+def show_result_entries(st, entries, statuses=None, show_details=None):
+    """
+    Function to show ResultEntry items searchable and one page at a time: only the page's CVs are sent
+    to the browser, and their full text only when asked for, so large batches keep the page light.
+    statuses lists the STATUS_FILTERS offered (all by default) and show_details(entry) adds the lines under each CV.
+    """
+    query = st.text_input("🔎 Search the CVs:", value="")
+    roles = sorted({entry.role for entry in entries})
+    role_filter = st.selectbox("💼 Role:", ["All roles"] + roles)
+    status_filter = st.selectbox("🚦 Status:", list(statuses or STATUS_FILTERS))
+    page_size = st.selectbox("📑 CVs per page:", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE))
+    matches = filter_entries(entries, query, None if role_filter == "All roles" else role_filter, STATUS_FILTERS[status_filter])
+    pages = page_count(len(matches), page_size)
+    # The page number is kept within the pages left once the filters change
+    if st.session_state.get("results_page", 1) > pages:
+        st.session_state["results_page"] = pages
+    page = paginate(matches, st.number_input("📄 Page:", min_value=1, max_value=pages, key="results_page"), page_size)
+    for entry in page.entries:
+        st.subheader(f"CV {entry.number} of {entry.total}")
+        if st.checkbox("Show the full CV", value=False, key=f"full_{entry.key}"):
+            st.text_area("", entry.content, height=300, key=f"cv_{entry.key}")
+        else:
+            st.text(entry.preview())
+        if show_details is not None:
+            show_details(entry)
+        else:
+            st.text(f"Saved as: {entry.path}")
+    if page.total:
+        st.text(f"Showing CVs {page.start + 1}–{page.end} of {page.total} (page {page.number} of {page.pages})")
+    return page
+
+
+def poll_job(st, job, seconds):
+    """
+    Function to wait (at most seconds) for the next CV of a running batch and rerun the page to show it
+    """
+    if job is not None and not job.finished:
+        job.wait(timeout=seconds)
+        st.rerun()
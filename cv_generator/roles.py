@@ -0,0 +1,20 @@
+"""
+Job roles and experience levels offered by the generator
+"""
+
+# List of common job roles to choose from
+JOB_ROLES = [
+    "Software Engineer", "Data Scientist", "Security Data Scientist", "Product Manager", "Project Coordinator", "Marketing Specialist",
+    "Sales Executive", "Financial Analyst", "Human Resources Manager", "Graphic Designer", "Content Writer",
+    "Customer Service Representative", "Business Analyst", "Accountant", "UX/UI Designer", "Network Administrator",
+    "IT Support Specialist", "Operations Manager", "Administrative Assistant", "Legal Advisor", "Quality Assurance Tester",
+    "Mechanical Engineer", "Electrical Engineer", "Civil Engineer", "Biomedical Engineer", "Chemical Engineer",
+    "Systems Analyst", "Database Administrator", "DevOps Engineer", "Full Stack Developer", "Backend Developer",
+    "Frontend Developer", "Cloud Architect", "Machine Learning Engineer", "AI Researcher", "Cybersecurity Specialist",
+    "SEO Specialist", "Content Strategist", "Social Media Manager", "Public Relations Specialist", "Event Planner",
+    "Supply Chain Manager", "Procurement Specialist", "Warehouse Manager", "Retail Store Manager", "Fitness Trainer",
+    "Nutritionist", "Psychologist", "Teacher", "School Principal", "Professor", "Research Scientist", "Lab Technician",
+    "Nurse", "Doctor", "Paramedic", "Pharmacist", "Veterinarian", "Pilot", "Chef",
+]
+
+EXPERIENCE_LEVELS = ["High", "Low", "Random"]
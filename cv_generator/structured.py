@@ -0,0 +1,177 @@
+"""
+Structured CVs: the JSON schema asked of the model, its parser and the typed CV it produces
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+# JSON keys of the CV sections, their headings and whether they hold a list of entries
+CV_FIELDS = [
+    ("languages", "Languages", list),
+    ("applicant_key_role", "Applicant Key Role", str),
+    ("years_of_experience", "Years of Experience", int),
+    ("skills", "Skills", list),
+    ("education", "Education", list),
+    ("projects", "Projects", list),
+    ("certifications", "Certifications", list),
+    ("experiences", "Experiences", list),
+    ("references", "References", list),
+]
+
+CV_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        key: {"type": "array", "items": {"type": "string"}} if kind is list
+        else {"type": "integer"} if kind is int
+        else {"type": "string"}
+        for key, _, kind in CV_FIELDS
+    },
+    "required": [key for key, _, _ in CV_FIELDS],
+}
+
+
+class CVSchemaError(ValueError):
+    """
+    Raised when the model's answer is not a CV matching CV_JSON_SCHEMA
+    """
+
+
+@dataclass(slots=True)
+class StructuredCV:
+    """
+    CV sections parsed from the model's JSON answer, with the candidate's identity
+    """
+    name: str
+    email: str
+    phone_number: str
+    location: str
+    applicant_key_role: str = ""
+    years_of_experience: Optional[int] = None
+    languages: list = field(default_factory=list)
+    skills: list = field(default_factory=list)
+    education: list = field(default_factory=list)
+    projects: list = field(default_factory=list)
+    certifications: list = field(default_factory=list)
+    experiences: list = field(default_factory=list)
+    references: list = field(default_factory=list)
+
+    def to_lines(self):
+        """
+        Function to lay the CV out as (is_heading, text) lines: identity, then each section in order
+        """
+        lines = [
+            (False, f"Name: {self.name}"),
+            (False, f"Email: {self.email}"),
+            (False, f"Phone Number: {self.phone_number}"),
+            (False, f"Location: {self.location}"),
+        ]
+        for key, heading, kind in CV_FIELDS:
+            value = getattr(self, key)
+            if kind is list:
+                lines.append((True, f"{heading}:"))
+                lines.extend((False, f"- {item}") for item in value)
+            else:
+                lines.append((False, f"{heading}: {value}"))
+        return lines
+
+    def to_text(self):
+        """
+        Function to return the CV as plain text, in the same layout as free-text CVs
+        """
+        return "\n".join(text for _, text in self.to_lines()) + "\n"
+
+    def to_dict(self):
+        """
+        Function to return the CV as a JSON-serialisable dict
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _entry_text(item):
+    """
+    Function to turn one list entry into text, flattening objects such as {"degree": ..., "school": ...}
+    """
+    if isinstance(item, str):
+        return item.strip()
+    if isinstance(item, (int, float)) and not isinstance(item, bool):
+        return str(item)
+    if isinstance(item, dict):
+        return " - ".join(_entry_text(value) for value in item.values() if value not in (None, "", []))
+    if isinstance(item, list):
+        return ", ".join(_entry_text(value) for value in item)
+    raise CVSchemaError(f"unexpected entry {item!r}")
+
+
+def parse_structured_cv(text, name, email, phone_number, location):
+    """
+    Function to parse and validate the model's JSON answer into a StructuredCV, raising CVSchemaError if it does not match the schema
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        # Tolerate a fenced code block around the JSON
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise CVSchemaError(f"answer is not valid JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise CVSchemaError("answer is not a JSON object")
+
+    sections = {}
+    for key, heading, kind in CV_FIELDS:
+        if key not in data:
+            raise CVSchemaError(f"missing section {heading!r}")
+        value = data[key]
+        if kind is list:
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list):
+                raise CVSchemaError(f"section {heading!r} should be a list")
+            sections[key] = [entry for entry in (_entry_text(item) for item in value) if entry]
+        elif kind is int:
+            try:
+                sections[key] = int(value)
+            except (TypeError, ValueError):
+                raise CVSchemaError(f"section {heading!r} should be an integer") from None
+        else:
+            sections[key] = _entry_text(value)
+    return StructuredCV(name=name, email=email, phone_number=phone_number, location=location, **sections)
+
+
+IDENTITY_FIELDS = {"Name": "name", "Email": "email", "Phone Number": "phone_number", "Location": "location"}
+
+
+def parse_text_cv(text):
+    """
+    Function to read a free-text CV (identity lines, then "Heading:" sections) into a StructuredCV.
+    It is lenient: markdown around headings and bullets is dropped, and missing sections stay empty.
+    """
+    headings = {heading.lower(): key for key, heading, _ in CV_FIELDS}
+    identity = dict.fromkeys(IDENTITY_FIELDS.values(), "")
+    entries = {key: [] for key, _, _ in CV_FIELDS}
+    current = None
+    for line in text.splitlines():
+        stripped = line.strip().strip("*#").strip()
+        heading, colon, rest = stripped.partition(":")
+        heading = heading.strip("*# ")
+        rest = rest.strip("* ").strip()
+        if colon and current is None and heading in IDENTITY_FIELDS:
+            identity[IDENTITY_FIELDS[heading]] = rest
+        elif colon and heading.lower() in headings:
+            current = headings[heading.lower()]
+            if rest:
+                entries[current].append(rest)
+        elif current is not None and stripped:
+            entries[current].append(stripped.lstrip("-*• ").strip())
+
+    sections = {}
+    for key, _, kind in CV_FIELDS:
+        if kind is list:
+            sections[key] = [entry for entry in entries[key] if entry]
+        elif kind is int:
+            number = re.search(r"\d+", " ".join(entries[key]))
+            sections[key] = int(number.group()) if number else None
+        else:
+            sections[key] = " ".join(entries[key])
+    return StructuredCV(**identity, **sections)
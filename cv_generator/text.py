@@ -0,0 +1,49 @@
+"""
+Text sanitisation for FPDF's built-in (latin-1, ASCII-safe) fonts
+"""
+import functools
+import unicodedata
+
+# Characters that Unicode NFKD normalisation does not decompose into ASCII
+_TRANSLITERATIONS = {
+    "ß": "ss", "ẞ": "SS", "æ": "ae", "Æ": "AE", "œ": "oe", "Œ": "OE",
+    "ø": "o", "Ø": "O", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D", "ð": "d", "Ð": "D",
+    "þ": "th", "Þ": "Th", "ı": "i", "ħ": "h", "Ħ": "H",
+    "‘": "'", "’": "'", "‚": "'", "′": "'", "“": '"', "”": '"', "„": '"', "″": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-", "−": "-", "⁄": "/",
+    "•": "*", "·": "*", "…": "...", "€": "EUR", "£": "GBP", "¥": "JPY", "©": "(c)", "®": "(R)", "™": "(TM)",
+}
+
+# Byte-level table applied after encoding: tabs become spaces, other control characters but newlines are dropped
+_ASCII_TABLE = bytes.maketrans(b"\t", b" ")
+_CONTROL_BYTES = bytes(c for c in range(32) if c not in (9, 10)) + b"\x7f"
+
+
+@functools.lru_cache(maxsize=4096)
+def _replace_char(char):
+    if char in _TRANSLITERATIONS:
+        return _TRANSLITERATIONS[char]
+    if unicodedata.combining(char) or unicodedata.category(char) == "Cc":
+        # Combining accents and control characters are dropped
+        return ""
+    # Compatibility decomposition splits "é" into "e" plus an accent and "ﬁ" into "fi"
+    decomposed = unicodedata.normalize("NFKD", char)
+    if decomposed != char:
+        return "".join(_replace_char(c) if not c.isascii() else c for c in decomposed)
+    return "_"
+
+
+def sanitize_text(text):
+    """
+    Function to make a whole CV safe for the built-in PDF fonts, once per document.
+    Accented letters are transliterated ("José Müller" -> "Jose Muller"), typographic
+    punctuation becomes its ASCII equivalent, other non-ASCII characters become "_"
+    and control characters are removed.
+    """
+    if not text.isascii():
+        # A CV only contains a handful of distinct non-ASCII characters, so replacing each
+        # of them across the whole text is much cheaper than visiting every character
+        for char in set(text):
+            if not char.isascii():
+                text = text.replace(char, _replace_char(char))
+    return text.encode("ascii").translate(_ASCII_TABLE, _CONTROL_BYTES).decode("ascii")
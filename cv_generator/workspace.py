@@ -0,0 +1,154 @@
+"""
+Per-session temporary workspaces with TTL-based background cleanup
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+# Workspaces not used for this many seconds are removed by the cleanup thread
+DEFAULT_TTL = 60 * 60
+DEFAULT_CLEANUP_INTERVAL = 5 * 60
+# Session ids handed out by the apps (uuid4 hex), the only ones accepted from a page URL
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class SessionWorkspace:
+    """
+    Private temporary directory of one user session
+    """
+
+    def __init__(self, session_id, path):
+        self.session_id = session_id
+        self.path = path
+        self.last_used = time.monotonic()
+        self.pins = 0
+        self._lock = threading.Lock()
+
+    def touch(self):
+        """
+        Function to mark the workspace as used so it is kept for another TTL period
+        """
+        self.last_used = time.monotonic()
+
+    def pin(self):
+        """
+        Function to keep the workspace while a batch uses it, however long the batch runs
+        """
+        with self._lock:
+            self.pins += 1
+        self.touch()
+
+    def unpin(self):
+        """
+        Function to let the workspace expire again one TTL period after the batch using it ends
+        """
+        with self._lock:
+            self.pins -= 1
+        self.touch()
+
+    def file_path(self, filename):
+        """
+        Function to build the path of a file inside the workspace
+        """
+        return os.path.join(self.path, filename)
+
+
+class WorkspaceRegistry:
+    """
+    Registry handing out one workspace directory per session id.
+
+    Sessions never see each other's files, and expired workspaces are removed by a
+    background thread instead of scanning the working directory on every request.
+    """
+
+    def __init__(self, root=None, ttl=DEFAULT_TTL, cleanup_interval=DEFAULT_CLEANUP_INTERVAL):
+        self.root = root or tempfile.mkdtemp(prefix="cv_generator_")
+        os.makedirs(self.root, exist_ok=True)
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self._workspaces = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, session_id):
+        """
+        Function to return the workspace of a session, creating it on first use
+        """
+        with self._lock:
+            workspace = self._workspaces.get(session_id)
+            if workspace is None:
+                path = os.path.join(self.root, session_id)
+                os.makedirs(path, exist_ok=True)
+                workspace = self._workspaces[session_id] = SessionWorkspace(session_id, path)
+            workspace.touch()
+            return workspace
+
+    def release(self, session_id):
+        """
+        Function to remove a session's workspace and everything in it
+        """
+        with self._lock:
+            workspace = self._workspaces.pop(session_id, None)
+        if workspace is not None:
+            shutil.rmtree(workspace.path, ignore_errors=True)
+
+    def cleanup_expired(self, now=None):
+        """
+        Function to remove the workspaces that have not been used within the TTL (and are not pinned by a
+        running batch), returning their session ids
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [sid for sid, ws in self._workspaces.items() if not ws.pins and now - ws.last_used > self.ttl]
+        for session_id in expired:
+            self.release(session_id)
+        return expired
+
+    def start_cleanup(self):
+        """
+        Function to start the daemon thread that periodically removes expired workspaces
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._cleanup_loop, name="workspace-cleanup", daemon=True)
+            self._thread.start()
+
+    def stop_cleanup(self):
+        """
+        Function to stop the cleanup thread
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _cleanup_loop(self):
+        while not self._stop.wait(self.cleanup_interval):
+            self.cleanup_expired()
+
+
+def parse_session_id(value):
+    """
+    Function to return a session id read from outside (e.g. a page URL) if it is one the apps hand out, else None
+    """
+    return value if isinstance(value, str) and _SESSION_ID.fullmatch(value) else None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_workspace_registry():
+    """
+    Function to return the process-wide workspace registry, starting its cleanup thread on first use
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = WorkspaceRegistry()
+            _registry.start_cleanup()
+        return _registry
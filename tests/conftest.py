@@ -0,0 +1,13 @@
+import pytest
+
+from cv_generator import estimator
+
+
+@pytest.fixture(autouse=True)
+def usage_db(monkeypatch, tmp_path_factory):
+    # Importing the apps and running the CLI record usage (and the apps' batches); keep it out of the developer's ~/.cache
+    path = tmp_path_factory.mktemp("usage") / "usage.db"
+    monkeypatch.setenv("CV_USAGE_DB", str(path))
+    monkeypatch.setenv("CV_MANIFEST_DB", str(path.with_name("manifest.db")))
+    monkeypatch.setattr(estimator, "_usage_history", None)
+    return path
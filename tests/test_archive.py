@@ -0,0 +1,55 @@
+import sys
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cv_generator.archive import CVArchive  # noqa: E402
+from cv_generator.pdf import cv_filename, render_cv_pdf  # noqa: E402
+
+
+def test_render_cv_pdf_returns_pdf_bytes():
+    pdf_bytes = render_cv_pdf("Skills:\nPython\nExperience:\n3 years")
+    assert isinstance(pdf_bytes, bytes)
+    assert pdf_bytes.startswith(b"%PDF")
+
+
+def test_archive_is_built_in_memory_without_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cv_archive = CVArchive()
+    cv_archive.add(cv_filename("Software Engineer", 1), render_cv_pdf("Skills:\nPython"))
+    cv_archive.add(cv_filename("Software Engineer", 2), render_cv_pdf("Skills:\nJava"))
+
+    with zipfile.ZipFile(BytesIO(cv_archive.getvalue())) as z:
+        assert z.namelist() == ["cv_Software_Engineer_1.pdf", "cv_Software_Engineer_2.pdf"]
+        assert z.read("cv_Software_Engineer_1.pdf").startswith(b"%PDF")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spooled_archive_moves_to_disk_past_max_size(tmp_path):
+    cv_archive = CVArchive(spool=True, spool_max_size=1024, spool_dir=tmp_path)
+    for idx in range(5):
+        cv_archive.add(cv_filename("Nurse", idx + 1), render_cv_pdf(f"Experience:\n{idx} years"))
+
+    assert cv_archive._file._rolled
+    with zipfile.ZipFile(cv_archive.open()) as z:
+        assert len(z.namelist()) == 5
+    # Discarding releases the temporary file the archive was spooled to
+    cv_archive.discard()
+    assert cv_archive._file.closed
+
+
+def test_archive_written_directly_to_target_path(tmp_path):
+    target = tmp_path / "cvs.zip"
+    with CVArchive(target=target) as cv_archive:
+        cv_archive.add("cv_Chef_1.pdf", render_cv_pdf("Skills:\nCooking"))
+
+    assert len(cv_archive) == 1
+    with zipfile.ZipFile(target) as z:
+        assert z.namelist() == ["cv_Chef_1.pdf"]
+
+
+def test_cv_filename_sanitises_role_and_name():
+    assert cv_filename("UX/UI Designer", 3) == "cv_UX_UI_Designer_3.pdf"
+    assert cv_filename("Doctor", 1, "Jane Doe") == "cv_Doctor_1_Jane_Doe.pdf"
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from benchmarks import pipeline
+from cv_generator.fake_llm import FakeAPIError, FakeChatClient
+
+
+def _messages(role="Data Analyst"):
+    return [{"role": "user", "content": f"Generate a CV for the role of {role}.\nLocation: Spain\n"}]
+
+
+def test_fake_client_is_deterministic():
+    first = FakeChatClient(seed=7)
+    second = FakeChatClient(seed=7)
+
+    a = first.chat.completions.create(messages=_messages(), model="m")
+    b = second.chat.completions.create(messages=_messages(), model="m")
+
+    assert a.choices[0].message.content == b.choices[0].message.content
+    assert "Data Analyst" in a.choices[0].message.content
+    assert a.usage.total_tokens == a.usage.prompt_tokens + a.usage.completion_tokens
+
+
+def test_fake_client_injects_errors():
+    client = FakeChatClient(error_rate=1.0, retry_after=2)
+
+    with pytest.raises(FakeAPIError) as exc_info:
+        client.chat.completions.create(messages=_messages(), model="m")
+
+    assert exc_info.value.status_code in (429, 503)
+    assert client.calls == 1
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert pipeline.percentile(values, 50) == 50
+    assert pipeline.percentile(values, 99) == 99
+    assert pipeline.percentile([], 50) is None
+
+
+def test_benchmark_writes_report(tmp_path):
+    output = tmp_path / "report.json"
+
+    exit_code = pipeline.main(["--sizes", "1,3", "--latency", "0", "--render-workers", "0", "--output", str(output)])
+
+    assert exit_code == 0
+    report = json.loads(output.read_text())
+    assert [r["batch_size"] for r in report["results"]] == [1, 3]
+    result = report["results"][1]
+    assert result["stages"]["generate_cv"]["errors"] == 0
+    assert result["stages"]["save_cv_as_pdf"]["count"] == 3
+    assert result["stages"]["zip"]["archive_bytes"] > 0
+    assert result["end_to_end"]["throughput_cvs_per_s"] > 0
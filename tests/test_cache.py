@@ -0,0 +1,92 @@
+import sys
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cv_generator.cache import ResponseCache  # noqa: E402
+from cv_generator.generation import GROQ_MODEL, generate_cvs_concurrently  # noqa: E402
+from cv_generator.prompts import build_sections_message  # noqa: E402
+
+
+class CountingClient:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, messages, model):
+        self.calls += 1
+        if self.fail:
+            raise Exception("API failure")
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=f"CV #{self.calls}"))]
+        )
+
+
+def run_batch(client, cache, refresh=False, num_cvs=3):
+    return generate_cvs_concurrently(
+        client,
+        ["Chef"] * num_cvs,
+        ["Name"] * num_cvs,
+        ["e@example.com"] * num_cvs,
+        ["1"] * num_cvs,
+        ["Italy"] * num_cvs,
+        ["Low"] * num_cvs,
+        max_concurrency=1,
+        cache=cache,
+        refresh=refresh,
+    )
+
+
+def test_rerun_replays_each_variant_from_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    first = run_batch(CountingClient(), cache)
+
+    client = CountingClient()
+    second = run_batch(client, cache)
+
+    assert second == first
+    assert len(set(first)) == 3, "each variant slot keeps its own CV"
+    assert client.calls == 0
+    assert cache.stats() == {"hits": 3, "misses": 3, "entries": 3}
+
+
+def test_refresh_forces_fresh_generations(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    run_batch(CountingClient(), cache)
+
+    client = CountingClient()
+    run_batch(client, cache, refresh=True)
+    assert client.calls == 3
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    results = run_batch(CountingClient(fail=True), cache)
+    assert all(r.startswith("Error generating CV:") for r in results)
+    assert len(cache) == 0
+
+
+def test_key_depends_on_model_prompt_params_and_variant():
+    messages = [build_sections_message("Chef", "Italy", "Low")]
+    key = ResponseCache.make_key(GROQ_MODEL, messages)
+    assert key == ResponseCache.make_key(GROQ_MODEL, [build_sections_message("Chef", "Italy", "Low")])
+    assert key != ResponseCache.make_key("other-model", messages)
+    assert key != ResponseCache.make_key(GROQ_MODEL, [build_sections_message("Chef", "Spain", "Low")])
+    assert key != ResponseCache.make_key(GROQ_MODEL, messages, params={"temperature": 0.2})
+    assert key != ResponseCache.make_key(GROQ_MODEL, messages, variant=1)
+
+
+def test_lru_eviction_and_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"  # "b" is now the least recently used entry
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["a", "c"]
+
+    # Entries persist across instances, and expire after the TTL
+    assert ResponseCache(str(tmp_path)).get("c") == "C"
+    assert ResponseCache(str(tmp_path), ttl=-1).get("c") is None
@@ -0,0 +1,107 @@
+import subprocess
+import sys
+import types
+import zipfile
+from pathlib import Path
+
+import pytest
+from PyPDF2 import PdfReader
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator import cli  # noqa: E402
+
+
+class FakeGroqClient:
+    def __init__(self):
+        self.calls = []
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, messages, model):
+        self.calls.append(messages)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content="Skills:\nPython"))]
+        )
+
+
+def test_package_import_does_not_load_streamlit_or_sdks():
+    code = (
+        "import sys, cv_generator, cv_generator.cli; "
+        "loaded = [m for m in ('streamlit', 'groq', 'openai', 'faker') if m in sys.modules]; "
+        "print(','.join(loaded))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_cli_writes_pdfs_to_output_dir(monkeypatch, tmp_path):
+    fake_client = FakeGroqClient()
+    monkeypatch.setattr(cli, "client_for", lambda provider, concurrency=None: fake_client)
+
+    exit_code = cli.main([
+        "--role", "UX/UI Designer",
+        "--location", "Germany",
+        "--experience-level", "Low",
+        "--count", "3",
+        "--concurrency", "2",
+        "--output-dir", str(tmp_path / "out"),
+    ])
+
+    assert exit_code == 0
+    assert len(fake_client.calls) == 3
+    assert "Location: Germany" in fake_client.calls[0][1]["content"]
+    pdfs = sorted(p.name for p in (tmp_path / "out").glob("*.pdf"))
+    assert pdfs == ["cv_UX_UI_Designer_1.pdf", "cv_UX_UI_Designer_2.pdf", "cv_UX_UI_Designer_3.pdf"]
+    reader = PdfReader(str(tmp_path / "out" / pdfs[0]))
+    text = reader.pages[0].extract_text()
+    assert "Skills" in text
+    assert "Name:" in text
+
+
+def test_cli_writes_zip_without_intermediate_pdfs(monkeypatch, tmp_path):
+    monkeypatch.setattr(cli, "client_for", lambda provider, concurrency=None: FakeGroqClient())
+    monkeypatch.chdir(tmp_path)
+
+    exit_code = cli.main(["--role", "Chef", "--count", "2", "--zip", "cvs.zip"])
+
+    assert exit_code == 0
+    assert [p.name for p in tmp_path.iterdir()] == ["cvs.zip"]
+    with zipfile.ZipFile(tmp_path / "cvs.zip") as z:
+        assert sorted(z.namelist()) == ["cv_Chef_1.pdf", "cv_Chef_2.pdf"]
+
+
+def test_cli_rejects_invalid_count(capsys):
+    assert cli.main(["--count", "0"]) == 2
+    assert "--count" in capsys.readouterr().err
+
+
+def test_cli_rejects_unknown_experience_level():
+    with pytest.raises(SystemExit):
+        cli.main(["--experience-level", "Expert"])
+
+
+def test_cli_rate_limits_each_provider_with_its_own_budgets(monkeypatch):
+    from cv_generator import ratelimit
+
+    limiters = {}
+
+    def fake_estimate_run(combinations, provider, model, rate_limiter=None, **kwargs):
+        limiters[provider] = rate_limiter
+        return real_estimate_run(combinations, provider, model, rate_limiter=rate_limiter, **kwargs)
+
+    real_estimate_run = cli.estimate_run
+    monkeypatch.setattr(cli, "estimate_run", fake_estimate_run)
+    monkeypatch.setattr(ratelimit, "_rate_limiters", {})
+    monkeypatch.setenv("GROQ_RPM", "30")
+    monkeypatch.setenv("GROQ_TPM", "6000")
+
+    assert cli.main(["--provider", "groq", "--estimate"]) == 0
+    assert limiters["groq"] is ratelimit.get_rate_limiter("groq")
+    assert limiters["groq"].requests.capacity == 30 and limiters["groq"].tokens.capacity == 6000
+
+    # --rpm overrides the environment's requests budget, the tokens budget still comes from GROQ_TPM
+    assert cli.main(["--provider", "groq", "--rpm", "10", "--estimate"]) == 0
+    assert limiters["groq"].requests.capacity == 10 and limiters["groq"].tokens.capacity == 6000
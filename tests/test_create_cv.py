@@ -4,11 +4,16 @@ import importlib
 from pathlib import Path
 from io import BytesIO
 import zipfile
+import threading
+import time
 
 import pytest
 from PyPDF2 import PdfReader
 from unittest.mock import MagicMock
 
+from cv_generator import generation
+from cv_generator.pdf import save_cv_as_pdf
+
 
 def streamlit_stub():
     import types
@@ -34,6 +39,12 @@ def streamlit_stub():
     def button(*args, **kwargs):
         return False
 
+    def checkbox(label, value=False, **kwargs):
+        return value
+
+    def multiselect(label, options, default=None, **kwargs):
+        return list(default or [])
+
     def subheader(*args, **kwargs):
         pass
 
@@ -56,12 +67,35 @@ def streamlit_stub():
     def error(*args, **kwargs):
         pass
 
+    def info(*args, **kwargs):
+        pass
+
+    def progress(value, text=None, **kwargs):
+        st_stub.progress_values.append(value)
+        return types.SimpleNamespace(progress=progress)
+
+    def container(*args, **kwargs):
+        from contextlib import nullcontext
+        return nullcontext()
+
+    def expander(*args, **kwargs):
+        from contextlib import nullcontext
+        return nullcontext()
+
+    def table(*args, **kwargs):
+        pass
+
+    def json(*args, **kwargs):
+        pass
+
     st_stub.title = title
     st_stub.markdown = markdown
     st_stub.text_input = text_input
     st_stub.selectbox = selectbox
     st_stub.number_input = number_input
     st_stub.button = button
+    st_stub.checkbox = checkbox
+    st_stub.multiselect = multiselect
     st_stub.subheader = subheader
     st_stub.text_area = text_area
     st_stub.text = text
@@ -69,6 +103,15 @@ def streamlit_stub():
     st_stub.download_button = download_button
     st_stub.warning = warning
     st_stub.error = error
+    st_stub.info = info
+    st_stub.progress = progress
+    st_stub.container = container
+    st_stub.expander = expander
+    st_stub.table = table
+    st_stub.json = json
+    st_stub.progress_values = []
+    st_stub.session_state = {}
+    st_stub.query_params = {}
     return st_stub
 
 
@@ -88,17 +131,19 @@ def create_cv_module(mock_streamlit, monkeypatch):
     return importlib.import_module("create_cv")
 
 
-def test_generate_cv_success(create_cv_module, monkeypatch):
+def chat_client(create):
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+
+
+def test_generate_cv_success():
     expected_content = "Mocked CV"
     mock_response = types.SimpleNamespace(
         choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=expected_content))]
     )
     mock_create = MagicMock(return_value=mock_response)
-    monkeypatch.setattr(
-        create_cv_module.client.chat.completions, "create", mock_create
-    )
 
-    result = create_cv_module.generate_cv(
+    result = generation.generate_cv(
+        chat_client(mock_create),
         "Software Engineer",
         "John Doe",
         "john@example.com",
@@ -107,16 +152,21 @@ def test_generate_cv_success(create_cv_module, monkeypatch):
         "High",
     )
 
-    assert result == expected_content
+    assert result == (
+        "Name: John Doe\n"
+        "Email: john@example.com\n"
+        "Phone Number: 123456\n"
+        "Location: Riyadh\n"
+        "Mocked CV\n"
+    )
     expected_messages = [
         {
-            "role": "user",
+            "role": "system",
             "content": (
-                "Generate a CV for the role of Software Engineer. Please use only English characters.\n"
-                "Location: Riyadh\n"
-                "Name: A Localised Male or Female Name Based on his Riyadh or neigbouring countries. Use English characters only for the name\n"
-                "Email: random email based on name, Riyadh, and a random 5 digit hash. email should be @gmail.com \n"
-                "Phone Number: A localised random phone number based on Riyadh\n"
+                "Generate a CV for the role of Software Engineer.\n"
+                "Please use only English characters. The candidate is based in Riyadh.\n"
+                "Their name, email and phone number are given by the user and are added above your text, so do not repeat them.\n"
+                "Write only the following sections, each heading on its own line ending with a colon:\n"
                 "Languages: \n"
                 "Applicant Key Role:\n"
                 "Years of Experience: value should be an integer number based on High number of years\n"
@@ -125,24 +175,25 @@ def test_generate_cv_success(create_cv_module, monkeypatch):
                 "Projects: \n"
                 "Certifications: \n"
                 "Experiences: \n"
-                "References: Create Random References based on his experience\n"
+                "References: Create Random References based on the candidate's experience\n"
             ),
-        }
+        },
+        {
+            "role": "user",
+            "content": "Name: John Doe\nEmail: john@example.com\nPhone Number: 123456\nLocation: Riyadh\n",
+        },
     ]
     mock_create.assert_called_once_with(
         messages=expected_messages, model="llama-3.2-90b-text-preview"
     )
 
 
-def test_generate_cv_error(create_cv_module, monkeypatch):
+def test_generate_cv_error():
     def raise_error(**kwargs):
         raise Exception("API failure")
 
-    monkeypatch.setattr(
-        create_cv_module.client.chat.completions, "create", raise_error
-    )
-
-    result = create_cv_module.generate_cv(
+    result = generation.generate_cv(
+        chat_client(raise_error),
         "Software Engineer",
         "John Doe",
         "john@example.com",
@@ -153,10 +204,77 @@ def test_generate_cv_error(create_cv_module, monkeypatch):
     assert result.startswith("Error generating CV:")
 
 
-def test_save_cv_as_pdf_creates_valid_pdf(create_cv_module, tmp_path):
+@pytest.mark.parametrize("content", [None, "", "  \n"])
+def test_generate_cv_without_content_is_an_error(content):
+    response = types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))])
+
+    result = generation.generate_cv_result(chat_client(lambda **kwargs: response), "Chef", "Ana", "a@example.com", "1", "Italy", "Low")
+
+    assert not result.ok
+    assert result.content.startswith("Error generating CV:")
+    assert result.error_type == "EmptyResponse"
+
+
+def test_generate_cvs_concurrently_bounded_parallelism():
+    latency = 0.2
+
+    def slow_create(messages, model):
+        time.sleep(latency)
+        role = messages[0]["content"].split("role of ")[1].split(".\n")[0]
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=f"CV for {role}"))]
+        )
+
+    num_cvs = 8
+    concurrency = 4
+    roles = [f"Role{i}" for i in range(num_cvs)]
+    start = time.perf_counter()
+    results = generation.generate_cvs_concurrently(
+        chat_client(slow_create),
+        roles,
+        ["John Doe"] * num_cvs,
+        ["john@example.com"] * num_cvs,
+        ["123456"] * num_cvs,
+        ["Riyadh"] * num_cvs,
+        ["High"] * num_cvs,
+        max_concurrency=concurrency,
+    )
+    elapsed = time.perf_counter() - start
+
+    assert [cv.splitlines()[-1] for cv in results] == [f"CV for {role}" for role in roles]
+    # About (N / concurrency) x latency, well below N x latency
+    assert elapsed >= (num_cvs / concurrency) * latency * 0.9
+    assert elapsed < (num_cvs / concurrency + 1.5) * latency
+
+
+def test_generate_cvs_concurrently_isolates_errors():
+    def flaky_create(messages, model):
+        if "role of Broken" in messages[0]["content"]:
+            raise Exception("API failure")
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content="OK"))]
+        )
+
+    results = generation.generate_cvs_concurrently(
+        chat_client(flaky_create),
+        ["Engineer", "Broken", "Designer"],
+        ["A", "B", "C"],
+        ["a@example.com", "b@example.com", "c@example.com"],
+        ["1", "2", "3"],
+        ["Riyadh"] * 3,
+        ["Low"] * 3,
+        max_concurrency=2,
+    )
+
+    assert results[0].endswith("\nOK\n")
+    assert results[1].startswith("Error generating CV:")
+    assert results[2].endswith("\nOK\n")
+
+
+def test_save_cv_as_pdf_creates_valid_pdf(tmp_path):
     file_path = tmp_path / "cv.pdf"
     sample_content = "Skills:\nPython\nExperience:\n3 years"
-    create_cv_module.save_cv_as_pdf(sample_content, str(file_path))
+    save_cv_as_pdf(sample_content, str(file_path))
 
     assert file_path.exists()
     assert file_path.read_bytes().startswith(b"%PDF")
@@ -165,17 +283,6 @@ def test_save_cv_as_pdf_creates_valid_pdf(create_cv_module, tmp_path):
     assert "Skills" in text
 
 
-def test_delete_old_pdfs_removes_pdfs(create_cv_module, tmp_path, monkeypatch):
-    pdf1 = tmp_path / "old1.pdf"
-    pdf2 = tmp_path / "old2.pdf"
-    pdf1.write_text("dummy")
-    pdf2.write_text("dummy")
-
-    monkeypatch.chdir(tmp_path)
-    create_cv_module.delete_old_pdfs()
-    assert list(tmp_path.glob("*.pdf")) == []
-
-
 def test_job_roles_length(create_cv_module):
     assert len(create_cv_module.job_roles) >= 60, "job_roles should contain at least 60 entries"
 
@@ -186,11 +293,11 @@ def test_experience_level_options(create_cv_module, mock_streamlit):
     assert create_cv_module.experience_level == "Random"
 
 
-def test_zip_packaging(create_cv_module, tmp_path):
+def test_zip_packaging(tmp_path):
     file1 = tmp_path / "cv1.pdf"
     file2 = tmp_path / "cv2.pdf"
-    create_cv_module.save_cv_as_pdf("test", str(file1))
-    create_cv_module.save_cv_as_pdf("test", str(file2))
+    save_cv_as_pdf("test", str(file1))
+    save_cv_as_pdf("test", str(file2))
 
     zip_buffer = BytesIO()
     with zipfile.ZipFile(zip_buffer, "w") as zip_file:
@@ -201,3 +308,123 @@ def test_zip_packaging(create_cv_module, tmp_path):
     with zipfile.ZipFile(zip_buffer) as z:
         assert set(z.namelist()) == {file1.name, file2.name}
 
+
+
+class Rerun(Exception):
+    pass
+
+
+def test_button_runs_batch_in_background_and_polls_it(mock_streamlit, monkeypatch, tmp_path):
+    from cv_generator import generation, jobs, providers, render_pool, workspace
+    from cv_generator.fake_llm import FakeChatClient
+
+    events = []
+    clicks = ["✨ Generate Random CVs"]
+    mock_streamlit.button = lambda label, **kwargs: label in clicks
+    mock_streamlit.subheader = lambda label, **kwargs: events.append(("cv", label))
+    mock_streamlit.download_button = lambda **kwargs: events.append(("download", kwargs["data"]))
+    mock_streamlit.query_params = {}
+
+    def progress(value, text=None, **kwargs):
+        events.append(("progress", value))
+        return types.SimpleNamespace(progress=progress)
+
+    def rerun():
+        raise Rerun()
+
+    mock_streamlit.progress = progress
+    mock_streamlit.rerun = rerun
+    job_queue = jobs.JobQueue(workers=4)
+    monkeypatch.setattr(jobs, "get_job_queue", lambda: job_queue)
+    monkeypatch.setattr(generation, "create_groq_client", lambda **kwargs: FakeChatClient(jitter=0.02))
+    monkeypatch.setattr(providers, "_clients", {})
+    monkeypatch.setattr(render_pool, "get_render_pool", lambda: render_pool.PDFRenderPool(0))
+    monkeypatch.setattr(workspace, "get_workspace_registry", lambda: workspace.WorkspaceRegistry(root=str(tmp_path)))
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1]))
+
+    # The click submits the batch and returns; every rerun shows the progress until the batch is done
+    runs = 0
+    while True:
+        runs += 1
+        events.clear()
+        monkeypatch.delitem(sys.modules, "create_cv", raising=False)
+        try:
+            importlib.import_module("create_cv")
+        except Rerun:
+            clicks.clear()
+            continue
+        break
+
+    job = job_queue.get(mock_streamlit.query_params["job"])
+    assert job.status == jobs.DONE and runs > 1
+    assert [kind for kind, _ in events] == ["progress"] + ["cv"] * 5 + ["download"]
+    assert events[0] == ("progress", 1.0)
+    assert [label for kind, label in events if kind == "cv"] == [f"CV {i} of 5" for i in range(1, 6)]
+    with zipfile.ZipFile(BytesIO(events[-1][1])) as z:
+        assert len(z.namelist()) == 5
+    job_queue.shutdown()
+
+
+def test_batches_of_a_session_keep_their_own_datasets(mock_streamlit, monkeypatch, tmp_path):
+    import json
+
+    from cv_generator import generation, jobs, providers, render_pool, workspace
+    from cv_generator.fake_llm import FakeChatClient
+
+    clicks = ["✨ Generate Random CVs"]
+    mock_streamlit.button = lambda label, **kwargs: label in clicks
+    mock_streamlit.multiselect = lambda label, options, default=None, **kwargs: ["pdf", "jsonl"]
+    mock_streamlit.query_params = {}
+
+    def rerun():
+        raise Rerun()
+
+    mock_streamlit.rerun = rerun
+    job_queue = jobs.JobQueue(workers=4)
+    monkeypatch.setattr(jobs, "get_job_queue", lambda: job_queue)
+    gate = threading.Event()
+
+    class GatedClient(FakeChatClient):
+        def create(self, messages, model, **kwargs):
+            gate.wait()
+            return super().create(messages, model, **kwargs)
+
+    monkeypatch.setattr(generation, "create_groq_client", lambda **kwargs: GatedClient())
+    # The page does not wait for progress between the runs
+    monkeypatch.setattr(jobs.Job, "wait", lambda self, timeout=None: self.finished)
+    monkeypatch.setattr(providers, "_clients", {})
+    monkeypatch.setattr(render_pool, "get_render_pool", lambda: render_pool.PDFRenderPool(0))
+    monkeypatch.setattr(workspace, "get_workspace_registry", lambda: workspace.WorkspaceRegistry(root=str(tmp_path)))
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1]))
+
+    def run_app():
+        monkeypatch.delitem(sys.modules, "create_cv", raising=False)
+        try:
+            importlib.import_module("create_cv")
+        except Rerun:
+            pass
+
+    # A second batch is started while the first one is still running
+    run_app()
+    mock_streamlit.text_input = lambda label, value="", **kwargs: "Italy" if "location" in label else value
+    run_app()
+    # The same settings again are refused while their batch runs
+    run_app()
+    batches = job_queue.jobs(mock_streamlit.session_state["session_id"])
+    assert len(batches) == 2 and not batches[0].finished
+    assert mock_streamlit.query_params["session"] == mock_streamlit.session_state["session_id"]
+
+    gate.set()
+    deadline = time.monotonic() + 10
+    while not all(batch.finished for batch in batches):
+        assert time.monotonic() < deadline, "the batches did not finish"
+        time.sleep(0.01)
+
+    for batch in batches:
+        assert batch.status == jobs.DONE
+        with zipfile.ZipFile(BytesIO(batch.output["zip"])) as z:
+            records = [json.loads(line) for line in z.read("cvs.jsonl").decode().splitlines()]
+        assert len(records) == 5
+    job_queue.shutdown()
@@ -4,11 +4,16 @@ import types
 from pathlib import Path
 from io import BytesIO
 import zipfile
+import json
+import time
 
 import pytest
 from PyPDF2 import PdfReader
 from unittest.mock import MagicMock
 
+from cv_generator import openai_batch
+from cv_generator.pdf import save_cv_as_pdf
+
 
 def streamlit_stub():
     import types
@@ -34,6 +39,9 @@ def streamlit_stub():
     def button(*args, **kwargs):
         return False
 
+    def checkbox(label, value=False, **kwargs):
+        return value
+
     def subheader(*args, **kwargs):
         pass
 
@@ -56,12 +64,34 @@ def streamlit_stub():
     def error(*args, **kwargs):
         pass
 
+    def info(*args, **kwargs):
+        pass
+
+    def progress(value, text=None, **kwargs):
+        st_stub.progress_values.append(value)
+        return types.SimpleNamespace(progress=progress)
+
+    def container(*args, **kwargs):
+        from contextlib import nullcontext
+        return nullcontext()
+
+    def expander(*args, **kwargs):
+        from contextlib import nullcontext
+        return nullcontext()
+
+    def table(*args, **kwargs):
+        pass
+
+    def json(*args, **kwargs):
+        pass
+
     st_stub.title = title
     st_stub.markdown = markdown
     st_stub.text_input = text_input
     st_stub.selectbox = selectbox
     st_stub.number_input = number_input
     st_stub.button = button
+    st_stub.checkbox = checkbox
     st_stub.subheader = subheader
     st_stub.text_area = text_area
     st_stub.text = text
@@ -69,6 +99,15 @@ def streamlit_stub():
     st_stub.download_button = download_button
     st_stub.warning = warning
     st_stub.error = error
+    st_stub.info = info
+    st_stub.progress = progress
+    st_stub.container = container
+    st_stub.expander = expander
+    st_stub.table = table
+    st_stub.json = json
+    st_stub.progress_values = []
+    st_stub.session_state = {}
+    st_stub.query_params = {}
     return st_stub
 
 
@@ -88,15 +127,17 @@ def create_cv_openai_module(mock_streamlit, monkeypatch):
     return importlib.import_module("create_cv_openai_batch")
 
 
-def test_generate_cvs_batch_calls_api(create_cv_openai_module, monkeypatch):
+class Rerun(Exception):
+    pass
+
+
+def test_generate_cvs_batch_calls_api():
     expected_content = "Batch CV"
     mock_response = types.SimpleNamespace(
-        choices=[types.SimpleNamespace(message={"content": expected_content})]
+        choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=expected_content))]
     )
     mock_create = MagicMock(return_value=mock_response)
-    monkeypatch.setattr(
-        create_cv_openai_module.openai.ChatCompletion, "create", mock_create
-    )
+    fake_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=mock_create)))
 
     roles = ["Engineer", "Designer"]
     names = ["Alice", "Bob"]
@@ -105,18 +146,232 @@ def test_generate_cvs_batch_calls_api(create_cv_openai_module, monkeypatch):
     locations = ["City1", "City2"]
     exps = ["High", "Low"]
 
-    responses = create_cv_openai_module.generate_cvs_batch(
-        roles, names, emails, phones, locations, exps
+    responses = openai_batch.generate_cvs_batch(
+        fake_client, roles, names, emails, phones, locations, exps
     )
 
-    assert responses == [expected_content, expected_content]
+    assert responses == [
+        "Name: Alice\nEmail: a@example.com\nPhone Number: 123\nLocation: City1\nBatch CV\n",
+        "Name: Bob\nEmail: b@example.com\nPhone Number: 456\nLocation: City2\nBatch CV\n",
+    ]
     assert mock_create.call_count == 2
+    # The model gets the candidate's identity instead of inventing one
+    identities = sorted(call.kwargs["messages"][1]["content"].splitlines()[0] for call in mock_create.call_args_list)
+    assert identities == ["Name: Alice", "Name: Bob"]
+    assert {call.kwargs["model"] for call in mock_create.call_args_list} == {"gpt-3.5-turbo"}
+
+
+class FakeBatchAPI:
+    """Local stand-in for the OpenAI files and batches endpoints"""
+
+    def __init__(self, statuses=("validating", "in_progress", "completed"), fail_ids=()):
+        self.statuses = list(statuses)
+        self.fail_ids = set(fail_ids)
+        self.uploads = {}
+        self.created_batches = []
+        self.cancelled = []
+        self.retrieve_calls = 0
+        self.files = types.SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = types.SimpleNamespace(create=self._create_batch, retrieve=self._retrieve_batch, cancel=self.cancelled.append)
+
+    def _create_file(self, file, purpose):
+        file_id = f"file-{len(self.uploads)}"
+        self.uploads[file_id] = {"name": file[0], "content": file[1], "purpose": purpose}
+        return types.SimpleNamespace(id=file_id)
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        self.created_batches.append(
+            {"input_file_id": input_file_id, "endpoint": endpoint, "completion_window": completion_window}
+        )
+        return types.SimpleNamespace(id="batch-1", status="validating")
+
+    def _retrieve_batch(self, batch_id):
+        status = self.statuses[min(self.retrieve_calls, len(self.statuses) - 1)]
+        self.retrieve_calls += 1
+        if status != "completed":
+            return types.SimpleNamespace(id=batch_id, status=status, output_file_id=None, error_file_id=None)
+
+        # Answer the requests in reverse order to check results are mapped back by custom_id
+        requests = [json.loads(line) for line in self.uploads["file-0"]["content"].decode().splitlines()]
+        lines = []
+        for request in reversed(requests):
+            if request["custom_id"] in self.fail_ids:
+                lines.append({"custom_id": request["custom_id"], "response": None, "error": {"message": "rate limited"}})
+            else:
+                content = "CV: " + request["body"]["messages"][0]["content"].splitlines()[0]
+                lines.append({
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": {
+                        "choices": [{"message": {"content": content}}], "usage": {"prompt_tokens": 10, "completion_tokens": 20},
+                    }},
+                    "error": None,
+                })
+        self.uploads["file-out"] = {"content": "\n".join(json.dumps(line) for line in lines).encode()}
+        return types.SimpleNamespace(id=batch_id, status=status, output_file_id="file-out", error_file_id=None)
+
+    def _file_content(self, file_id):
+        return types.SimpleNamespace(text=self.uploads[file_id]["content"].decode())
+
+
+def test_generate_cvs_batch_api_maps_results_by_custom_id():
+    fake = FakeBatchAPI(fail_ids={"cv-1"})
+    sleeps = []
+    usage = {}
+
+    responses = openai_batch.generate_cvs_batch_api(
+        fake,
+        ["Engineer", "Designer", "Nurse"],
+        ["Alice", "Bob", "Carol"],
+        ["a@example.com", "b@example.com", "c@example.com"],
+        ["1", "2", "3"],
+        ["City1", "City2", "City3"],
+        ["High", "Low", "Random"],
+        poll_interval=1,
+        sleep=sleeps.append,
+        usage=usage,
+    )
+
+    assert responses[0].endswith("Location: City1\nCV: Generate a CV for the role of Engineer.\n")
+    assert responses[1] == "Error generating CV: rate limited"
+    assert responses[2].endswith("Location: City3\nCV: Generate a CV for the role of Nurse.\n")
+
+    upload = fake.uploads["file-0"]
+    assert upload["purpose"] == "batch"
+    requests = [json.loads(line) for line in upload["content"].decode().splitlines()]
+    assert [r["custom_id"] for r in requests] == ["cv-0", "cv-1", "cv-2"]
+    assert all(r["url"] == "/v1/chat/completions" for r in requests)
+    assert fake.created_batches == [
+        {"input_file_id": "file-0", "endpoint": "/v1/chat/completions", "completion_window": "24h"}
+    ]
+    # Polling backs off exponentially until the batch completes
+    assert sleeps == [1, 2]
+    # Token usage of the successful requests, for the usage history
+    assert usage == {"calls": 2, "prompt_tokens": 20, "completion_tokens": 40, "requests": {0: (10, 20), 2: (10, 20)}}
+
+
+def test_batch_response_without_content_only_fails_its_cv():
+    from cv_generator.openai_batch import collect_batch_results
+
+    lines = [
+        {"custom_id": f"cv-{idx}", "error": None, "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}}}
+        for idx, content in enumerate(["Skills:\nCooking", None])
+    ]
+    client = types.SimpleNamespace(files=types.SimpleNamespace(
+        content=lambda file_id: types.SimpleNamespace(text="\n".join(json.dumps(line) for line in lines)),
+    ))
+    batch = types.SimpleNamespace(id="batch-1", status="completed", output_file_id="file-out", error_file_id=None)
+
+    results = collect_batch_results(client, batch, 2)
+
+    assert results == ["Skills:\nCooking", "Error generating CV: the response has no content"]
+
+
+def test_batch_upload_create_and_download_retry_transient_errors():
+    from cv_generator.fake_llm import FakeAPIError
+    from cv_generator.ratelimit import RetryPolicy
+
+    fake = FakeBatchAPI(statuses=("completed",))
 
+    def flaky(fn):
+        calls = []
 
-def test_save_cv_as_pdf_creates_valid_pdf(create_cv_openai_module, tmp_path):
+        def call(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise FakeAPIError(503)
+            return fn(*args, **kwargs)
+        return call
+
+    fake.files.create = flaky(fake._create_file)
+    fake.files.content = flaky(fake._file_content)
+    fake.batches.create = flaky(fake._create_batch)
+
+    responses = openai_batch.generate_cvs_batch_api(
+        fake, ["Engineer"], ["Alice"], ["a@example.com"], ["1"], ["City1"], ["High"],
+        sleep=lambda _: None, retry_policy=RetryPolicy(max_attempts=2, base_delay=0),
+    )
+
+    assert responses[0].endswith("CV: Generate a CV for the role of Engineer.\n")
+    assert len(fake.created_batches) == 1
+
+
+def test_wait_for_batch_times_out():
+    fake = FakeBatchAPI(statuses=("in_progress",))
+    with pytest.raises(TimeoutError):
+        openai_batch.wait_for_batch(
+            fake, "batch-1", poll_interval=10, timeout=15, sleep=lambda _: None
+        )
+
+
+def run_batch_api_app(mock_streamlit, monkeypatch, tmp_path, fake):
+    from cv_generator import jobs, providers, render_pool, workspace
+
+    clicks = ["✨ Generate Random CVs"]
+    mock_streamlit.button = lambda label, **kwargs: label in clicks
+    mock_streamlit.checkbox = lambda label, value=False, **kwargs: "Batch job" in label or value
+    mock_streamlit.query_params = {}
+
+    def rerun():
+        raise Rerun()
+
+    mock_streamlit.rerun = rerun
+    job_queue = jobs.JobQueue(workers=1)
+    monkeypatch.setattr(jobs, "get_job_queue", lambda: job_queue)
+    monkeypatch.setattr(jobs.Job, "wait", lambda self, timeout=None: self.finished)
+    monkeypatch.setattr(openai_batch, "create_openai_client", lambda **kwargs: fake)
+    monkeypatch.setattr(openai_batch, "BATCH_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(providers, "_clients", {})
+    monkeypatch.setattr(render_pool, "get_render_pool", lambda: render_pool.PDFRenderPool(0))
+    monkeypatch.setattr(workspace, "get_workspace_registry", lambda: workspace.WorkspaceRegistry(root=str(tmp_path)))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1]))
+    monkeypatch.delitem(sys.modules, "create_cv_openai_batch", raising=False)
+    try:
+        importlib.import_module("create_cv_openai_batch")
+    except Rerun:
+        pass
+    return job_queue, job_queue.get(mock_streamlit.query_params["job"])
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_batch_api_job_is_checked_without_holding_a_worker(mock_streamlit, monkeypatch, tmp_path):
+    fake = FakeBatchAPI(statuses=("validating",) + ("in_progress",) * 5 + ("completed",))
+    job_queue, job = run_batch_api_app(mock_streamlit, monkeypatch, tmp_path, fake)
+
+    # The only worker runs other batches between the checks of the Batch API job
+    other = job_queue.submit("someone-else", range(3), lambda number: number)
+    wait_for(lambda: other.finished)
+    assert not job.finished
+    wait_for(lambda: job.finished)
+
+    assert job.status == "done" and fake.retrieve_calls == 7
+    with zipfile.ZipFile(BytesIO(job.output["zip"])) as z:
+        assert len(z.namelist()) == 5
+    job_queue.shutdown()
+
+
+def test_cancelling_a_batch_api_job_cancels_the_remote_batch(mock_streamlit, monkeypatch, tmp_path):
+    fake = FakeBatchAPI(statuses=("in_progress",))
+    job_queue, job = run_batch_api_app(mock_streamlit, monkeypatch, tmp_path, fake)
+    wait_for(lambda: fake.retrieve_calls)
+
+    assert job_queue.cancel(job.job_id)
+    wait_for(lambda: fake.cancelled)
+
+    assert job.status == "cancelled" and fake.cancelled == ["batch-1"]
+    job_queue.shutdown()
+
+
+def test_save_cv_as_pdf_creates_valid_pdf(tmp_path):
     file_path = tmp_path / "cv.pdf"
     sample_content = "Experience:\n5 years"
-    create_cv_openai_module.save_cv_as_pdf(sample_content, str(file_path))
+    save_cv_as_pdf(sample_content, str(file_path))
 
     assert file_path.exists()
     assert file_path.read_bytes().startswith(b"%PDF")
@@ -125,17 +380,6 @@ def test_save_cv_as_pdf_creates_valid_pdf(create_cv_openai_module, tmp_path):
     assert "Experience" in text
 
 
-def test_delete_old_pdfs_removes_pdfs(create_cv_openai_module, tmp_path, monkeypatch):
-    pdf1 = tmp_path / "old1.pdf"
-    pdf2 = tmp_path / "old2.pdf"
-    pdf1.write_text("dummy")
-    pdf2.write_text("dummy")
-
-    monkeypatch.chdir(tmp_path)
-    create_cv_openai_module.delete_old_pdfs()
-    assert list(tmp_path.glob("*.pdf")) == []
-
-
 def test_job_roles_length(create_cv_openai_module):
     assert len(create_cv_openai_module.job_roles) >= 60, "job_roles should contain at least 60 entries"
 
@@ -146,11 +390,11 @@ def test_experience_level_options(create_cv_openai_module, mock_streamlit):
     assert create_cv_openai_module.experience_level == "Random"
 
 
-def test_zip_packaging(create_cv_openai_module, tmp_path):
+def test_zip_packaging(tmp_path):
     file1 = tmp_path / "cv1.pdf"
     file2 = tmp_path / "cv2.pdf"
-    create_cv_openai_module.save_cv_as_pdf("test", str(file1))
-    create_cv_openai_module.save_cv_as_pdf("test", str(file2))
+    save_cv_as_pdf("test", str(file1))
+    save_cv_as_pdf("test", str(file2))
 
     zip_buffer = BytesIO()
     with zipfile.ZipFile(zip_buffer, "w") as zip_file:
@@ -0,0 +1,109 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator import cli  # noqa: E402
+from cv_generator.dedup import DedupIndex, MinHasher, cv_text, dedup_results, lsh_bands, shingles  # noqa: E402
+from cv_generator.generation import GenerationResult  # noqa: E402
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+
+def _sections(seed, length=120):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def _cv(name, sections):
+    return GenerationResult(f"Name: {name}\nEmail: {name}@example.com\nPhone Number: 1\nLocation: Italy\nSkills:\n{sections}\n")
+
+
+def test_near_duplicates_are_flagged_and_identities_ignored():
+    base = _sections(1)
+    edited = base.split()
+    edited[60] = "changed"
+    results = [("a", _cv("Alice", base)), ("b", _cv("Bob", " ".join(edited))), ("c", _cv("Carol", _sections(2)))]
+    index = DedupIndex(threshold=0.8)
+
+    checked = dict(dedup_results(results, index))
+
+    assert "Alice" not in cv_text(results[0][1])
+    assert checked["a"].duplicate_of is None
+    assert checked["b"].duplicate_of == "a" and checked["b"].similarity >= 0.8
+    assert checked["c"].duplicate_of is None
+    assert index.duplicates == 1
+    assert 0.3 < index.diversity() < 0.8
+
+
+def test_duplicates_are_regenerated_until_distinct():
+    calls = []
+
+    def regenerate(key):
+        calls.append(key)
+        return _cv("Bob", _sections(10 + len(calls)))
+
+    index = DedupIndex()
+    checked = dict(dedup_results([("a", _cv("Alice", _sections(1))), ("b", _cv("Bob", _sections(1)))], index, regenerate=regenerate))
+
+    assert calls == ["b"]
+    assert checked["b"].duplicate_of is None
+    assert (index.duplicates, index.regenerated) == (0, 1)
+
+
+def test_index_compares_only_lsh_candidates():
+    index = DedupIndex(threshold=0.8)
+    assert (index.bands, index.rows) == lsh_bands(128, 0.8) == (18, 7)
+    for i in range(300):
+        signature, match = index.check(_sections(i))
+        assert not index.is_duplicate(match)
+        index.add(i, signature, match)
+
+    # Unrelated CVs rarely share a bucket, so a check looks at a handful of CVs, not all 300
+    signature, _ = index.check(_sections(1000))
+    candidates = {position for buckets, band in zip(index._buckets, index._band_keys(signature)) for position in buckets.get(band, ())}
+    assert len(candidates) < 10
+    assert index.diversity() > 0.9
+
+
+def test_cli_reports_diversity(monkeypatch, tmp_path, capsys):
+    exit_code = cli.main(["--provider", "fake", "--count", "4", "--render-workers", "0", "--output-dir", str(tmp_path)])
+
+    assert exit_code == 0
+    assert "Diversity: " in capsys.readouterr().out
+
+
+def test_numpy_and_pure_python_signatures_match(monkeypatch):
+    pytest.importorskip("numpy")
+    from cv_generator import dedup
+
+    shingle_set = shingles(_sections(3))
+    vectorised = MinHasher().signature(shingle_set)
+    monkeypatch.setattr(dedup, "_load_numpy", lambda: None)
+
+    assert MinHasher().signature(shingle_set) == vectorised
+
+
+def test_check_compares_only_the_closest_candidates(monkeypatch):
+    from cv_generator import dedup
+
+    index = DedupIndex(threshold=0.8, max_candidates=4)
+    base = _sections(1).split()
+    for i in range(40):
+        # Near-copies of one CV share most of their buckets
+        edited = list(base)
+        edited[i] = "changed"
+        signature, match = index.check(" ".join(edited))
+        index.add(i, signature, match)
+
+    compared = []
+    real_similarity = dedup.similarity
+    monkeypatch.setattr(dedup, "similarity", lambda signature, other: compared.append(1) or real_similarity(signature, other))
+    _, match = index.check(" ".join(base))
+
+    assert len(compared) == 4
+    assert index.is_duplicate(match)
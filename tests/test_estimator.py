@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator import cli  # noqa: E402
+from cv_generator.estimator import UsageHistory, estimate_run, max_cvs_for_budget, template_prompt_tokens, token_cost  # noqa: E402
+from cv_generator.planner import Combination  # noqa: E402
+from cv_generator.ratelimit import DEFAULT_COMPLETION_TOKENS, RateLimiter  # noqa: E402
+
+
+def test_estimate_from_prompt_template_and_prices(monkeypatch):
+    monkeypatch.setenv("GROQ_PRICE_INPUT", "1.0")
+    monkeypatch.setenv("GROQ_PRICE_OUTPUT", "2.0")
+    combinations = [Combination("Chef", "Italy", "Low", 10), Combination("Data Scientist", "Germany", "High", 30)]
+
+    estimate = estimate_run(combinations, "groq", "m", concurrency=5)
+
+    prompt_tokens = 10 * template_prompt_tokens("Chef", "Italy", "Low") + 30 * template_prompt_tokens("Data Scientist", "Germany", "High")
+    assert (estimate.cvs, estimate.prompt_tokens, estimate.completion_tokens) == (40, prompt_tokens, 40 * DEFAULT_COMPLETION_TOKENS)
+    assert estimate.cost == pytest.approx((prompt_tokens * 1.0 + 40 * DEFAULT_COMPLETION_TOKENS * 2.0) / 1e6)
+    assert (estimate.limited_by, estimate.seconds) == ("concurrency", 80.0)
+    # The Batch API is billed at half the chat price
+    assert token_cost("openai-batch", 1000, 1000) == token_cost("openai", 1000, 1000) / 2
+
+
+def test_rate_limits_bound_the_projected_time():
+    combinations = [Combination("Chef", "Italy", "Low", 100)]
+
+    estimate = estimate_run(combinations, "groq", "m", concurrency=50, rate_limiter=RateLimiter(requests_per_minute=30))
+
+    # 30 requests go out at once, the other 70 at 30 per minute, plus the last call
+    assert estimate.limited_by == "requests per minute"
+    assert estimate.seconds == pytest.approx(140 + 10)
+
+
+def test_history_calibrates_later_estimates(tmp_path):
+    combinations = [Combination("Chef", "Italy", "Low", 4)]
+    with UsageHistory(str(tmp_path / "usage.db")) as history:
+        first = estimate_run(combinations, "groq", "m", history=history)
+        history.record(first, calls=4, prompt_tokens=first.prompt_tokens * 2, completion_tokens=4 * 500, api_seconds=8.0, seconds=3.0)
+        second = estimate_run(combinations, "groq", "m", history=history)
+        other_model = estimate_run(combinations, "groq", "other", history=history)
+
+    assert first.runs == 0 and second.runs == 1
+    assert second.prompt_tokens == first.prompt_tokens * 2
+    assert second.completion_tokens == 4 * 500
+    # One round of calls at the recorded 2s per call
+    assert second.seconds == pytest.approx(2.0)
+    assert other_model.completion_tokens == first.completion_tokens
+
+
+def test_budget_caps_the_batch_size():
+    assert max_cvs_for_budget(0.01, 1.0) == 100
+    assert max_cvs_for_budget(0.0001, 1.0) == 1000
+    assert max_cvs_for_budget(0.0, 1.0, ceiling=50) == 50
+    assert max_cvs_for_budget(0.5, 0.1) == 0
+
+
+def test_cli_estimate_and_budget(monkeypatch, tmp_path, capsys):
+    usage_db = str(tmp_path / "usage.db")
+    out = tmp_path / "out"
+    args = ["--provider", "fake", "--count", "3", "--render-workers", "0", "--output-dir", str(out), "--usage-db", usage_db]
+
+    assert cli.main(args + ["--estimate"]) == 0
+    assert "Estimate: 3 CVs with fake" in capsys.readouterr().out
+    assert not out.exists()
+
+    monkeypatch.setenv("FAKE_PRICE_OUTPUT", "1000")
+    assert cli.main(args + ["--budget", "0.5"]) == 2
+    assert "exceeds --budget" in capsys.readouterr().err
+    assert not out.exists()
+
+    monkeypatch.delenv("FAKE_PRICE_OUTPUT")
+    assert cli.main(args) == 0
+    assert "Actual (fake): " in capsys.readouterr().out
+    assert len(UsageHistory(usage_db).runs("fake")) == 1
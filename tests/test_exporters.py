@@ -0,0 +1,122 @@
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator import cli, exporters  # noqa: E402
+from cv_generator.exporters import CVExporter, ExportError, cv_record, parse_formats, to_markdown  # noqa: E402
+from cv_generator.generation import GenerationResult  # noqa: E402
+from cv_generator.planner import JobSpecError, parse_job_spec  # noqa: E402
+from cv_generator.structured import parse_text_cv  # noqa: E402
+
+TEXT_CV = """**Name:** Ada Lovelace
+Email: ada@example.com
+Phone Number: +44 20 1234
+Location: London
+Applicant Key Role: Data Scientist
+Years of Experience: 7 years
+## Skills:
+- Python
+* Statistics
+Languages:
+- English
+"""
+
+METADATA = {"role": "Data Scientist", "location": "London", "experience_level": "High", "provider": "fake"}
+
+
+def test_parse_text_cv_reads_identity_and_sections():
+    cv = parse_text_cv(TEXT_CV)
+
+    assert (cv.name, cv.email, cv.location) == ("Ada Lovelace", "ada@example.com", "London")
+    assert cv.applicant_key_role == "Data Scientist"
+    assert cv.years_of_experience == 7
+    assert cv.skills == ["Python", "Statistics"]
+    assert cv.languages == ["English"]
+    assert cv.projects == []
+
+
+def test_record_and_markdown_come_from_one_parsed_cv():
+    record = cv_record(GenerationResult(TEXT_CV), "Data_Scientist_CV_1.pdf", **METADATA)
+
+    assert record["id"] == "Data_Scientist_CV_1"
+    assert record["name"] == "Ada Lovelace" and record["skills"] == ["Python", "Statistics"]
+    json.dumps(record)
+    markdown = to_markdown(record)
+    assert markdown.startswith("# Ada Lovelace\n")
+    assert "## Skills\n\n- Python\n- Statistics" in markdown
+
+
+def test_exporter_streams_files_and_jsonl(tmp_path):
+    files = {}
+    exporter = CVExporter(["pdf", "md", "jsonl"], files.__setitem__, dataset_dir=str(tmp_path))
+
+    with exporter:
+        assert exporter.export("a.pdf", GenerationResult(TEXT_CV), b"%PDF", **METADATA) == ["a.pdf", "a.md"]
+        # The JSONL line is on disk before the run ends
+        assert json.loads((tmp_path / "cvs.jsonl").read_text())["path"] == "a.pdf"
+        assert exporter.export("b.pdf", GenerationResult("Error generating CV: boom"), b"%PDF", **METADATA) == ["b.pdf"]
+
+    assert set(files) == {"a.pdf", "a.md", "b.pdf"}
+    assert len((tmp_path / "cvs.jsonl").read_text().splitlines()) == 1
+
+
+def test_formats_are_validated():
+    assert parse_formats("md, jsonl,md") == ["md", "jsonl"]
+    with pytest.raises(ExportError):
+        parse_formats("pdf,xlsx")
+    spec = parse_job_spec({"jobs": [{"role": "Chef", "location": "Italy"}], "formats": ["jsonl"]})
+    assert spec.formats == ["jsonl"]
+    with pytest.raises(JobSpecError):
+        parse_job_spec({"jobs": [{"role": "Chef", "location": "Italy"}], "formats": "csv"})
+
+
+def test_missing_optional_library_fails_before_generation(monkeypatch, capsys):
+    def missing():
+        raise ExportError("pyarrow is needed to export Parquet datasets (pip install pyarrow)")
+
+    monkeypatch.setattr(exporters, "_require_pyarrow", missing)
+
+    assert cli.main(["--provider", "fake", "--formats", "parquet"]) == 2
+    assert "pip install pyarrow" in capsys.readouterr().err
+
+
+def test_cli_exports_without_rendering_pdfs(tmp_path):
+    exit_code = cli.main(["--provider", "fake", "--count", "3", "--formats", "jsonl,md", "--output-dir", str(tmp_path)])
+
+    assert exit_code == 0
+    assert sorted(path.name for path in tmp_path.glob("*.md")) == [f"cv_Software_Engineer_{i}.md" for i in (1, 2, 3)]
+    assert not list(tmp_path.glob("*.pdf"))
+    records = [json.loads(line) for line in (tmp_path / "cvs.jsonl").read_text().splitlines()]
+    assert len(records) == 3 and all(record["skills"] for record in records)
+
+
+def test_cli_writes_formats_into_zip(tmp_path):
+    archive = tmp_path / "batch.zip"
+    exit_code = cli.main(["--provider", "fake", "--count", "2", "--render-workers", "0", "--formats", "pdf,md,jsonl", "--zip", str(archive)])
+
+    assert exit_code == 0
+    with zipfile.ZipFile(archive) as zf:
+        assert sorted(zf.namelist()) == sorted(f"cv_Software_Engineer_{i}.{ext}" for i in (1, 2) for ext in ("pdf", "md"))
+    assert len((tmp_path / "batch.jsonl").read_text().splitlines()) == 2
+
+
+def test_docx_export():
+    pytest.importorskip("docx")
+    record = cv_record(GenerationResult(TEXT_CV), "a.pdf", **METADATA)
+
+    assert exporters.to_docx(record)[:2] == b"PK"
+
+
+def test_parquet_export(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    with CVExporter(["parquet"], None, dataset_dir=str(tmp_path)) as exporter:
+        exporter.export("a.pdf", GenerationResult(TEXT_CV), **METADATA)
+
+    table = pq.read_table(tmp_path / "cvs.parquet")
+    assert table.column("skills").to_pylist() == [["Python", "Statistics"]]
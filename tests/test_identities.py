@@ -0,0 +1,40 @@
+from cv_generator.identities import IdentityGenerator, generate_identities, locale_for_location
+
+
+def test_locale_for_location():
+    assert locale_for_location("Berlin, Germany") == "de_DE"
+    assert locale_for_location("São Paulo, Brazil") == "pt_BR"
+    assert locale_for_location("Kyiv, Ukraine") == "en_US"
+    assert locale_for_location("Saudi Arabia") == "en_US"
+    assert locale_for_location(None) == "en_US"
+
+
+def test_batch_is_columnar_and_seeded():
+    first = IdentityGenerator(seed=3).generate(20, "France")
+    second = IdentityGenerator(seed=3).generate(20, "France")
+
+    assert first == second
+    assert first.locale == "fr_FR"
+    assert len(first) == len(first.emails) == len(first.phone_numbers) == len(first.hashes) == 20
+
+
+def test_emails_are_unique_and_ascii():
+    batch = IdentityGenerator(seed=0).generate(5000, "Germany")
+
+    assert len(set(batch.emails)) == 5000
+    assert all(email.isascii() and email.endswith("@example.com") for email in batch.emails)
+    assert all(hash_ in email for email, hash_ in zip(batch.emails, batch.hashes))
+
+
+def test_small_batches_keep_four_digit_hashes():
+    batch = IdentityGenerator(seed=1).generate(50)
+
+    assert all(len(hash_) == 4 for hash_ in batch.hashes)
+    assert len(set(batch.hashes)) == 50
+
+
+def test_generate_identities_returns_lists():
+    names, emails, phone_numbers = generate_identities(3, "Spain", seed=7)
+
+    assert (names, emails, phone_numbers) == generate_identities(3, "Spain", seed=7)
+    assert len(names) == len(emails) == len(phone_numbers) == 3
@@ -0,0 +1,193 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator.jobs import CANCELLED, DONE, FAILED, JobQueue, Requeue  # noqa: E402
+
+
+def wait_until_finished(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.wait(timeout=0.05):
+        assert time.monotonic() < deadline, "job did not finish"
+
+
+def test_job_runs_in_background_and_reports_progress():
+    queue = JobQueue(workers=2)
+    release = threading.Event()
+
+    def run_task(number):
+        release.wait()
+        return number * 2
+
+    job = queue.submit("alice", range(4), run_task, on_done=lambda job: setattr(job, "output", sum(v for _, v in job.results())))
+    # submit returns straight away; the tasks wait on the workers
+    assert not job.finished and job.completed == 0
+    release.set()
+    wait_until_finished(job)
+
+    assert job.status == DONE and job.progress == 1.0
+    assert sorted(job.results()) == [(0, 0), (1, 2), (2, 4), (3, 6)]
+    assert job.output == 12
+    assert queue.get(job.job_id) is job and queue.jobs("alice") == [job]
+    queue.shutdown()
+
+
+def test_owners_share_workers_fairly():
+    queue = JobQueue(workers=1)
+    gate = threading.Event()
+    order = []
+
+    def run_task(task):
+        gate.wait()
+        order.append(task)
+
+    # The first user's big batch is queued before the second user's small one
+    big = queue.submit("alice", [("alice", i) for i in range(6)], run_task)
+    small = queue.submit("bob", [("bob", i) for i in range(2)], run_task)
+    gate.set()
+    wait_until_finished(big)
+    wait_until_finished(small)
+
+    # The worker alternates between owners, so bob's batch finishes long before alice's
+    owners = [owner for owner, _ in order]
+    assert "bob" not in owners[4:]
+    assert owners[-2:] == ["alice", "alice"]
+    queue.shutdown()
+
+
+def test_max_in_flight_caps_a_jobs_parallelism():
+    queue = JobQueue(workers=6)
+    lock = threading.Lock()
+    running = peak = 0
+
+    def run_task(_):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    job = queue.submit("alice", range(12), run_task, max_in_flight=2)
+    wait_until_finished(job)
+
+    assert job.status == DONE and peak == 2
+    queue.shutdown()
+
+
+def test_cancel_and_failure():
+    queue = JobQueue(workers=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(task):
+        started.set()
+        release.wait()
+        return task
+
+    job = queue.submit("alice", range(5), slow)
+    started.wait()
+    assert queue.cancel(job.job_id)
+    release.set()
+    time.sleep(0.05)
+    assert job.status == CANCELLED and job.completed <= 1
+
+    def broken(task):
+        if task == 1:
+            raise ValueError("boom")
+        return task
+
+    failed = queue.submit("bob", range(3), broken)
+    wait_until_finished(failed)
+    assert failed.status == FAILED and failed.error == "ValueError: boom"
+    queue.shutdown()
+
+
+def test_on_finish_runs_once_whichever_way_the_job_ends():
+    queue = JobQueue(workers=2)
+    started = threading.Event()
+    release = threading.Event()
+    finished = []
+
+    def slow(task):
+        started.set()
+        release.wait()
+        return task
+
+    def on_finish(job):
+        finished.append((job.status, job.completed))
+
+    cancelled = queue.submit("alice", range(5), slow, max_in_flight=1, on_finish=on_finish)
+    started.wait()
+    queue.cancel(cancelled.job_id)
+    # The running task still uses the job's resources, so cleanup waits for it
+    assert finished == []
+    release.set()
+    deadline = time.monotonic() + 5
+    while not finished:
+        assert time.monotonic() < deadline, "on_finish did not run"
+        time.sleep(0.01)
+    assert finished == [(CANCELLED, 1)]
+
+    def broken(task):
+        raise ValueError("boom")
+
+    failed = queue.submit("bob", range(2), broken, on_finish=on_finish)
+    done = queue.submit("carol", range(2), lambda task: task, on_done=lambda job: finished.append("on_done"), on_finish=on_finish)
+    wait_until_finished(failed)
+    wait_until_finished(done)
+    time.sleep(0.05)
+
+    assert finished[1:].count((FAILED, 0)) == 1
+    assert finished.index("on_done") < finished.index((DONE, 2))
+    assert len(finished) == 4
+    queue.shutdown()
+
+
+def test_requeued_task_frees_its_worker_until_it_is_due():
+    queue = JobQueue(workers=1)
+    checks = []
+
+    def poll(_):
+        checks.append(time.monotonic())
+        if len(checks) < 3:
+            raise Requeue(0.05)
+        return "ready"
+
+    polling = queue.submit("alice", [None], poll)
+    # The only worker runs another owner's batch while the poll waits
+    other = queue.submit("bob", range(3), lambda number: number)
+    wait_until_finished(other)
+    wait_until_finished(polling)
+
+    assert polling.status == DONE and polling.results() == [(None, "ready")]
+    assert len(checks) == 3 and checks[2] - checks[0] >= 0.1
+    queue.shutdown()
+
+
+def test_cancelling_a_requeued_task_stops_it():
+    queue = JobQueue(workers=1)
+    checks = []
+    finished = []
+
+    def poll(_):
+        checks.append(1)
+        raise Requeue(0.05)
+
+    job = queue.submit("alice", [None], poll, on_finish=finished.append)
+    deadline = time.monotonic() + 5
+    while not checks:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert queue.cancel(job.job_id)
+    wait_until_finished(job)
+    time.sleep(0.2)
+
+    assert job.status == CANCELLED and finished == [job]
+    assert len(checks) <= 2
+    queue.shutdown()
@@ -0,0 +1,148 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator import cli  # noqa: E402
+from cv_generator.fake_llm import FakeAPIError, FakeChatClient  # noqa: E402
+from cv_generator.generation import GenerationResult  # noqa: E402
+from cv_generator.manifest import FAILED, GENERATED, RENDERED, JobManifest, split_resumed_work  # noqa: E402
+from cv_generator.planner import parse_job_spec, plan_work  # noqa: E402
+from cv_generator.structured import StructuredCV  # noqa: E402
+
+
+class FlakyClient(FakeChatClient):
+    """
+    Fake client whose calls for the listed candidates fail with a non-retryable error
+    """
+
+    def __init__(self, failing_names):
+        super().__init__()
+        self.failing_names = failing_names
+        self.names = []
+
+    def create(self, messages, model, **kwargs):
+        name = messages[1]["content"].splitlines()[0].removeprefix("Name: ")
+        self.names.append(name)
+        if name in self.failing_names:
+            raise FakeAPIError(400)
+        return super().create(messages, model, **kwargs)
+
+
+def _work(count=3):
+    return plan_work(parse_job_spec({"seed": 3, "jobs": [{"role": "Chef", "location": "Italy", "count": count}]}))
+
+
+def test_job_resumes_with_stored_identities(tmp_path):
+    settings = {"jobs": "chefs"}
+    with JobManifest(str(tmp_path / "manifest.db")) as manifest:
+        job_id, resumed = manifest.start_job(settings)
+        work = manifest.add_items(job_id, _work())
+        assert not resumed
+        manifest.record_result(job_id, work[0], GenerationResult("Skills:\nCooking", attempts=2))
+        manifest.record_result(job_id, work[1], GenerationResult("Error generating CV: boom", attempts=4))
+
+    with JobManifest(str(tmp_path / "manifest.db")) as manifest:
+        assert manifest.start_job(settings) == (job_id, True)
+        assert manifest.start_job({"jobs": "nurses"})[1] is False
+        other = plan_work(parse_job_spec({"seed": 4, "jobs": [{"role": "Chef", "location": "Italy", "count": 3}]}))
+        resumed_work = manifest.add_items(job_id, other)
+        assert [item.email for item in resumed_work] == [item.email for item in work]
+        entries = manifest.entries(job_id)
+        assert [entry["status"] for entry in entries.values()] == [GENERATED, FAILED, "pending"]
+        assert entries[work[0].path]["attempts"] == 2
+
+        written, stored, remaining = split_resumed_work(manifest, job_id, resumed_work)
+        assert written == []
+        assert [(item.path, result.content, result.cached) for item, result in stored] == [(work[0].path, "Skills:\nCooking", True)]
+        assert remaining == resumed_work[1:]
+
+
+def test_job_finishes_only_when_every_pdf_is_written(tmp_path):
+    with JobManifest(str(tmp_path / "manifest.db")) as manifest:
+        job_id, _ = manifest.start_job({})
+        work = manifest.add_items(job_id, _work(count=2))
+        structured = StructuredCV("A", "a@example.com", "1", "Italy", skills=["Cooking"])
+        for item in work:
+            manifest.record_result(job_id, item, GenerationResult("{}", attempts=1, structured=structured))
+        manifest.record_artifact(job_id, work[0], str(tmp_path / "a.pdf"))
+        assert not manifest.finish_job(job_id)
+
+        (tmp_path / "a.pdf").write_bytes(b"%PDF")
+        written, stored, remaining = split_resumed_work(manifest, job_id, work)
+        assert written == [work[0]]
+        assert stored[0][1].structured == structured
+        assert remaining == []
+
+        manifest.record_artifact(job_id, work[1], str(tmp_path / "b.pdf"))
+        assert manifest.entries(job_id)[work[1].path]["status"] == RENDERED
+        assert manifest.finish_job(job_id)
+        assert manifest.start_job({})[1] is False
+
+
+def test_cli_resume_only_retries_failed_cvs(monkeypatch, tmp_path, capsys):
+    out = tmp_path / "out"
+    args = ["--role", "Chef", "--location", "Italy", "--count", "4", "--seed", "5", "--render-workers", "0",
+            "--output-dir", str(out), "--manifest", str(tmp_path / "manifest.db")]
+    names = [item.name for item in plan_work(parse_job_spec({"seed": 5, "jobs": [{"role": "Chef", "location": "Italy", "count": 4}]}))]
+
+    first = FlakyClient(failing_names={names[1], names[3]})
+    monkeypatch.setattr(cli, "client_for", lambda provider, concurrency=None: first)
+    assert cli.main(args) == 0
+    assert sorted(first.names) == sorted(names)
+    assert "incomplete" in capsys.readouterr().err
+
+    # A lost PDF is rendered again from the stored answer without calling the API
+    (out / "cv_Chef_1.pdf").unlink()
+    second = FlakyClient(failing_names=set())
+    monkeypatch.setattr(cli, "client_for", lambda provider, concurrency=None: second)
+    assert cli.main(args) == 0
+    assert sorted(second.names) == sorted([names[1], names[3]])
+    assert "already generated" in capsys.readouterr().out
+    assert sorted(p.name for p in out.glob("*.pdf")) == [f"cv_Chef_{n}.pdf" for n in range(1, 5)]
+
+    # Once finished, the same command starts a new job
+    third = FlakyClient(failing_names=set())
+    monkeypatch.setattr(cli, "client_for", lambda provider, concurrency=None: third)
+    assert cli.main(args) == 0
+    assert "Resuming" not in capsys.readouterr().out
+    assert len(third.names) == 4
+
+
+def test_interrupted_batch_api_run_polls_the_submitted_batch(monkeypatch, tmp_path):
+    from types import SimpleNamespace
+
+    from cv_generator import planner
+
+    spec = parse_job_spec({"seed": 3, "jobs": [{"role": "Nurse", "location": "Spain", "count": 2, "provider": "openai-batch"}]})
+    submitted = []
+
+    def interrupted_batch_api(client, roles, batch_id=None, on_batch=None, **kwargs):
+        assert batch_id is None
+        submitted.append(roles)
+        on_batch(SimpleNamespace(id="batch-1", input_file_id="file-1", status="validating"))
+        raise KeyboardInterrupt
+
+    def resumed_batch_api(client, roles, batch_id=None, on_batch=None, **kwargs):
+        assert batch_id == "batch-1"
+        on_batch(SimpleNamespace(id="batch-1", input_file_id="file-1", status="completed"))
+        return [f"Batch CV {idx}" for idx in range(len(roles))]
+
+    with JobManifest(str(tmp_path / "manifest.db")) as manifest:
+        job_id, _ = manifest.start_job({"jobs": "nurses"})
+        work = manifest.add_items(job_id, plan_work(spec))
+        monkeypatch.setattr(planner, "generate_cvs_batch_api", interrupted_batch_api)
+        try:
+            list(planner.iter_work_results(work, {"openai-batch": object()}, manifest=manifest, job_id=job_id))
+        except KeyboardInterrupt:
+            pass
+        assert manifest.open_batch(job_id, "openai-batch")["batch_id"] == "batch-1"
+
+        # The next run of the same job polls batch-1 instead of submitting (and paying for) a new batch
+        monkeypatch.setattr(planner, "generate_cvs_batch_api", resumed_batch_api)
+        results = list(planner.iter_work_results(work, {"openai-batch": object()}, manifest=manifest, job_id=job_id))
+
+        assert len(submitted) == 1
+        assert [result.content for _, result in results] == ["Batch CV 0", "Batch CV 1"]
+        assert manifest.open_batch(job_id, "openai-batch") is None
@@ -0,0 +1,83 @@
+import json
+import sys
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator import cli  # noqa: E402
+from cv_generator.fake_llm import FakeAPIError, FakeChatClient  # noqa: E402
+from cv_generator.generation import generate_cv_result  # noqa: E402
+from cv_generator.metrics import Metrics, PrometheusSink, StatsSink, get_metrics  # noqa: E402
+from cv_generator.ratelimit import RetryPolicy  # noqa: E402
+
+
+class FailingClient(FakeChatClient):
+    def create(self, messages, model, **kwargs):
+        self.calls += 1
+        raise FakeAPIError(503)
+
+
+def test_generation_reports_stages_tokens_retries_and_errors():
+    stats = StatsSink()
+    with get_metrics().attached(stats):
+        ok = generate_cv_result(FakeChatClient(), "Chef", "A", "a@example.com", "1", "Italy", "Low")
+        failed = generate_cv_result(
+            FailingClient(), "Chef", "B", "b@example.com", "2", "Italy", "Low",
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.001),
+        )
+
+    assert ok.ok and ok.error_type is None
+    assert failed.error_type == "FakeAPIError"
+    stages = {row["stage"]: row["count"] for row in stats.summary()}
+    assert stages == {"prompt_build": 2, "api_call": 4}
+    counters = stats.counters()
+    assert counters["tokens"] == ok.prompt_tokens + ok.completion_tokens
+    assert counters["retries"] == 2
+    assert counters["errors (FakeAPIError)"] == 1
+    # Sinks are detached after the with block
+    assert stats not in get_metrics().sinks
+
+
+def test_prometheus_sink_renders_histograms_and_counters():
+    sink = PrometheusSink(buckets=(0.1, 1.0))
+    metrics = Metrics([sink])
+    metrics.timing("api_call", 0.5, model="m", outcome="ok")
+    metrics.timing("api_call", 2.0, model="m", outcome="ok")
+    metrics.count("errors", model="m", error="Timeout")
+
+    text = sink.render()
+
+    assert 'cv_stage_seconds_bucket{stage="api_call",model="m",outcome="ok",le="0.1"} 0' in text
+    assert 'cv_stage_seconds_bucket{stage="api_call",model="m",outcome="ok",le="1.0"} 1' in text
+    assert 'cv_stage_seconds_bucket{stage="api_call",model="m",outcome="ok",le="+Inf"} 2' in text
+    assert 'cv_stage_seconds_sum{stage="api_call",model="m",outcome="ok"} 2.5' in text
+    assert 'cv_errors_total{error="Timeout",model="m"} 1' in text
+
+    server = sink.serve(0, host="127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert response.read().decode() == sink.render()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_cli_writes_metrics_log_and_stats(tmp_path, capsys):
+    log = tmp_path / "metrics.jsonl"
+    sinks = get_metrics().sinks
+
+    exit_code = cli.main([
+        "--provider", "fake", "--count", "3", "--render-workers", "0", "--output-dir", str(tmp_path / "out"),
+        "--zip", str(tmp_path / "cvs.zip"), "--metrics-jsonl", str(log), "--stats",
+    ])
+
+    assert exit_code == 0
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    stages = {event["stage"] for event in events if event["type"] == "timing"}
+    assert {"prompt_build", "queue_wait", "api_call", "pdf_render", "zip"} <= stages
+    assert sum(event["value"] for event in events if event.get("name") == "tokens") > 0
+    output = capsys.readouterr().out
+    assert "pdf_render" in output and "tokens: " in output
+    assert get_metrics().sinks == sinks
@@ -0,0 +1,31 @@
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+
+from benchmarks.render import legacy_render_cv_pdf
+from benchmarks.sanitize import SAMPLE_CV
+from cv_generator import pdf
+from cv_generator.text import sanitize_text
+
+
+def _pages(pdf_bytes):
+    return [page.extract_text() for page in PdfReader(BytesIO(pdf_bytes)).pages]
+
+
+def test_template_render_matches_previous_layout():
+    long_lines = "Skills:\n" + "word " * 200 + "\n" + "x" * 500 + "\nReferences:\nAvailable on request"
+
+    # The legacy path keeps the previous sanitiser, so both get text that is already ASCII
+    for cv in (sanitize_text(SAMPLE_CV), long_lines):
+        assert _pages(pdf.render_cv_pdf(cv)) == _pages(legacy_render_cv_pdf(cv))
+
+
+def test_documents_do_not_share_state_with_the_template():
+    first = _pages(pdf.render_cv_pdf(SAMPLE_CV))
+    pdf.render_cv_pdf("Only:\none line")
+    template_pages = dict(pdf._template.pages)
+
+    assert _pages(pdf.render_cv_pdf(SAMPLE_CV)) == first
+    assert len(first) > 1
+    assert pdf._template.pages == template_pages
+    assert pdf._template.page == 1
@@ -0,0 +1,124 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator import cli, planner  # noqa: E402
+from cv_generator.fake_llm import FakeChatClient  # noqa: E402
+from cv_generator.planner import JobSpecError, iter_work_results, load_job_spec, parse_job_spec, plan_work  # noqa: E402
+
+SPEC_YAML = """
+seed: 7
+concurrency:
+  groq: 4
+defaults:
+  count: 2
+jobs:
+  - roles: [Data Scientist, Chef]
+    locations: [Germany, "São Paulo, Brazil"]
+    experience_levels: [High, Low]
+  - role: Nurse
+    location: Canada
+    count: 3
+"""
+
+
+def test_spec_expands_into_combinations(tmp_path):
+    path = tmp_path / "jobs.yaml"
+    path.write_text(SPEC_YAML, encoding="utf-8")
+
+    spec = load_job_spec(str(path))
+
+    assert len(spec.combinations) == 9
+    assert spec.total == 8 * 2 + 3
+    assert spec.concurrency == {"groq": 4}
+    assert spec.combinations[1].folder == "Data_Scientist/Germany/Low"
+    assert spec.combinations[2].folder == "Data_Scientist/Sao_Paulo_Brazil/High"
+    assert spec.combinations[-1].experience_level == "Random"
+
+
+@pytest.mark.parametrize("data, message", [
+    ({}, "non-empty 'jobs'"),
+    ({"jobs": [{"location": "Spain"}]}, "job 1: job is missing 'roles'"),
+    ({"jobs": [{"role": "Chef", "location": "Spain", "experience_level": "Mid"}]}, "unknown experience level 'Mid'"),
+    ({"jobs": [{"role": "Chef", "location": "Spain", "count": 0}]}, "positive integer"),
+    ({"jobs": [{"role": "Chef", "location": "Spain", "provider": "other"}]}, "unknown provider"),
+    ({"jobs": [{"role": "Chef", "location": "Spain"}], "concurrency": {"groq": 0}}, "'concurrency'"),
+])
+def test_invalid_specs_are_rejected(data, message):
+    with pytest.raises(JobSpecError, match=message):
+        parse_job_spec(data)
+
+
+def test_plan_interleaves_combinations():
+    spec = parse_job_spec({"seed": 1, "jobs": [
+        {"role": "Chef", "location": "Italy", "count": 3},
+        {"role": "Nurse", "location": "Spain", "count": 1},
+    ]})
+
+    work = plan_work(spec)
+
+    assert [item.path for item in work] == [
+        "Chef/Italy/Random/cv_Chef_1.pdf",
+        "Nurse/Spain/Random/cv_Nurse_1.pdf",
+        "Chef/Italy/Random/cv_Chef_2.pdf",
+        "Chef/Italy/Random/cv_Chef_3.pdf",
+    ]
+    assert [item.variant for item in work] == [0, 0, 1, 2]
+    assert len({item.email for item in work}) == 4
+    assert [item.email for item in plan_work(spec)] == [item.email for item in work]
+
+
+def test_providers_run_side_by_side(monkeypatch):
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o-mini")
+    spec = parse_job_spec({"jobs": [
+        {"role": "Chef", "location": "Italy", "count": 3},
+        {"role": "Nurse", "location": "Spain", "count": 2, "provider": "openai-batch"},
+    ]})
+    batches = []
+
+    def fake_batch_api(client, roles, model, usage=None, **kwargs):
+        batches.append((model, roles))
+        usage["requests"] = {idx: (10, 20 + idx) for idx in range(len(roles))}
+        return [f"Batch CV for {role}" for role in roles]
+
+    monkeypatch.setattr(planner, "generate_cvs_batch_api", fake_batch_api)
+
+    results = list(iter_work_results(plan_work(spec), {"groq": FakeChatClient(), "openai-batch": object()}))
+
+    assert len(results) == 5
+    assert batches == [("gpt-4o-mini", ["Nurse", "Nurse"])]
+    assert sorted(item.path for item, result in results if result.content.startswith("Batch CV")) == [
+        "Nurse/Spain/Random/cv_Nurse_1.pdf", "Nurse/Spain/Random/cv_Nurse_2.pdf",
+    ]
+    assert all(result.ok for _, result in results)
+    # Batch API CVs carry the tokens of their own request
+    assert sorted(result.completion_tokens for _, result in results if result.content.startswith("Batch CV")) == [20, 21]
+
+
+def test_cli_writes_one_folder_per_combination(monkeypatch, tmp_path):
+    spec = tmp_path / "jobs.json"
+    spec.write_text(json.dumps({"jobs": [{"roles": ["Chef", "UX/UI Designer"], "location": "Italy", "count": 2}]}))
+    monkeypatch.setattr(cli, "client_for", lambda provider, concurrency=None: FakeChatClient())
+
+    exit_code = cli.main(["--spec", str(spec), "--output-dir", str(tmp_path / "out"), "--render-workers", "0"])
+
+    assert exit_code == 0
+    assert sorted(str(p.relative_to(tmp_path / "out")) for p in (tmp_path / "out").rglob("*.pdf")) == [
+        "Chef/Italy/Random/cv_Chef_1.pdf",
+        "Chef/Italy/Random/cv_Chef_2.pdf",
+        "UX_UI_Designer/Italy/Random/cv_UX_UI_Designer_1.pdf",
+        "UX_UI_Designer/Italy/Random/cv_UX_UI_Designer_2.pdf",
+    ]
+
+
+def test_cli_reports_invalid_spec(tmp_path, capsys):
+    spec = tmp_path / "jobs.json"
+    spec.write_text("{}")
+
+    assert cli.main(["--spec", str(spec)]) == 2
+    assert "Invalid job specification" in capsys.readouterr().err
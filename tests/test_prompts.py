@@ -0,0 +1,41 @@
+import types
+
+from cv_generator.fake_llm import FakeChatClient
+from cv_generator.generation import generate_cv_result
+from cv_generator.prompts import CV_SECTIONS, assemble_cv, build_cv_messages
+
+
+def test_messages_supply_the_identity_and_ask_only_for_sections():
+    sections, identity = build_cv_messages("Chef", "Ana Ruiz", "ana.ruiz1234@example.com", "+34 600 000 000", "Spain", "Low")
+
+    assert identity["content"] == (
+        "Name: Ana Ruiz\nEmail: ana.ruiz1234@example.com\nPhone Number: +34 600 000 000\nLocation: Spain\n"
+    )
+    assert "Ana Ruiz" not in sections["content"]
+    assert "do not repeat them" in sections["content"]
+    assert [line.split(":")[0] for line in sections["content"].splitlines()[-len(CV_SECTIONS):]] == CV_SECTIONS
+
+
+def test_assemble_cv_puts_identity_on_top():
+    cv = assemble_cv("Ana Ruiz", "a@example.com", "1", "Spain", "\nSkills:\nCooking\n\n")
+
+    assert cv == "Name: Ana Ruiz\nEmail: a@example.com\nPhone Number: 1\nLocation: Spain\nSkills:\nCooking\n"
+
+
+def test_result_reports_token_usage():
+    result = generate_cv_result(FakeChatClient(), "Chef", "Ana Ruiz", "a@example.com", "1", "Spain", "Low")
+
+    assert result.content.startswith("Name: Ana Ruiz\n")
+    assert result.prompt_tokens > 0
+    assert result.completion_tokens > 0
+    assert result.elapsed >= 0
+
+
+def test_result_without_usage_has_no_token_counts():
+    response = types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content="Skills:"))])
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=lambda **kwargs: response)))
+
+    result = generate_cv_result(client, "Chef", "A", "a@example.com", "1", "Spain", "Low")
+
+    assert result.prompt_tokens is None
+    assert result.completion_tokens is None
@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+
+from cv_generator import cli, generation, providers  # noqa: E402
+from cv_generator.providers import PROVIDERS, HTTPSettings, ProviderError, get_client, get_provider, http_settings  # noqa: E402
+
+
+def test_provider_is_chosen_by_config(monkeypatch):
+    monkeypatch.delenv("CV_PROVIDER", raising=False)
+    assert get_provider().name == "groq"
+
+    monkeypatch.setenv("CV_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o-mini")
+    provider = get_provider()
+    assert (provider.name, provider.model, provider.supports_batch) == ("openai", "gpt-4o-mini", True)
+
+    with pytest.raises(ProviderError, match="unknown provider 'other'"):
+        get_provider("other")
+    assert set(PROVIDERS) == {"groq", "openai", "local", "fake"}
+
+
+def test_local_provider_points_the_openai_client_at_the_server(monkeypatch):
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", "http://127.0.0.1:8000/v1")
+    monkeypatch.setenv("LOCAL_LLM_MODEL", "qwen2.5")
+
+    provider = get_provider("local")
+    client = provider.create_client()
+
+    assert provider.model == "qwen2.5"
+    assert str(client.base_url).startswith("http://127.0.0.1:8000/v1")
+
+
+def test_http_pool_matches_the_concurrency(monkeypatch):
+    for name in ("CV_HTTP_MAX_CONNECTIONS", "CV_HTTP_KEEPALIVE_EXPIRY", "CV_HTTP_TIMEOUT", "CV_HTTP_CONNECT_TIMEOUT"):
+        monkeypatch.delenv(name, raising=False)
+    assert http_settings(8) == HTTPSettings(max_connections=8)
+    assert http_settings().max_connections == providers.DEFAULT_MAX_CONNECTIONS
+
+    monkeypatch.setenv("CV_HTTP_MAX_CONNECTIONS", "50")
+    monkeypatch.setenv("CV_HTTP_TIMEOUT", "30")
+    assert http_settings(8) == HTTPSettings(max_connections=50, timeout=30.0)
+
+
+def test_shared_client_is_created_once(monkeypatch):
+    created = []
+    monkeypatch.setattr(providers, "_clients", {})
+    monkeypatch.setattr(generation, "create_groq_client", lambda **kwargs: created.append(kwargs) or object())
+
+    client = get_client("groq", concurrency=8)
+
+    assert get_client("groq", concurrency=8) is client
+    assert len(created) == 1
+    assert isinstance(created[0]["http_client"], httpx.Client)
+    # Retries are left to cv_generator.ratelimit
+    assert created[0]["max_retries"] == 0
+    assert get_client("fake") is get_client("fake")
+
+
+def test_cli_runs_offline_with_the_fake_provider(monkeypatch, tmp_path):
+    monkeypatch.setenv("CV_FAKE_LATENCY", "0")
+
+    exit_code = cli.main([
+        "--provider", "fake", "--role", "Chef", "--count", "3", "--render-workers", "0", "--output-dir", str(tmp_path),
+    ])
+
+    assert exit_code == 0
+    assert sorted(p.name for p in tmp_path.glob("*.pdf")) == ["cv_Chef_1.pdf", "cv_Chef_2.pdf", "cv_Chef_3.pdf"]
@@ -0,0 +1,136 @@
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cv_generator.generation import generate_cv_result  # noqa: E402
+from cv_generator.ratelimit import (  # noqa: E402
+    RateLimiter,
+    RetryError,
+    RetryPolicy,
+    TokenBucket,
+    call_with_retries,
+    is_retryable,
+    retry_after_seconds,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = types.SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def test_token_bucket_spaces_out_requests_past_the_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=2, clock=clock)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1.0)
+    assert bucket.reserve() == pytest.approx(2.0)
+
+
+def test_rate_limiter_enforces_requests_and_tokens_per_minute():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=120, tokens_per_minute=6000, clock=clock, sleep=clock.sleep)
+    limiter.tokens.tokens = 0
+
+    # 3000 tokens at 100 tokens/second means a 30 second wait
+    assert limiter.acquire(estimated_tokens=3000) == pytest.approx(30.0)
+    # Using fewer tokens than estimated gives the budget back
+    limiter.record_usage(3000, 1000)
+    assert limiter.tokens.tokens == pytest.approx(2000)
+
+
+def test_retry_after_pauses_every_caller():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        if len(calls) == 1:
+            raise APIStatusError(429, {"Retry-After": "7"})
+        return "ok"
+
+    result, attempts = call_with_retries(flaky, rate_limiter=limiter, sleep=clock.sleep)
+    assert (result, attempts) == ("ok", 2)
+    assert calls == [0.0, 7.0]
+    # Other callers are held back until the Retry-After deadline as well
+    limiter.pause(5)
+    assert limiter.acquire() == pytest.approx(5.0)
+
+
+def test_transient_errors_use_jittered_exponential_backoff():
+    sleeps = []
+    policy = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=60.0)
+
+    def always_unavailable():
+        raise APIStatusError(503)
+
+    with pytest.raises(RetryError) as excinfo:
+        call_with_retries(always_unavailable, retry_policy=policy, sleep=sleeps.append)
+
+    assert excinfo.value.attempts == 4
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps, start=1):
+        cap = 2 ** (attempt - 1)
+        assert cap / 2 <= delay <= cap
+
+
+def test_permanent_errors_are_not_retried():
+    sleeps = []
+    with pytest.raises(RetryError) as excinfo:
+        call_with_retries(lambda: (_ for _ in ()).throw(APIStatusError(401)), sleep=sleeps.append)
+    assert excinfo.value.attempts == 1
+    assert sleeps == []
+
+
+def test_is_retryable_and_retry_after_parsing():
+    assert is_retryable(APIStatusError(429))
+    assert is_retryable(APIStatusError(500))
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(APIStatusError(400))
+    assert not is_retryable(ValueError("bad"))
+    assert retry_after_seconds(APIStatusError(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(APIStatusError(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(APIStatusError(429)) is None
+
+
+def test_generate_cv_result_reports_attempts():
+    responses = [APIStatusError(429, {"retry-after": "0"}), APIStatusError(502)]
+
+    def create(messages, model):
+        if responses:
+            raise responses.pop(0)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content="CV"))],
+            usage=types.SimpleNamespace(total_tokens=500),
+        )
+
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    result = generate_cv_result(
+        client, "Chef", "A", "a@example.com", "1", "Italy", "Low",
+        rate_limiter=RateLimiter(tokens_per_minute=100000),
+        retry_policy=RetryPolicy(base_delay=0.001),
+    )
+    assert result.content == "Name: A\nEmail: a@example.com\nPhone Number: 1\nLocation: Italy\nCV\n"
+    assert result.attempts == 3
+    assert result.ok
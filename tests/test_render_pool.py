@@ -0,0 +1,56 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cv_generator.generation import GenerationResult  # noqa: E402
+from cv_generator.render_pool import PDFRenderPool, render_as_completed  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def render_pool():
+    with PDFRenderPool(max_workers=2) as pool:
+        yield pool
+
+
+def test_render_pool_renders_in_worker_processes(render_pool):
+    cvs = [(idx, f"Skills:\nSkill {idx}") for idx in range(6)]
+    rendered = {key: (item, pdf_bytes) for key, item, pdf_bytes in render_as_completed(iter(cvs), render_pool)}
+
+    assert sorted(rendered) == list(range(6))
+    for idx, (item, pdf_bytes) in rendered.items():
+        assert item == f"Skills:\nSkill {idx}"
+        assert pdf_bytes.startswith(b"%PDF")
+
+
+def test_rendering_overlaps_with_generation(render_pool):
+    first_pdf_received = threading.Event()
+
+    def slow_generation():
+        yield 0, GenerationResult("Skills:\nPython", attempts=1)
+        # The next CV is only "generated" once the first PDF has come back
+        assert first_pdf_received.wait(timeout=30), "first PDF was not rendered while generation was in flight"
+        yield 1, GenerationResult("Skills:\nJava", attempts=2)
+
+    keys = []
+    for key, result, pdf_bytes in render_as_completed(slow_generation(), render_pool):
+        keys.append(key)
+        assert isinstance(result, GenerationResult)
+        first_pdf_received.set()
+    assert keys == [0, 1]
+
+
+def test_in_process_rendering_and_generation_errors():
+    pool = PDFRenderPool(max_workers=0)
+    [(key, item, pdf_bytes)] = render_as_completed(iter([("a", "Skills:\nPython")]), pool)
+    assert key == "a" and pdf_bytes.startswith(b"%PDF")
+
+    def broken_generation():
+        yield "a", "Skills:\nPython"
+        raise RuntimeError("generation crashed")
+
+    with pytest.raises(RuntimeError, match="generation crashed"):
+        list(render_as_completed(broken_generation(), pool))
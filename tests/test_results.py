@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from cv_generator.generation import GenerationResult  # noqa: E402
+from cv_generator.results import ERROR, NEAR_DUPLICATE, OK, ResultEntry, filter_entries, page_count, paginate  # noqa: E402
+from cv_generator.results_view import show_result_entries  # noqa: E402
+
+
+def make_entries():
+    return [
+        ResultEntry("a", 1, 3, "Chef", "cv_Chef_1.pdf", GenerationResult("Pasta and risotto")),
+        ResultEntry("a", 2, 3, "Chef", "cv_Chef_2.pdf", GenerationResult("Error generating CV: timeout")),
+        ResultEntry("a", 3, 3, "Chef", "cv_Chef_3.pdf", GenerationResult("Pasta again", duplicate_of="cv_Chef_1.pdf", similarity=0.9)),
+        # The Batch API app keeps plain CV text
+        ResultEntry("b", 1, 1, "Data Scientist", "cv_Data_Scientist_1.pdf", "Python and PASTA pipelines"),
+    ]
+
+
+def test_status_of_results_and_text():
+    assert [entry.status for entry in make_entries()] == [OK, ERROR, NEAR_DUPLICATE, OK]
+    assert ResultEntry("b", 2, 2, "Chef", "cv.pdf", "Error generating CV: no result").status == ERROR
+
+
+def test_filter_by_query_role_and_status():
+    entries = make_entries()
+
+    assert [entry.key for entry in filter_entries(entries, " pasta ")] == ["a_1", "a_3", "b_1"]
+    assert [entry.key for entry in filter_entries(entries, "pasta", role="Chef")] == ["a_1", "a_3"]
+    assert [entry.key for entry in filter_entries(entries, status=ERROR)] == ["a_2"]
+    assert filter_entries(entries, "sushi") == []
+
+
+def test_paginate_clamps_the_page():
+    entries = list(range(23))
+
+    page = paginate(entries, 3, page_size=10)
+    assert (page.entries, page.number, page.pages, page.total, page.start, page.end) == (list(range(20, 23)), 3, 3, 23, 20, 23)
+    assert paginate(entries, 7, page_size=10).number == 3
+    assert paginate(entries, 0, page_size=10).entries == list(range(10))
+    assert page_count(0) == 1 and paginate([], 1).entries == []
+
+
+def test_preview_cuts_long_cvs_at_a_line():
+    content = "Summary\n" + "x" * 50 + "\nExperience\n" + "y" * 500
+    entry = ResultEntry("a", 1, 1, "Chef", "cv.pdf", GenerationResult(content))
+
+    assert entry.preview(100) == "Summary\n" + "x" * 50 + "\nExperience …"
+    assert ResultEntry("a", 1, 1, "Chef", "cv.pdf", "short").preview() == "short"
+
+
+def test_result_view_shows_one_filtered_page():
+    import types
+
+    shown = []
+    st = types.SimpleNamespace(
+        session_state={"results_page": 5},
+        text_input=lambda label, value="": "pasta",
+        selectbox=lambda label, options, index=0: options[index],
+        number_input=lambda label, min_value, max_value, key: st.session_state[key],
+        subheader=lambda label: shown.append(label),
+        checkbox=lambda label, value=False, key=None: False,
+        text=lambda text: None,
+    )
+
+    page = show_result_entries(st, make_entries(), statuses=["All", "Generated"], show_details=lambda entry: shown.append(entry.path))
+
+    # The page number left over from a wider search is clamped to the only page
+    assert st.session_state["results_page"] == 1 and page.total == 3
+    assert shown == ["CV 1 of 3", "cv_Chef_1.pdf", "CV 3 of 3", "cv_Chef_3.pdf", "CV 1 of 1", "cv_Data_Scientist_1.pdf"]
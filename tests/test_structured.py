@@ -0,0 +1,85 @@
+import json
+import types
+from io import BytesIO
+
+import pytest
+from PyPDF2 import PdfReader
+
+from cv_generator.cache import ResponseCache
+from cv_generator.fake_llm import FakeChatClient
+from cv_generator.generation import generate_cv_result
+from cv_generator.pdf import render_cv_pdf
+from cv_generator.structured import CVSchemaError, StructuredCV, parse_structured_cv
+
+ANSWER = {
+    "languages": ["English", "Italian"],
+    "applicant_key_role": "Chef",
+    "years_of_experience": "6",
+    "skills": ["**Pasta**", {"skill": "Knife work", "level": "expert"}],
+    "education": ["Culinary Arts, ALMA (2016)"],
+    "projects": [],
+    "certifications": ["HACCP"],
+    "experiences": ["Sous Chef: Trattoria Roma (2018-2024)"],
+    "references": ["Chef Mario Rossi"],
+}
+
+
+def test_parse_structured_cv():
+    cv = parse_structured_cv("```json\n" + json.dumps(ANSWER) + "\n```", "Ana", "a@example.com", "1", "Italy")
+
+    assert cv.years_of_experience == 6
+    assert cv.skills == ["**Pasta**", "Knife work - expert"]
+    assert cv.to_text().startswith("Name: Ana\nEmail: a@example.com\nPhone Number: 1\nLocation: Italy\nLanguages:\n- English\n")
+    assert not hasattr(cv, "__dict__")
+
+
+@pytest.mark.parametrize("answer, message", [
+    ("not json", "not valid JSON"),
+    ("[]", "not a JSON object"),
+    (json.dumps({k: v for k, v in ANSWER.items() if k != "skills"}), "missing section 'Skills'"),
+    (json.dumps(dict(ANSWER, years_of_experience="many")), "should be an integer"),
+    (json.dumps(dict(ANSWER, education={"degree": 1})), "should be a list"),
+])
+def test_parse_rejects_answers_outside_the_schema(answer, message):
+    with pytest.raises(CVSchemaError, match=message):
+        parse_structured_cv(answer, "Ana", "a@example.com", "1", "Italy")
+
+
+def test_render_structured_cv_uses_sections_as_headings():
+    cv = parse_structured_cv(json.dumps(ANSWER), "Ana", "a@example.com", "1", "Italy")
+
+    text = PdfReader(BytesIO(render_cv_pdf(cv))).pages[0].extract_text()
+
+    # Lines ending in ':' inside entries are content, not headings
+    assert "Sous Chef: Trattoria Roma" in text
+    assert "Skills:" in text and "Experiences:" in text
+
+
+def test_structured_generation_uses_json_mode_and_caches_answer(tmp_path):
+    client = FakeChatClient()
+    calls = []
+    create = client.chat.completions.create
+    client.chat.completions.create = lambda **kwargs: calls.append(kwargs) or create(**kwargs)
+    cache = ResponseCache(str(tmp_path))
+
+    first = generate_cv_result(client, "Chef", "Ana", "a@example.com", "1", "Italy", "Low", cache=cache, structured=True)
+    second = generate_cv_result(client, "Chef", "Bea", "b@example.com", "2", "Italy", "Low", cache=cache, structured=True)
+
+    assert calls[0]["response_format"] == {"type": "json_object"}
+    assert len(calls) == 1
+    assert isinstance(first.structured, StructuredCV)
+    assert first.content == first.structured.to_text()
+    assert second.cached and second.structured.name == "Bea"
+    assert second.structured.skills == first.structured.skills
+
+
+def test_invalid_structured_answer_is_an_error_and_not_cached(tmp_path):
+    response = types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content="Skills:\nCooking"))])
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=lambda **kwargs: response)))
+    cache = ResponseCache(str(tmp_path))
+
+    result = generate_cv_result(client, "Chef", "Ana", "a@example.com", "1", "Italy", "Low", cache=cache, structured=True)
+
+    assert not result.ok
+    assert "invalid structured CV" in result.content
+    assert len(cache) == 0
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cv_generator.pdf import save_cv_as_pdf  # noqa: E402
+from cv_generator.text import sanitize_text  # noqa: E402
+
+
+def test_accented_names_are_transliterated():
+    assert sanitize_text("José Álvarez Müller") == "Jose Alvarez Muller"
+    assert sanitize_text("Łukasz Søren Straße Æsir") == "Lukasz Soren Strasse AEsir"
+
+
+def test_typographic_punctuation_becomes_ascii():
+    assert sanitize_text("“Lead” – 2019—2024 … ‘ok’ • ﬁne") == '"Lead" - 2019-2024 ... \'ok\' * fine'
+
+
+def test_unsupported_characters_and_control_characters():
+    assert sanitize_text("北京 Office") == "__ Office"
+    assert sanitize_text("Skills:\tPython\x07\r\nGo\x7f") == "Skills: Python\nGo"
+
+
+def test_ascii_text_is_unchanged():
+    text = "Skills:\nPython, SQL (5 years)\n"
+    assert sanitize_text(text) == text
+
+
+def test_pdf_keeps_transliterated_names(tmp_path):
+    file_path = tmp_path / "cv.pdf"
+    save_cv_as_pdf("Name: José Müller\nSkills:\nPython – Django", str(file_path))
+    text = PdfReader(str(file_path)).pages[0].extract_text()
+    assert "Jose Muller" in text
+    assert "Python - Django" in text
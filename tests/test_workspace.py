@@ -0,0 +1,68 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cv_generator.workspace import WorkspaceRegistry, parse_session_id  # noqa: E402
+
+
+def test_sessions_get_isolated_workspaces(tmp_path):
+    registry = WorkspaceRegistry(root=str(tmp_path))
+    alice = registry.get("alice")
+    bob = registry.get("bob")
+
+    assert alice.path != bob.path
+    Path(alice.file_path("cv_1.pdf")).write_bytes(b"%PDF")
+    Path(bob.file_path("cv_1.pdf")).write_bytes(b"%PDF")
+
+    # Releasing one session leaves the other session's files alone
+    registry.release("alice")
+    assert not os.path.exists(alice.path)
+    assert os.path.exists(bob.file_path("cv_1.pdf"))
+    assert registry.get("bob") is bob
+
+
+def test_cleanup_expired_removes_only_stale_workspaces(tmp_path):
+    registry = WorkspaceRegistry(root=str(tmp_path), ttl=10)
+    stale = registry.get("stale")
+    fresh = registry.get("fresh")
+    stale.last_used -= 60
+
+    assert registry.cleanup_expired() == ["stale"]
+    assert not os.path.exists(stale.path)
+    assert os.path.exists(fresh.path)
+
+
+def test_background_cleanup_thread(tmp_path):
+    registry = WorkspaceRegistry(root=str(tmp_path), ttl=0, cleanup_interval=0.01)
+    workspace = registry.get("session")
+    registry.start_cleanup()
+    try:
+        for _ in range(200):
+            if not os.path.exists(workspace.path):
+                break
+            registry._stop.wait(0.01)
+    finally:
+        registry.stop_cleanup()
+    assert not os.path.exists(workspace.path)
+
+
+def test_pinned_workspaces_outlive_the_ttl(tmp_path):
+    registry = WorkspaceRegistry(root=str(tmp_path), ttl=10)
+    busy = registry.get("busy")
+    busy.pin()
+    busy.last_used -= 60
+
+    # A batch still uses the workspace, however long ago it started
+    assert registry.cleanup_expired() == []
+    busy.unpin()
+    busy.last_used -= 60
+    assert registry.cleanup_expired() == ["busy"]
+
+
+def test_session_ids_from_urls_are_validated():
+    session_id = "0123456789abcdef0123456789abcdef"
+    assert parse_session_id(session_id) == session_id
+    assert parse_session_id("../../etc") is None
+    assert parse_session_id(None) is None